@@ -13,7 +13,7 @@ from alembic import context
 
 # Import our models and Base
 from database import Base
-from models import Project, Page, Bubble
+from models import Project, Page, Bubble, TranslationMemory
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,60 @@
+"""
+Benchmark: page translations one at a time (old worker behaviour) vs the
+shared AsyncTranslatorClient with bounded concurrency + token bucket.
+
+A local stub LLM server simulates network latency and a provider quota
+(429 + Retry-After above `rps` requests per second).
+
+Usage: python bench_async_translator.py [pages] [latency_ms] [rps]
+"""
+import sys
+import time
+
+from fixtures import StubLLMServer
+from services.async_translator import AsyncTranslatorClient, HttpLLMBackend
+from services.translator import TranslatorService
+
+
+def make_pages(n_pages: int, bubbles: int = 8):
+    return [[f"Page {p} line {b}, what is going on?!" for b in range(bubbles)] for p in range(n_pages)]
+
+
+def run(n_pages: int = 24, latency_ms: float = 500, rps: float = 8):
+    stub = StubLLMServer(latency=latency_ms / 1000, rps=rps).start()
+    pages = make_pages(n_pages)
+    translator = TranslatorService(target_lang="es")
+    translator.model = None # Only the async client talks to the stub
+    prompts = [translator._batch_prompt([(f"b{i}", t) for i, t in enumerate(texts)]) for texts in pages]
+    print(f"{n_pages} pages, stub latency {latency_ms:.0f} ms, quota {rps:g} req/s")
+
+    # 1. Sequential: one blocking request per page, no limiter (old behaviour)
+    AsyncTranslatorClient.reset()
+    client = AsyncTranslatorClient(backend=HttpLLMBackend(stub.url), concurrency=1, rpm=1e9, burst=1, max_retries=20, backoff_base=0.05)
+    start = time.perf_counter()
+    for prompt in prompts:
+        client.run(client.complete(prompt)).result()
+    sequential = time.perf_counter() - start
+    client.shutdown()
+    print(f"Sequential:        {sequential:6.2f} s  ({n_pages / sequential:5.1f} pages/s)")
+
+    # 2. Async: all pages in flight at once, with and without the token bucket (429s retried with backoff)
+    for label, rpm, burst in (("Async, no bucket:", 1e9, 16), ("Async + bucket:", rps * 60, 1)):
+        AsyncTranslatorClient.reset()
+        stub.rejected = 0
+        client = AsyncTranslatorClient(backend=HttpLLMBackend(stub.url), concurrency=16, rpm=rpm,
+                                       burst=burst, max_retries=20, backoff_base=0.05)
+        start = time.perf_counter()
+        futures = [client.run(client.complete(prompt)) for prompt in prompts]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        assert all(r.count("ES:") == 8 for r in results)
+        print(f"{label:18} {elapsed:6.2f} s  ({n_pages / elapsed:5.1f} pages/s), 429s: {stub.rejected}")
+        client.shutdown()
+
+    AsyncTranslatorClient.reset()
+    stub.stop()
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:]]
+    run(int(args[0]) if args else 24, *(args[1:]))
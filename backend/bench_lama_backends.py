@@ -0,0 +1,69 @@
+"""
+Quality/speed harness for the LaMa backends (LAMA_BACKEND).
+
+Runs every available backend on the same fixed page set (synthetic busy pages,
+seeds 0..N-1, see bench_contours.create_busy_page) through the tiled, batched
+TextRemover path and reports:
+- seconds per page
+- PSNR of the inpainted (masked) pixels against plain TorchScript float32
+- PSNR of the whole page against the same reference
+
+Backends whose files are missing (see export_lama_onnx.py) are skipped.
+Usage: python bench_lama_backends.py [pages]
+"""
+import sys
+import time
+import numpy as np
+import torch
+from services.inpainting import TextRemover
+from services.lama_backends import load_lama, BACKEND_FILES
+from bench_contours import create_busy_page
+
+
+def make_remover(backend: str):
+    remover = object.__new__(TextRemover)
+    remover.device = torch.device('cpu')
+    remover.model, remover.backend = load_lama(backend, remover.device)
+    return remover
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(n_pages: int = 4):
+    pages = []
+    for seed in range(n_pages):
+        img, bboxes = create_busy_page(num_bubbles=12, seed=seed)
+        pages.append((img, [{"bbox": b} for b in bboxes]))
+
+    reference, masks = None, None
+    print(f"{n_pages} pages, torch threads: {torch.get_num_threads()}")
+    print(f"{'backend':16} {'s/page':>8} {'PSNR mask':>10} {'PSNR page':>10}")
+    for backend in BACKEND_FILES:
+        try:
+            remover = make_remover(backend)
+        except FileNotFoundError as e:
+            print(f"{backend:16} skipped ({e})")
+            continue
+        if remover.backend != backend:
+            print(f"{backend:16} skipped (not available)")
+            continue
+
+        remover.inpaint_pages(pages[:1]) # Warm-up (oneDNN / ORT first-run costs)
+        start = time.perf_counter()
+        results = remover.inpaint_pages(pages)
+        per_page = (time.perf_counter() - start) / n_pages
+
+        if reference is None:
+            # First backend is plain TorchScript: the quality reference
+            reference = results
+            masks = [remover._build_mask(img[:, :, ::-1], bubbles, 'bubble').to_dense() > 0 for img, bubbles in pages]
+        mask_psnr = np.mean([psnr(r[m], ref[m]) for r, ref, m in zip(results, reference, masks)])
+        page_psnr = np.mean([psnr(r, ref) for r, ref in zip(results, reference)])
+        print(f"{backend:16} {per_page:8.2f} {mask_psnr:10.2f} {page_psnr:10.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
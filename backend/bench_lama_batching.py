@@ -0,0 +1,80 @@
+"""
+Benchmark: LaMa tiles/sec against batch size on CPU (TextRemover.inpaint_tiles).
+
+Tiles are synthetic bubbles (one padded tile each, 150-330 px a side) as they come
+out of find_tiles for several pages, mixed in buckets like the inpaint batcher does.
+Uses models/big-lama.pt when present; otherwise a small conv network of similar
+shape (encoder/decoder, no weights) stands in, so absolute numbers differ but the
+batching trend is comparable.
+
+Usage: python bench_lama_batching.py [tiles] [threads]
+"""
+import sys
+import time
+import cv2
+import numpy as np
+import torch
+from services.inpainting import TextRemover
+
+
+class StandInLama(torch.nn.Module):
+    def __init__(self, width=64):
+        super().__init__()
+        self.encoder = torch.nn.Sequential(
+            torch.nn.Conv2d(4, width, 3, stride=2, padding=1), torch.nn.ReLU(),
+            torch.nn.Conv2d(width, width * 2, 3, stride=2, padding=1), torch.nn.ReLU(),
+            torch.nn.Conv2d(width * 2, width * 4, 3, stride=2, padding=1), torch.nn.ReLU(),
+        )
+        self.decoder = torch.nn.Sequential(
+            torch.nn.ConvTranspose2d(width * 4, width * 2, 4, stride=2, padding=1), torch.nn.ReLU(),
+            torch.nn.ConvTranspose2d(width * 2, width, 4, stride=2, padding=1), torch.nn.ReLU(),
+            torch.nn.ConvTranspose2d(width, 3, 4, stride=2, padding=1), torch.nn.Sigmoid(),
+        )
+
+    def forward(self, img, mask):
+        out = self.decoder(self.encoder(torch.cat([img * (1 - mask), mask], dim=1)))
+        return img * (1 - mask) + out * mask
+
+
+def load_remover():
+    try:
+        return TextRemover(), "big-lama.pt"
+    except FileNotFoundError:
+        remover = object.__new__(TextRemover)
+        remover.device = torch.device('cpu')
+        remover.model = StandInLama().eval()
+        return remover, "stand-in conv net (big-lama.pt not found)"
+
+
+def make_tiles(remover, n_tiles, seed=7):
+    rng = np.random.default_rng(seed)
+    pairs = []
+    for _ in range(n_tiles):
+        h, w = (int(v) for v in rng.integers(150, 330, 2))
+        tile = np.full((h, w, 3), 180, np.uint8) - rng.integers(0, 40, (h, w, 1), dtype=np.uint8)
+        cv2.ellipse(tile, (w // 2, h // 2), (w // 2 - 40, h // 2 - 40), 0, 0, 360, (255, 255, 255), -1)
+        cv2.putText(tile, "WHAT?!", (w // 2 - 50, h // 2), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        mask = remover._build_mask(tile, [{"bbox": [40, 40, w - 40, h - 40]}], 'bubble').to_dense()
+        pairs.append((tile, mask))
+    return pairs
+
+
+def run(n_tiles=48, threads=0):
+    if threads:
+        torch.set_num_threads(threads)
+    remover, label = load_remover()
+    pairs = make_tiles(remover, n_tiles)
+    print(f"Model: {label}, torch threads: {torch.get_num_threads()}, {len(pairs)} tiles")
+
+    remover.inpaint_tiles(pairs[:2], batch_size=1) # Warm-up
+    for batch_size in (1, 2, 4, 8, 16):
+        start = time.perf_counter()
+        results = remover.inpaint_tiles(pairs, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        assert results is not None and len(results) == len(pairs)
+        print(f"batch {batch_size:2d}: {elapsed:6.2f} s  ({len(pairs) / elapsed:6.1f} tiles/s)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args)
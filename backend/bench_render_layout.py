@@ -0,0 +1,44 @@
+"""
+Benchmark: bubble layout of dense pages (manga pages full of dialogue) in series
+vs on the thread / process pools of TextRenderer.layout_bubbles
+(RENDER_LAYOUT_EXECUTION). Every mode is warmed up on all pages first, so font
+caches (one per worker process) are warm and only the layout work is compared.
+Output must be pixel-identical across modes.
+
+Usage: python bench_render_layout.py [bubbles_per_page] [pages]
+"""
+import sys
+import time
+import numpy as np
+from fixtures import make_dense_page
+from services import renderer as renderer_module
+from services.renderer import TextRenderer
+
+def run(n_bubbles=48, n_pages=3):
+    renderer = TextRenderer()
+    pages = [make_dense_page(n_bubbles, seed) for seed in range(n_pages)]
+    print(f"{n_pages} pages x {n_bubbles} bubbles, {renderer_module.RENDER_LAYOUT_WORKERS} workers")
+    print(f"{'mode':8} {'layout ms/page':>15} {'render ms/page':>15} {'identical':>10}")
+    reference = None
+    renderer_module.RENDER_LAYOUT_MIN_BUBBLES = 1
+    for mode in ["serial", "thread", "process"]:
+        renderer_module.RENDER_LAYOUT_EXECUTION = mode
+        for _, bubbles in pages:
+            renderer.layout_bubbles(bubbles) # Warm-up (pool start-up, font caches)
+        layout_ms = render_ms = 0
+        results = []
+        for img, bubbles in pages:
+            start = time.perf_counter()
+            renderer.layout_bubbles(bubbles)
+            layout_ms += (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            results.append(np.asarray(renderer.render_image(img, bubbles)))
+            render_ms += (time.perf_counter() - start) * 1000
+        if reference is None:
+            reference = results
+        identical = all((a == b).all() for a, b in zip(results, reference))
+        print(f"{mode:8} {layout_ms / n_pages:15.1f} {render_ms / n_pages:15.1f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 48, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,79 @@
+"""
+Benchmark: fast-mode Telea on the full page vs region-limited (inpaint_telea),
+sequential and on a thread pool.
+
+Pages: every image in `page_dir` (e.g. a processed chapter in uploads/). Bubbles
+come from the pipeline's metadata_<file>.json next to the image when present,
+otherwise from BubbleDetector. Without pages, synthetic busy pages are used
+(bench_contours.create_busy_page).
+
+Usage: python bench_telea_regions.py [page_dir] [threads]
+"""
+import os
+import sys
+import json
+import time
+import cv2
+import numpy as np
+from services.inpainting import inpaint_telea, TELEA_RADIUS
+from services.text_mask import build_text_mask
+from bench_contours import create_busy_page
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def load_pages(page_dir):
+    pages = []
+    if page_dir:
+        detector = None
+        for name in sorted(os.listdir(page_dir)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS) or name.startswith(("clean_", "final_", "debug_")):
+                continue
+            img = cv2.imread(os.path.join(page_dir, name))
+            metadata = os.path.join(page_dir, f"metadata_{name}.json")
+            if os.path.exists(metadata):
+                with open(metadata) as f:
+                    bubbles = json.load(f)
+            else:
+                if detector is None:
+                    from services.detector import BubbleDetector
+                    detector = BubbleDetector()
+                bubbles = detector.detect(img, with_contours=False)
+            pages.append((name, img, bubbles))
+    if not pages:
+        for seed in range(4):
+            img, bboxes = create_busy_page(num_bubbles=24, seed=seed)
+            pages.append((f"synthetic-{seed}", img, [{"bbox": b} for b in bboxes]))
+    return pages
+
+
+def timed(fn, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def run(page_dir=None, threads=4):
+    pages = load_pages(page_dir)
+    print(f"{len(pages)} pages, Telea radius {TELEA_RADIUS}, pool of {threads} threads")
+    print(f"{'page':24} {'size':>11} {'mask %':>7} {'full ms':>8} {'region ms':>10} {'pool ms':>8} {'max diff':>9}")
+    totals = np.zeros(3)
+    for name, img, bubbles in pages:
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        mask = build_text_mask(rgb, bubbles, 'bubble')
+        full, full_ms = timed(lambda: cv2.inpaint(rgb, mask.to_dense(), TELEA_RADIUS, cv2.INPAINT_TELEA))
+        region, region_ms = timed(lambda: inpaint_telea(rgb, mask, threads=1))
+        _, pool_ms = timed(lambda: inpaint_telea(rgb, mask, threads=threads))
+        diff = int(np.abs(full.astype(int) - region.astype(int)).max())
+        totals += (full_ms, region_ms, pool_ms)
+        h, w = img.shape[:2]
+        print(f"{name[:24]:24} {w:>5}x{h:<5} {100.0 * mask.area() / (h * w):6.1f}% "
+              f"{full_ms:8.1f} {region_ms:10.1f} {pool_ms:8.1f} {diff:9d}")
+    print(f"{'total':24} {'':>11} {'':>7} {totals[0]:8.1f} {totals[1]:10.1f} {totals[2]:8.1f}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
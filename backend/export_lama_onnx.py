@@ -0,0 +1,49 @@
+"""
+Exports models/big-lama.pt to ONNX for LAMA_BACKEND=onnx / onnx-int8.
+
+- models/big-lama.onnx: opset 17 (DFT op for LaMa's Fourier convolutions), dynamic
+  batch/height/width so the bucketed tile batches from TextRemover.inpaint_tiles fit.
+- models/big-lama.int8.onnx: dynamic int8 weight quantization of the export.
+
+Needs `pip install onnx onnxruntime` (not in requirements.txt: optional backend).
+Usage: python export_lama_onnx.py [tile_size]
+"""
+import os
+import sys
+import numpy as np
+import torch
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+
+def export(tile_size: int = 256):
+    model = torch.jit.load(os.path.join(MODELS_DIR, "big-lama.pt"), map_location="cpu").eval()
+    onnx_path = os.path.join(MODELS_DIR, "big-lama.onnx")
+    int8_path = os.path.join(MODELS_DIR, "big-lama.int8.onnx")
+
+    img = torch.rand(1, 3, tile_size, tile_size)
+    mask = (torch.rand(1, 1, tile_size, tile_size) > 0.9).float()
+    axes = {0: "batch", 2: "height", 3: "width"}
+    print(f"Exporting {onnx_path}...")
+    torch.onnx.export(
+        model, (img, mask), onnx_path, opset_version=17,
+        input_names=["image", "mask"], output_names=["output"],
+        dynamic_axes={"image": axes, "mask": axes, "output": axes},
+    )
+
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    print(f"Quantizing {int8_path}...")
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+
+    # Sanity check against TorchScript on the export tile
+    from services.lama_backends import OnnxLama
+    with torch.inference_mode():
+        reference = model(img, mask)
+        reference = (reference[0] if isinstance(reference, (list, tuple)) else reference).numpy()
+    for path in (onnx_path, int8_path):
+        diff = np.abs(OnnxLama(path)(img, mask).numpy() - reference).max()
+        print(f"{os.path.basename(path)}: max abs diff vs TorchScript {diff:.4f}")
+
+
+if __name__ == "__main__":
+    export(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
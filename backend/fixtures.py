@@ -0,0 +1,166 @@
+"""
+Shared generators and fakes for the test_*.py scripts and benchmarks.
+"""
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+import services.translation_memory as tm_module
+from services.translation_memory import TranslationMemory
+from services.translation_protocol import ITEMS_HEADER
+
+# --- Pages and bubbles ---
+
+WORDS = ("¿Dónde está el barco? No lo veo por ninguna parte, capitán. Esto es una frase bastante "
+         "larga que debería partirse en varias líneas dentro del globo ¡BOOM!").split()
+
+TEXTS = ["¿Dónde está el barco? ¡No lo veo por ninguna parte, capitán!", "¡Hola!",
+         "Esto es una frase bastante larga que debería partirse en varias líneas dentro del globo de diálogo",
+         "No puede ser... ¿de verdad crees que vendrá esta noche?", "¡¡CORRE!!"]
+
+
+def make_page(n=30, seed=5):
+    """
+    2000x1400 noise page with `n` scattered bubbles (every other one with a polygon).
+    """
+    rng = np.random.default_rng(seed)
+    img = Image.fromarray(rng.integers(150, 255, (2000, 1400, 3), dtype=np.uint8))
+    bubbles = []
+    for i in range(n):
+        x, y = int(rng.integers(0, 1200)), int(rng.integers(0, 1800))
+        w, h = int(rng.integers(60, 220)), int(rng.integers(50, 180))
+        bubble = {"bbox": [x, y, x + w, y + h], "translation": f"Bocadillo {i}: ¿qué pasa aquí?"}
+        if i % 2:
+            bubble["polygon"] = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        bubbles.append(bubble)
+    return img, bubbles
+
+
+def make_dense_page(n, seed):
+    """
+    2400x1700 page full of dialogue (bench_render_layout, parallel layout tests).
+    """
+    rng = np.random.default_rng(seed)
+    img = Image.fromarray(rng.integers(200, 255, (2400, 1700, 3), dtype=np.uint8))
+    bubbles = []
+    for i in range(n):
+        x, y = int(rng.integers(0, 1500)), int(rng.integers(0, 2200))
+        w, h = int(rng.integers(80, 260)), int(rng.integers(60, 220))
+        bubble = {"bbox": [x, y, x + w, y + h], "translation": f"{TEXTS[i % len(TEXTS)]} ({i})"}
+        if i % 3 == 0:
+            bubble["polygon"] = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        bubbles.append(bubble)
+    return img, bubbles
+
+
+def random_bubbles(n=300, seed=1):
+    """
+    Bubbles of random size and text at the origin (font fitting / layout profiling).
+    """
+    rng = random.Random(seed)
+    bubbles = []
+    for _ in range(n):
+        w, h = rng.randint(40, 500), rng.randint(30, 400)
+        bubble = {"bbox": [0, 0, w, h], "translation": " ".join(rng.choices(WORDS, k=rng.randint(1, 40)))}
+        if rng.random() < 0.5:
+            bubble["polygon"] = [[0, 0], [w, 0], [w, h], [0, h]]
+        if rng.random() < 0.3:
+            bubble["estimated_font_size"] = rng.randint(10, 60)
+        bubbles.append(bubble)
+    return bubbles
+
+
+# --- Translation ---
+
+class use_memory_db:
+    """
+    Isolated in-memory SQLite for TranslationMemory, so tests never touch
+    translations.db. Use as `with use_memory_db():` - the real session factory
+    is restored on exit.
+    """
+    def __init__(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables["translation_memory"]])
+        self.saved = tm_module.SessionLocal
+        tm_module.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        TranslationMemory.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        tm_module.SessionLocal = self.saved
+        TranslationMemory.reset()
+
+
+class StubLLMServer:
+    """
+    POST {"prompt"} -> {"text"}: answers every dialogue id with 'ES:<text>' (JSON protocol)
+    after `latency` seconds. More than `rps` requests in the last second -> 429.
+    """
+    def __init__(self, latency: float = 0.2, rps: float = 1000, retry_after: float = None):
+        self.latency = latency
+        self.rps = rps
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rejected = 0
+        self._recent = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/generate"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if not stub._admit():
+                    self.send_response(429)
+                    if stub.retry_after is not None:
+                        self.send_header("Retry-After", str(stub.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                time.sleep(stub.latency)
+                dialogues = json.loads(body["prompt"].split(ITEMS_HEADER + "\n", 1)[1].split("\n\nRespond", 1)[0])
+                translations = {item["id"]: f"ES:{item['text']}" for item in dialogues}
+                payload = json.dumps({"text": json.dumps({"translations": translations})}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _admit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._recent = [t for t in self._recent if now - t < 1.0]
+            self.requests += 1
+            if len(self._recent) >= self.rps:
+                self.rejected += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
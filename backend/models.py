@@ -49,3 +49,16 @@ class Bubble(Base):
     
     # Relationships
     page = relationship("Page", back_populates="bubbles")
+
+class TranslationMemory(Base):
+    __tablename__ = "translation_memory"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    key = Column(String, nullable=False, unique=True, index=True)  # sha256(normalized source | lang | provider)
+    source_text = Column(Text, nullable=False)  # Normalized source
+    target_lang = Column(String, nullable=False)
+    provider = Column(String, nullable=False)
+    translation = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,217 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
+# Provider quota (requests per minute) and how many requests may go out back to back
+TRANSLATE_RPM = float(os.getenv("TRANSLATE_RPM", "15"))
+TRANSLATE_BURST = int(os.getenv("TRANSLATE_BURST", "2"))
+TRANSLATE_MAX_RETRIES = int(os.getenv("TRANSLATE_MAX_RETRIES", "5"))
+TRANSLATE_BACKOFF_BASE = float(os.getenv("TRANSLATE_BACKOFF_BASE", "1.0"))
+TRANSLATE_BACKOFF_MAX = float(os.getenv("TRANSLATE_BACKOFF_MAX", "30.0"))
+# Optional: plain HTTP LLM endpoint ({"prompt"} -> {"text"}), e.g. a local stub server for benchmarks
+LLM_STUB_URL = os.getenv("LLM_STUB_URL", "")
+
+
+class RateLimitError(Exception):
+    """
+    Provider answered 429 / quota exhausted. retry_after in seconds if the provider sent one.
+    """
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, at most `capacity` stored.
+    pause() blocks every caller until a deadline (provider asked us to back off).
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock() # Created lazily inside the running loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class GeminiAsyncBackend:
+    provider = "Gemini Flash (Contextual)"
+
+    def __init__(self, model_name: str):
+        from services import registry
+        self.model_id = model_name
+        self.model = registry.gemini_model(model_name)
+        if self.model is None:
+            raise RuntimeError("GEMINI_API_KEY not set")
+
+    async def generate(self, prompt: str) -> str:
+        from google.api_core import exceptions as google_exceptions
+        try:
+            response = await self.model.generate_content_async(prompt)
+        except google_exceptions.ResourceExhausted as e:
+            raise RateLimitError(str(e)) from e
+        return response.text
+
+
+class HttpLLMBackend:
+    """
+    Minimal JSON-over-HTTP LLM: POST {"prompt": ...} -> {"text": ...}. 429 honours Retry-After.
+    """
+    provider = "LLM Stub (Contextual)"
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        self.url = url
+        self.model_id = f"http:{url}"
+        self.timeout = timeout
+        self._client = None
+
+    async def generate(self, prompt: str) -> str:
+        import httpx
+        if self._client is None:
+            from services import registry
+            # Pooled keep-alive connections, bound to the client's event loop
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=registry.http_limits())
+        response = await self._client.post(self.url, json={"prompt": prompt})
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError("HTTP 429", float(retry_after) if retry_after else None)
+        response.raise_for_status()
+        return response.json()["text"]
+
+
+def default_backend(model_name: str):
+    if LLM_STUB_URL:
+        return HttpLLMBackend(LLM_STUB_URL)
+    if os.getenv("GEMINI_API_KEY"):
+        try:
+            return GeminiAsyncBackend(model_name)
+        except Exception as e:
+            print(f"[ASYNC TRANSLATOR] Gemini backend unavailable: {e}")
+    return None
+
+
+class AsyncTranslatorClient:
+    """
+    Shared asyncio LLM client for the pipeline workers.
+    Runs its own event loop on a background thread, so a worker can submit a
+    page's translation, keep doing CPU work (inpainting) and collect the result
+    later. Bounded concurrency (semaphore), token-bucket rate limiting to the
+    provider quota and jittered exponential backoff on 429s.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, backend=None, concurrency: int = TRANSLATE_CONCURRENCY, rpm: float = TRANSLATE_RPM,
+                burst: int = TRANSLATE_BURST, max_retries: int = TRANSLATE_MAX_RETRIES,
+                backoff_base: float = TRANSLATE_BACKOFF_BASE, backoff_max: float = TRANSLATE_BACKOFF_MAX):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super(AsyncTranslatorClient, cls).__new__(cls)
+                instance._initialize(backend, concurrency, rpm, burst, max_retries, backoff_base, backoff_max)
+                cls._instance = instance
+        return cls._instance
+
+    def _initialize(self, backend, concurrency, rpm, burst, max_retries, backoff_base, backoff_max):
+        from services.translator import GEMINI_MODEL
+        self.backend = backend if backend is not None else default_backend(GEMINI_MODEL)
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limited = 0
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-translator", daemon=True)
+        self._thread.start()
+        if self.backend:
+            print(f"[ASYNC TRANSLATOR] {self.backend.provider}: concurrency={self.concurrency}, {rpm:g} req/min")
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def provider(self) -> str:
+        return self.backend.provider if self.backend else "None"
+
+    @property
+    def model_id(self) -> str:
+        """
+        Model that answers through this client; translation memory key.
+        """
+        return self.backend.model_id if self.backend else "None"
+
+    def run(self, coro) -> Future:
+        """
+        Schedules a coroutine on the client loop from any thread. Returns a concurrent Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def complete(self, prompt: str) -> str:
+        """
+        One LLM call with concurrency limit, rate limit and retries on 429.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                async with self._semaphore:
+                    return await self.backend.generate(prompt)
+            except RateLimitError as e:
+                self.rate_limited += 1
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter, never sooner than the provider asked for
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if e.retry_after:
+                    delay = max(delay, e.retry_after)
+                print(f"[ASYNC TRANSLATOR] 429, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                self.bucket.pause(delay)
+                attempt += 1
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        with AsyncTranslatorClient._lock:
+            if AsyncTranslatorClient._instance is self:
+                AsyncTranslatorClient._instance = None
+
+    @classmethod
+    def reset(cls):
+        """
+        Stops the shared client if there is one; the next AsyncTranslatorClient() builds a new one
+        (tests plug their own backend this way).
+        """
+        with cls._lock:
+            instance = cls._instance
+        if instance is not None:
+            instance.shutdown()
@@ -0,0 +1,233 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Tuple, Optional
+
+from services.async_translator import AsyncTranslatorClient
+from services.translator import TranslatorService, PROMPT_RULES
+from services import registry
+from services.translation_protocol import format_items, parse_response, extract_translations, request_by_id
+
+# Estimated source tokens per chapter request (pages are never split across requests)
+CHAPTER_TOKEN_BUDGET = int(os.getenv("CHAPTER_TOKEN_BUDGET", "2500"))
+# How long a ready page waits for the next consecutive page before its request goes out anyway
+CHAPTER_WAIT_MS = int(os.getenv("CHAPTER_WAIT_MS", "3000"))
+CHAPTER_SUMMARY_CHARS = 800
+CHAPTER_GLOSSARY_MAX = 60
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for Latin scripts + the id tag/JSON overhead per line
+    return len(text) // 4 + 8
+
+
+def bubble_id(page_index: int, bubble_index: int) -> str:
+    return f"p{page_index}.b{bubble_index}"
+
+
+class ChapterTranslator:
+    """
+    Chapter mode: pages of one upload batch are translated together.
+    Workers submit each page's OCR texts as soon as they have them; consecutive
+    pages are packed into one request up to CHAPTER_TOKEN_BUDGET, every bubble
+    tagged with a strict id (p<page>.b<bubble>) so the JSON answer maps back
+    per page and per bubble. Each request carries a rolling summary and glossary
+    returned by the previous one, so requests run in page order on one thread.
+    `max_in_flight` is how many pages can be waiting at once (the pipeline workers
+    block on their page's future): once that many are queued nothing else can
+    arrive, so the request goes out without waiting.
+    """
+    def __init__(self, total_pages: int, target_lang: str = 'es', token_budget: int = CHAPTER_TOKEN_BUDGET,
+                 max_wait_ms: int = CHAPTER_WAIT_MS, translator: Optional[TranslatorService] = None,
+                 max_in_flight: Optional[int] = None):
+        self.total_pages = total_pages
+        self.token_budget = token_budget
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_in_flight = max_in_flight
+        self.translator = translator or registry.translator(target_lang)
+        self.summary = ""
+        self.glossary = OrderedDict() # source term -> translation
+        self.requests = 0
+        self._pages = {} # page_index -> (texts, future, arrived_at)
+        self._done = set() # translated or skipped page indices
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit_page(self, page_index: int, texts: List[str]) -> Future:
+        """
+        Queues a page's texts. Returns a Future with (translations, provider).
+        """
+        future = Future()
+        if not texts or not any(t.strip() for t in texts):
+            future.set_result(([""] * len(texts), "None"))
+            self.skip(page_index)
+            return future
+
+        with self._cond:
+            self._pages[page_index] = (list(texts), future, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="chapter-translator", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def skip(self, page_index: int):
+        """
+        The page will not be submitted (cache hit, failure, no text): don't wait for it.
+        """
+        with self._cond:
+            if page_index not in self._pages:
+                self._done.add(page_index)
+                self._cond.notify()
+
+    # --- Scheduling ---
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    chunk, timeout = self._take_chunk()
+                    if chunk:
+                        break
+                    if not self._pages and len(self._done) >= self.total_pages:
+                        self._thread = None
+                        return
+                    self._cond.wait(timeout)
+            self._translate_chunk(chunk)
+
+    def _take_chunk(self) -> Tuple[list, Optional[float]]:
+        """
+        Next run of consecutive ready pages within the token budget, or ([], seconds to wait).
+        Caller holds the lock.
+        """
+        if not self._pages:
+            return [], None
+        start = min(self._pages)
+        chunk, tokens, index = [], 0, start
+        while index < self.total_pages:
+            if index in self._done:
+                index += 1
+                continue
+            if index not in self._pages:
+                break
+            page_tokens = sum(estimate_tokens(t) for t in self._pages[index][0] if t.strip())
+            if chunk and tokens + page_tokens > self.token_budget:
+                return self._pop(chunk), None # Budget full
+            chunk.append(index)
+            tokens += page_tokens
+            index += 1
+
+        # Run ends at the chapter end, or at a page that isn't ready yet: wait a bit for it
+        # (bounded, workers block on their page's future after inpainting) unless every
+        # worker already holds a queued page and the next one cannot arrive
+        waited = time.monotonic() - min(self._pages[i][2] for i in chunk)
+        workers_blocked = self.max_in_flight is not None and len(self._pages) >= self.max_in_flight
+        if index >= self.total_pages or waited >= self.max_wait or workers_blocked:
+            return self._pop(chunk), None
+        return [], self.max_wait - waited
+
+    def _pop(self, indices: List[int]) -> list:
+        chunk = []
+        for index in indices:
+            texts, future, _ = self._pages.pop(index)
+            self._done.add(index)
+            chunk.append((index, texts, future))
+        return chunk
+
+    # --- Translation ---
+
+    def _translate_chunk(self, chunk: list):
+        pages = [index for index, _, _ in chunk]
+        try:
+            # Translation memory first (keyed on the chapter backend's model), only pending lines go to the LLM
+            model_id = AsyncTranslatorClient().model_id
+            plan = []
+            items = []
+            for index, texts, future in chunk:
+                results, pending = self.translator.memory_lookup(texts, model_id)
+                plan.append((index, texts, future, results, pending))
+                items.extend((bubble_id(index, j), texts[j]) for j in pending)
+
+            translated, provider = {}, "Translation Memory"
+            if items:
+                translated, provider = self._request(items)
+
+            for index, texts, future, results, pending in plan:
+                pending_texts = [texts[j] for j in pending]
+                translations = [translated.get(bubble_id(index, j)) for j in pending]
+                missing = [k for k, t in enumerate(translations) if t is None]
+                page_provider = provider if pending else "Translation Memory"
+                if missing:
+                    # Still missing after the id retries / halving: translate those lines on their own
+                    print(f"[CHAPTER] Page {index}: {len(missing)} lines falling back to individual translation")
+                    for k in missing:
+                        translations[k] = self.translator.translate(pending_texts[k])[0]
+                    page_provider = "Gemini Flash (Partial Fallback)"
+                learned = set(range(len(pending))) - set(missing)
+                future.set_result(self.translator.memory_merge(results, pending, pending_texts, translations,
+                                                               page_provider, learned, model_id))
+        except Exception as e:
+            print(f"[CHAPTER ERROR] Pages {pages}: {e}. Falling back to page-level translation")
+            for index, texts, future in chunk:
+                if future.done():
+                    continue
+                try:
+                    future.set_result(self.translator.translate_batch_with_context(texts))
+                except Exception as page_error:
+                    future.set_exception(page_error)
+
+    def _request(self, items: List[Tuple[str, str]]) -> Tuple[Dict[str, str], str]:
+        client = AsyncTranslatorClient()
+        if not client.available:
+            raise RuntimeError("No LLM backend available for chapter mode")
+
+        async def send(batch):
+            self.requests += 1
+            print(f"[CHAPTER] Request {self.requests}: {len(batch)} bubbles, glossary {len(self.glossary)} terms")
+            data = parse_response(await client.complete(self._build_prompt(batch)))
+            self._update_context(data)
+            return extract_translations(data)
+
+        # Missing ids are re-sent alone, unparsable replies split in halves (same protocol as page batches)
+        return client.run(request_by_id(items, send)).result(), client.provider
+
+    def _update_context(self, data: dict):
+        # Rolling context for the next request. Malformed context is ignored, the translations still count
+        if not isinstance(data, dict):
+            return
+        summary = data.get("summary")
+        if isinstance(summary, str) and summary.strip():
+            self.summary = summary.strip()[-CHAPTER_SUMMARY_CHARS:]
+        glossary = data.get("glossary")
+        if not isinstance(glossary, dict):
+            glossary = {}
+        for term, translation in glossary.items():
+            if not isinstance(translation, str):
+                continue
+            self.glossary[str(term)] = translation
+            self.glossary.move_to_end(str(term))
+        while len(self.glossary) > CHAPTER_GLOSSARY_MAX:
+            self.glossary.popitem(last=False)
+
+    def _build_prompt(self, items: List[Tuple[str, str]]) -> str:
+        glossary = "\n".join(f"- {term} -> {translation}" for term, translation in self.glossary.items()) or "(empty)"
+        return f"""Act as a professional comic book translator specialized in manga/comics.
+
+You are translating a whole chapter, a few pages at a time. Translate the dialogues below from English (or source language) to Spanish (Spain).
+
+STORY SO FAR:
+{self.summary or "(start of the chapter)"}
+
+GLOSSARY (names and recurring terms, reuse these translations):
+{glossary}
+
+{PROMPT_RULES}
+
+Dialogue ids are p<page>.b<bubble>, in reading order.
+{format_items(items)}
+
+Respond ONLY with a JSON object, no markdown:
+{{"translations": {{"<id>": "<translation>"}}, "summary": "<3 sentences: the story so far including these pages>", "glossary": {{"<source term>": "<translation>"}}}}
+Every id must appear exactly once. Never merge or split dialogues."""
@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+from typing import List, Optional
+from services.page_context import PageContext
+
+class ContourEngine:
+    """
+    Page-level bubble contour extraction.
+    Grayscale + blur are computed once per page (cached on the PageContext);
+    each bubble thresholds a view of that shared buffer, and polygons come back
+    as int32 numpy arrays of shape (N, 2) in page coordinates.
+    """
+    # Un contorno valido ocupa una porcion significativa del recuadro, pero no TODO
+    MIN_AREA_RATIO = 0.15
+    MAX_AREA_RATIO = 0.98
+    # Day 13: epsilon 0.002 para no recortar las esquinas de los cuadrados
+    EPSILON_RATIO = 0.002
+
+    def extract(self, page, bboxes: list) -> List[np.ndarray]:
+        """
+        Returns one polygon per bbox (empty (0, 2) array when nothing usable is found).
+        Accepts a PageContext or a BGR ndarray.
+        """
+        if not isinstance(page, PageContext):
+            page = PageContext(page)
+        if not bboxes:
+            return []
+
+        blurred = page.blurred_gray
+        polygons = []
+        for bbox in bboxes:
+            x1, y1, x2, y2 = page.clamp_bbox(bbox)
+            if x2 <= x1 or y2 <= y1:
+                polygons.append(self._empty())
+                continue
+
+            approx = self._roi_contour(blurred[y1:y2, x1:x2])
+            if approx is None:
+                polygons.append(self._empty())
+                continue
+
+            # Coordenadas globales en una sola operacion vectorial
+            polygons.append(approx.reshape(-1, 2) + np.array([x1, y1], dtype=np.int32))
+        return polygons
+
+    @staticmethod
+    def _empty() -> np.ndarray:
+        # A fresh array per bubble: callers may edit the polygons they get back
+        return np.empty((0, 2), dtype=np.int32)
+
+    def _roi_contour(self, roi: np.ndarray) -> Optional[np.ndarray]:
+        # Un solo Otsu: la mascara oscura es exactamente el complemento de la clara
+        # (THRESH_BINARY_INV con el mismo umbral), asi que basta con invertirla.
+        _, mask_light = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        mask_dark = cv2.bitwise_not(mask_light)
+
+        cnt_light, area_light = self._largest_contour(mask_light)
+        cnt_dark, area_dark = self._largest_contour(mask_dark)
+
+        roi_area = roi.shape[0] * roi.shape[1]
+        valid_light = self._is_valid(area_light, roi_area)
+        valid_dark = self._is_valid(area_dark, roi_area)
+
+        # Misma decision que el camino por burbuja: el mayor contorno valido,
+        # o el claro por defecto si ninguno lo es
+        if valid_light and not valid_dark:
+            candidate = cnt_light
+        elif valid_dark and not valid_light:
+            candidate = cnt_dark
+        elif valid_light and valid_dark:
+            candidate = cnt_light if area_light > area_dark else cnt_dark
+        else:
+            candidate = cnt_light if cnt_light is not None else cnt_dark
+
+        if candidate is None:
+            return None
+
+        epsilon = self.EPSILON_RATIO * cv2.arcLength(candidate, True)
+        return cv2.approxPolyDP(candidate, epsilon, True)
+
+    @staticmethod
+    def _largest_contour(binary_mask: np.ndarray):
+        contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None, 0
+        largest = max(contours, key=cv2.contourArea)
+        return largest, cv2.contourArea(largest)
+
+    def _is_valid(self, area: float, roi_area: int) -> bool:
+        if roi_area == 0:
+            return False
+        ratio = area / roi_area
+        return self.MIN_AREA_RATIO < ratio < self.MAX_AREA_RATIO
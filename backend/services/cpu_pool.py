@@ -0,0 +1,187 @@
+import os
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, List, Tuple
+
+# Execution mode for CPU-bound stages: 'thread' (in-process) or 'process' (ProcessPoolExecutor)
+PIPELINE_EXECUTION = os.getenv("PIPELINE_EXECUTION", "thread")
+PIPELINE_CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", str(os.cpu_count() or 1)))
+
+# (shm name, shape, dtype str) - the only thing that gets pickled per page
+SharedRef = Tuple[str, tuple, str]
+
+
+class SharedPage:
+    """
+    numpy array backed by a SharedMemory segment.
+    The creating process owns the segment (close + unlink); workers only attach.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, shape: tuple, dtype, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, shape: tuple, dtype=np.uint8) -> "SharedPage":
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        return cls(shm, shape, dtype, owner=True)
+
+    @classmethod
+    def from_array(cls, arr: np.ndarray) -> "SharedPage":
+        page = cls.create(arr.shape, arr.dtype)
+        page.array[...] = arr
+        return page
+
+    @classmethod
+    def attach(cls, ref: SharedRef) -> "SharedPage":
+        name, shape, dtype = ref
+        return cls(_attach_segment(name), shape, np.dtype(dtype), owner=False)
+
+    @property
+    def ref(self) -> SharedRef:
+        return (self.shm.name, tuple(self.array.shape), self.array.dtype.str)
+
+    def close(self):
+        # Drop the view before closing, otherwise the buffer is still exported
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    # Before Python 3.13 attaching registers the segment with the resource tracker,
+    # which would unlink it behind the owner's back when the worker exits.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+# --- WORKER SIDE (module level so they can be pickled) ---
+
+def _init_worker():
+    """
+    Runs once per worker process: pin native libs to one thread (the pool is
+    the parallelism) and load models so every task reuses them.
+    """
+    import cv2
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    from services.inpainting import TextRemover
+    try:
+        TextRemover()
+    except Exception as e:
+        print(f"[CPU POOL] Worker {os.getpid()} could not load inpainting model: {e}")
+    print(f"[CPU POOL] Worker {os.getpid()} ready")
+
+
+def _contours_stage(page_ref: SharedRef, bboxes: list) -> list:
+    from services.detector import BubbleDetector
+    page = SharedPage.attach(page_ref)
+    try:
+        return BubbleDetector.extract_contours(page.array, bboxes)
+    finally:
+        page.close()
+
+
+def _inpaint_stage(page_ref: SharedRef, out_ref: SharedRef, bubbles: list, fast_mode: bool) -> bool:
+    from services.inpainting import TextRemover
+    page = SharedPage.attach(page_ref)
+    out = SharedPage.attach(out_ref)
+    try:
+        result = TextRemover().inpaint_image(page.array, bubbles, fast_mode=fast_mode)
+        if result is None:
+            return False
+        out.array[...] = result
+        return True
+    finally:
+        page.close()
+        out.close()
+
+
+def _render_stage(page_ref: SharedRef, out_ref: SharedRef, bubbles: list) -> bool:
+    from PIL import Image
+    from services import registry
+    page = SharedPage.attach(page_ref)
+    out = SharedPage.attach(out_ref)
+    try:
+        # Shared buffers are BGR (OpenCV convention), Pillow works in RGB
+        rendered = registry.renderer().render_image(Image.fromarray(page.array[:, :, ::-1]), bubbles)
+        out.array[...] = np.asarray(rendered)[:, :, ::-1]
+        return True
+    finally:
+        page.close()
+        out.close()
+
+
+# --- PARENT SIDE ---
+
+class CpuStagePool:
+    """
+    Runs the CPU-bound pipeline stages (contours, text removal, rendering) in a
+    ProcessPoolExecutor so pages are not serialized on the GIL.
+    Page pixels travel through shared memory; only refs and bubble dicts are pickled.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, workers: int = PIPELINE_CPU_WORKERS):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(CpuStagePool, cls).__new__(cls)
+                cls._instance.workers = max(1, workers)
+                # spawn, not fork: created lazily from a pipeline thread once torch/uvicorn threads are running
+                cls._instance.executor = ProcessPoolExecutor(max_workers=cls._instance.workers, initializer=_init_worker,
+                                                             mp_context=multiprocessing.get_context("spawn"))
+                print(f"[CPU POOL] Started {cls._instance.workers} worker processes")
+        return cls._instance
+
+    def extract_contours(self, img: np.ndarray, bboxes: list) -> List[list]:
+        with SharedPage.from_array(img) as page:
+            return self.executor.submit(_contours_stage, page.ref, bboxes).result()
+
+    def inpaint(self, img: np.ndarray, bubbles: list, fast_mode: bool = True) -> Optional[np.ndarray]:
+        with SharedPage.from_array(img) as page, SharedPage.create(img.shape, img.dtype) as out:
+            ok = self.executor.submit(_inpaint_stage, page.ref, out.ref, bubbles, fast_mode).result()
+            return out.array.copy() if ok else None
+
+    def render(self, img: np.ndarray, bubbles: list) -> np.ndarray:
+        with SharedPage.from_array(img) as page, SharedPage.create(img.shape, img.dtype) as out:
+            self.executor.submit(_render_stage, page.ref, out.ref, bubbles).result()
+            return out.array.copy()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        CpuStagePool._instance = None
+
+
+def get_cpu_pool() -> Optional[CpuStagePool]:
+    """
+    Returns the shared process pool when PIPELINE_EXECUTION=process, else None
+    (stages run in the calling thread as before).
+    """
+    if PIPELINE_EXECUTION != "process":
+        return None
+    return CpuStagePool()
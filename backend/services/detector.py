@@ -2,6 +2,9 @@ from ultralytics import YOLO
 import cv2
 import os
 import numpy as np
+from services.page_context import PageContext
+from services.image_io import write_artifact
+from services.contours import ContourEngine
 
 class BubbleDetector:
     _instance = None
@@ -22,47 +25,76 @@ class BubbleDetector:
         print(f"Loading YOLO model from {model_path}...")
         self._model = YOLO(model_path)
     
-    def detect(self, image_path: str):
+    def detect(self, page, with_contours: bool = True):
         """
         Detecta bocadillos en una imagen.
+        Acepta un PageContext (imagen ya decodificada) o una ruta.
         Retorna la imagen procesada con cajas y la lista de cajas.
+        with_contours=False deja 'polygon' vacio (se calcula fuera, p.ej. en el pool de procesos).
+        """
+        return self.detect_batch([page], with_contours=with_contours)[0]
+
+    def detect_batch(self, pages: list, with_contours: bool = True):
+        """
+        Detecta bocadillos en varias paginas con una sola pasada de YOLO.
+        Acepta PageContexts o rutas. Devuelve una lista de cajas por pagina, en el mismo orden.
         """
         if self._model is None:
             self.load_model()
-        
-        # Leemos la imagen original para procesarla despues (OpenCV Segmentation)
-        original_img = cv2.imread(image_path)
-        
-        print(f"Running inference on {image_path}...")
-        # Usar modelo de deteccion, umbral normal
-        results = self._model(image_path, conf=0.20)
-        
+        if not pages:
+            return []
+
+        # Imagenes originales para procesarlas despues (OpenCV Segmentation)
+        pages = [p if isinstance(p, PageContext) else PageContext(cv2.imread(p), path=p) for p in pages]
+
+        print(f"Running inference on {len(pages)} page(s)...")
+        # Usar modelo de deteccion, umbral normal (YOLO acepta los arrays BGR directamente)
+        results = self._model([p.image for p in pages], conf=0.20)
+
+        boxes_per_page = [self._parse_result(result) for result in results]
+        if with_contours:
+            # Generar Mascara Algoritmica (Hybrid Approach), una pasada por pagina
+            for page, boxes_data in zip(pages, boxes_per_page):
+                polygons = self.extract_contours(page, [b['bbox'] for b in boxes_data])
+                for box, polygon in zip(boxes_data, polygons):
+                    box['polygon'] = polygon
+        return boxes_per_page
+
+    def _parse_result(self, result):
         # Procesar resultados
         boxes_data = []
-        result = results[0] 
         
         for box in result.boxes:
             x1, y1, x2, y2 = box.xyxy[0].tolist()
             conf = box.conf[0].item()
             cls = box.cls[0].item()
-            
-            # Generar Mascara Algoritmica (Hybrid Approach)
-            polygon = self._get_bubble_contour(original_img, [x1, y1, x2, y2])
 
             boxes_data.append({
                 "bbox": [x1, y1, x2, y2],
                 "confidence": conf,
                 "class": cls,
-                "polygon": polygon
+                "polygon": []
             })
 
         print(f"Detected {len(boxes_data)} bubbles.")
         return boxes_data
 
-    def _get_bubble_contour(self, img, bbox):
+    @staticmethod
+    def extract_contours(page, bboxes):
+        """
+        Calcula los poligonos de una lista de cajas sin necesitar el modelo YOLO.
+        Acepta un PageContext o un array BGR. Devuelve arrays int32 (N, 2).
+        Usado tambien por los workers del pool de procesos.
+        """
+        return ContourEngine().extract(page, bboxes)
+
+    @staticmethod
+    def _get_bubble_contour(img, bbox):
         """
         Genera un poligono ajustado usando OpenCV.
         Intenta detectar tanto burbujas claras (fondo oscuro) como oscuras (fondo claro).
+        Camino antiguo por burbuja (listas de listas); se mantiene como referencia
+        para bench_contours.py. El pipeline usa ContourEngine.
         """
         x1, y1, x2, y2 = map(int, bbox)
         h, w = img.shape[:2]
@@ -154,13 +186,18 @@ class BubbleDetector:
             
         return global_contour
 
-    def draw_boxes(self, image_path: str, boxes_data: list, output_path: str):
+    def draw_boxes(self, page, boxes_data: list, output_path: str):
         """
         Dibuja poligonos y cajas.
+        Acepta un PageContext o una ruta.
         """
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not read image {image_path}")
+        if isinstance(page, PageContext):
+            # Copia: no tocar la imagen compartida por el resto del pipeline
+            img = page.image.copy()
+        else:
+            img = cv2.imread(page)
+            if img is None:
+                raise ValueError(f"Could not read image {page}")
             
         overlay = img.copy()
 
@@ -168,7 +205,7 @@ class BubbleDetector:
             x1, y1, x2, y2 = map(int, item['bbox'])
             
             # Dibujar Poligono
-            if item.get('polygon') and len(item['polygon']) > 0:
+            if item.get('polygon') is not None and len(item['polygon']) > 0:
                 pts = np.array(item['polygon'], np.int32)
                 pts = pts.reshape((-1, 1, 2))
                 color = (255, 100, 0) # Azul
@@ -185,5 +222,5 @@ class BubbleDetector:
         alpha = 0.4
         cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
             
-        cv2.imwrite(output_path, img)
+        write_artifact(output_path, img)
         return output_path
@@ -0,0 +1,47 @@
+from bs4 import BeautifulSoup
+from deep_translator import GoogleTranslator
+from deep_translator.exceptions import RequestError, TooManyRequests, TranslationNotFound
+from deep_translator.validate import is_empty, is_input_valid, request_failed
+
+
+class PooledGoogleTranslator(GoogleTranslator):
+    """
+    deep_translator's GoogleTranslator sending its requests through a shared
+    requests.Session (keep-alive connection pool) instead of a bare
+    requests.get, which opens a new connection for every line.
+    Same parsing as GoogleTranslator.translate of deep-translator 1.11.4 (pinned in
+    requirements.txt: this relies on its internals).
+    """
+    def __init__(self, session, source: str = 'auto', target: str = 'en', **kwargs):
+        super().__init__(source=source, target=target, **kwargs)
+        self.session = session
+
+    def translate(self, text: str, **kwargs) -> str:
+        is_input_valid(text, max_chars=5000) # Raises on non-string / too long input
+        text = text.strip()
+        if self._same_source_target() or is_empty(text):
+            return text
+        self._url_params["tl"] = self._target
+        self._url_params["sl"] = self._source
+        self._url_params[self.payload_key] = text
+
+        # Closing the response (every path) hands the connection back to the pool
+        with self.session.get(self._base_url, params=self._url_params, proxies=self.proxies) as response:
+            if response.status_code == 429:
+                raise TooManyRequests()
+            if request_failed(status_code=response.status_code):
+                raise RequestError()
+            soup = BeautifulSoup(response.text, "html.parser")
+
+        element = soup.find(self._element_tag, self._element_query) or soup.find(self._element_tag, self._alt_element_query)
+        if not element:
+            raise TranslationNotFound(text)
+
+        translated = element.get_text(strip=True)
+        if translated == text and "hl" in self._url_params:
+            # Google echoed the input: retry once without the interface language hint
+            to_alpha = "".join(ch for ch in text if ch.isalnum())
+            if to_alpha and to_alpha == "".join(ch for ch in translated if ch.isalnum()):
+                del self._url_params["hl"]
+                return self.translate(text)
+        return translated
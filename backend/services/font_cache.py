@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Sequence, Tuple
+from PIL import ImageFont
+
+# (path, size) fonts kept loaded by the renderer (every size tried while fitting counts)
+FONT_CACHE_SIZE = int(os.getenv("FONT_CACHE_SIZE", "256"))
+# Distinct words whose metrics are remembered per font
+FONT_METRICS_WORDS = int(os.getenv("FONT_METRICS_WORDS", "4096"))
+
+
+class FontMetrics:
+    """
+    Cached per-word measurements of one font: advance width plus the ink box.
+    The width of a line of words is then
+        advances(words[:-1]) + spaces + right(last) - left(first)
+    and its height max(bottom) - min(top), which match textbbox exactly with
+    Pillow's basic layout (no kerning across spaces). With Raqm (shaping)
+    `exact` is False and the line itself is measured.
+    """
+    def __init__(self, font, max_words: int = FONT_METRICS_WORDS):
+        self.font = font
+        self.max_words = max_words
+        self.space = font.getlength(" ")
+        self.exact = getattr(font, "layout_engine", ImageFont.Layout.BASIC) == ImageFont.Layout.BASIC
+        self._words = OrderedDict() # word -> (advance, left, top, right, bottom), oldest first
+        self._lock = threading.Lock() # Layout may run on a thread pool
+
+    def word(self, word: str) -> Tuple[float, ...]:
+        with self._lock:
+            m = self._words.get(word)
+            if m is not None:
+                self._words.move_to_end(word)
+                return m
+        m = (self.font.getlength(word), *self.font.getbbox(word))
+        with self._lock:
+            self._words[word] = m
+            # LRU: dropping only the least recently used words keeps the hit rate on long chapters
+            while len(self._words) > self.max_words:
+                self._words.popitem(last=False)
+        return m
+
+    def line_width(self, words: Sequence[str]) -> float:
+        """
+        Ink width of ' '.join(words) (same as textbbox[2] - textbbox[0]).
+        """
+        if not words:
+            return 0
+        if not self.exact:
+            left, _, right, _ = self.font.getbbox(' '.join(words))
+            return right - left
+        advance = sum(self.word(w)[0] for w in words[:-1]) + self.space * (len(words) - 1)
+        return advance + self.word(words[-1])[3] - self.word(words[0])[1]
+
+    def line_height(self, words: Sequence[str]) -> float:
+        """
+        Ink height of ' '.join(words) (same as textbbox[3] - textbbox[1]).
+        """
+        if not words:
+            return 0
+        if not self.exact:
+            _, top, _, bottom = self.font.getbbox(' '.join(words))
+            return bottom - top
+        boxes = [self.word(w) for w in words]
+        return max(b[4] for b in boxes) - min(b[2] for b in boxes)
+
+    def ink_offset(self, words: Sequence[str]) -> Tuple[float, float]:
+        """
+        Top-left of the ink of ' '.join(words) relative to the drawing origin
+        (same as textbbox[:2]).
+        """
+        if not words:
+            return 0, 0
+        if not self.exact:
+            return self.font.getbbox(' '.join(words))[:2]
+        return self.word(words[0])[1], min(self.word(w)[2] for w in words)
+
+    def fit_words(self, words: Sequence[str], start: int, max_width: float) -> int:
+        """
+        Greedy line break: end index such that words[start:end] fits in max_width
+        and words[start:end + 1] does not. One pass over the words (the pen
+        position is carried along instead of re-measuring the growing line).
+        """
+        end = start
+        if not self.exact:
+            while end < len(words) and self.line_width(words[start:end + 1]) <= max_width:
+                end += 1
+            return end
+        left = self.word(words[start])[1] if start < len(words) else 0
+        pen = 0
+        while end < len(words):
+            advance, _, _, right, _ = self.word(words[end])
+            if pen + right - left > max_width:
+                break
+            pen += advance + self.space
+            end += 1
+        return end
+
+
+class ScaledMetrics(FontMetrics):
+    """
+    Estimate of a font's metrics at another size, scaled linearly from a measured
+    size (ignores hinting, so it is only good for guesses: the font fitting uses
+    it to pick which sizes to measure for real).
+    """
+    def __init__(self, base: FontMetrics, size: float):
+        self.base = base
+        self.scale = size / base.font.size
+        self.space = base.space * self.scale
+        self.exact = True
+
+    def word(self, word: str) -> Tuple[float, ...]:
+        return tuple(v * self.scale for v in self.base.word(word))
+
+
+class FontCache:
+    """
+    Process-wide LRU of TrueType fonts keyed by (path, size), each with its
+    FontMetrics. Paths that fail to load are remembered too, so the renderer's
+    fallback chain does not hit the disk on every size it tries.
+    """
+    _instance = None
+    _lock = threading.Lock()
+    _MISSING = object()
+
+    def __new__(cls, max_fonts: int = FONT_CACHE_SIZE):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(FontCache, cls).__new__(cls)
+                cls._instance.max_fonts = max(1, max_fonts)
+                cls._instance._fonts = OrderedDict() # (path, size) -> FontMetrics | _MISSING
+                cls._instance.hits = 0
+                cls._instance.misses = 0
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        Forgets every loaded font (tests, or after changing FONT_CACHE_SIZE).
+        """
+        with cls._lock:
+            cls._instance = None
+
+    def font(self, path: str, size: int):
+        """
+        Same as ImageFont.truetype(path, size) (raises OSError), but cached.
+        """
+        return self._entry(path, size).font
+
+    def metrics(self, font) -> FontMetrics:
+        """
+        FontMetrics of a font returned by font(); other fonts get uncached metrics.
+        """
+        key = (getattr(font, "path", None), getattr(font, "size", None))
+        with self._lock:
+            entry = self._fonts.get(key)
+        if isinstance(entry, FontMetrics) and entry.font is font:
+            return entry
+        return FontMetrics(font)
+
+    def _entry(self, path, size) -> FontMetrics:
+        key = (path, size)
+        with self._lock:
+            entry = self._fonts.get(key)
+            if entry is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            try:
+                entry = FontMetrics(ImageFont.truetype(path, size))
+            except OSError:
+                entry = self._MISSING
+            with self._lock:
+                self.misses += 1
+                entry = self._fonts.setdefault(key, entry)
+                while len(self._fonts) > self.max_fonts:
+                    self._fonts.popitem(last=False)
+        if entry is self._MISSING:
+            raise OSError(f"cannot open font {path}")
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self.hits = self.misses = 0
@@ -0,0 +1,142 @@
+import os
+import shutil
+import threading
+import cv2
+import numpy as np
+from typing import Optional
+
+# Delivered artifacts (clean / final / debug pages): encoded once, with this codec and quality
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "jpeg").lower() # jpeg | webp | png
+OUTPUT_QUALITY = int(os.getenv("OUTPUT_QUALITY", "95"))
+# Internal copies re-read later (e.g. the clean page for the editor): lossless
+INTERMEDIATE_FORMAT = os.getenv("INTERMEDIATE_FORMAT", "png").lower() # png | npy
+INTERMEDIATE_PNG_COMPRESSION = int(os.getenv("INTERMEDIATE_PNG_COMPRESSION", "1"))
+INTERMEDIATE_DIR = os.getenv("INTERMEDIATE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "intermediate"))
+# Disk budget of the intermediates: oldest pages are evicted first (the editor then
+# falls back to the delivered clean page)
+INTERMEDIATE_MAX_BYTES = int(os.getenv("INTERMEDIATE_MAX_MB", "2048")) * 1024 * 1024
+
+OUTPUT_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+INTERMEDIATE_EXTENSIONS = {"png": ".png", "npy": ".npy"}
+
+_evict_lock = threading.Lock()
+
+
+def artifact_name(prefix: str, filename: str, ext: Optional[str] = None) -> str:
+    """
+    Name of a delivered artifact for an upload: prefix + stem + extension of
+    OUTPUT_FORMAT (or `ext`), e.g. final_<uuid>.jpg.
+    """
+    stem = os.path.splitext(filename)[0]
+    return f"{prefix}{stem}{ext or OUTPUT_EXTENSIONS.get(OUTPUT_FORMAT, '.jpg')}"
+
+
+def _encode_params(ext: str, quality: int) -> list:
+    if ext in (".jpg", ".jpeg"):
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if ext == ".webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    return []
+
+
+def write_artifact(path: str, img: np.ndarray, quality: int = OUTPUT_QUALITY) -> bool:
+    """
+    The one encode of a delivered image (BGR). Codec from the file extension.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    ok, buf = cv2.imencode(ext, img, _encode_params(ext, quality))
+    if not ok:
+        print(f"[IMAGE IO WARNING] Could not encode {path}")
+        return False
+    with open(path, "wb") as f:
+        f.write(buf)
+    return True
+
+
+def intermediate_path(name: str, fmt: str = None) -> str:
+    fmt = fmt or INTERMEDIATE_FORMAT
+    return os.path.join(INTERMEDIATE_DIR, f"{name}{INTERMEDIATE_EXTENSIONS.get(fmt, '.png')}")
+
+
+def write_intermediate(name: str, img: np.ndarray) -> str:
+    """
+    Lossless copy of a pipeline image (BGR) for stages that re-read it later:
+    raw .npy (memory-mapped on read) or PNG with low compression.
+    """
+    os.makedirs(INTERMEDIATE_DIR, exist_ok=True)
+    _remove_intermediate(name)
+    path = intermediate_path(name)
+    if path.endswith(".npy"):
+        np.save(path, np.ascontiguousarray(img))
+    else:
+        cv2.imwrite(path, img, [cv2.IMWRITE_PNG_COMPRESSION, INTERMEDIATE_PNG_COMPRESSION])
+    _evict_intermediates(keep=path)
+    return path
+
+
+def copy_intermediate(src: str, name: str) -> str:
+    """
+    Restores a stored intermediate (e.g. from the page cache) under `name`, same format.
+    """
+    os.makedirs(INTERMEDIATE_DIR, exist_ok=True)
+    _remove_intermediate(name)
+    path = os.path.join(INTERMEDIATE_DIR, f"{name}{os.path.splitext(src)[1]}")
+    shutil.copyfile(src, path)
+    _evict_intermediates(keep=path)
+    return path
+
+
+def _remove_intermediate(name: str):
+    # A copy in another format would shadow the new one in find_intermediate
+    path = find_intermediate(name)
+    while path:
+        os.remove(path)
+        path = find_intermediate(name)
+
+
+def _evict_intermediates(keep: str):
+    # Oldest written first, until the directory fits INTERMEDIATE_MAX_BYTES. Never the file just written.
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(INTERMEDIATE_DIR):
+            try:
+                if entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.path, st.st_size))
+            except OSError:
+                continue # Removed meanwhile
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= INTERMEDIATE_MAX_BYTES:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                print(f"[IMAGE IO] Evicted intermediate {os.path.basename(path)}")
+            except OSError:
+                pass
+            total -= size
+
+
+def find_intermediate(name: str) -> Optional[str]:
+    """
+    Path of a stored intermediate in any format (the setting may have changed), or None.
+    """
+    for fmt in INTERMEDIATE_EXTENSIONS:
+        path = intermediate_path(name, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_image(path: str) -> np.ndarray:
+    """
+    BGR image from an intermediate (.npy, memory-mapped) or any encoded image.
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read image {path}")
+    return img
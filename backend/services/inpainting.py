@@ -2,7 +2,23 @@ import torch
 import os
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+from services.page_context import PageContext
+from services.mask_tiles import tiles_from_rects, pad_to_multiple, blend_tile
+from services.text_mask import build_text_mask
+from services.lama_backends import load_lama, LAMA_BACKEND, LAMA_THREADS
+
+# Tiles per LaMa forward pass; tiles are grouped by padded size (multiple of LAMA_BUCKET px)
+LAMA_BATCH_SIZE = int(os.getenv("LAMA_BATCH_SIZE", "4"))
+LAMA_BUCKET = int(os.getenv("LAMA_BUCKET", "64"))
+# Fast mode: Telea runs on mask regions grown by TELEA_PAD px, not the full page.
+# TELEA_THREADS > 1 inpaints regions in parallel (cv2.inpaint releases the GIL)
+TELEA_RADIUS = 3
+TELEA_PAD = int(os.getenv("TELEA_PAD", "16"))
+TELEA_THREADS = int(os.getenv("TELEA_THREADS", "1"))
+
+_telea_pool = None
 
 class TextRemover:
     _instance = None
@@ -16,16 +32,16 @@ class TextRemover:
     def _initialize(self):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         print(f"Inpainting Service using device: {self.device}")
+        if LAMA_THREADS > 0:
+            torch.set_num_threads(LAMA_THREADS)
         
-        model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "big-lama.pt")
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"LaMa model not found at {model_path}")
-            
-        print(f"Loading LaMa model from {model_path}...")
+        # LAMA_BACKEND: torchscript | torchscript-opt | onnx | onnx-int8 (see lama_backends.py)
+        print(f"Loading LaMa model (backend: {LAMA_BACKEND})...")
         try:
-            self.model = torch.jit.load(model_path, map_location=self.device)
-            self.model.eval()
-            print("LaMa model loaded successfully.")
+            self.model, self.backend = load_lama(LAMA_BACKEND, self.device)
+            print(f"LaMa model loaded successfully ({self.backend}).")
+        except FileNotFoundError:
+            raise
         except Exception as e:
             print(f"Error loading LaMa model: {e}")
             self.model = None
@@ -36,152 +52,176 @@ class TextRemover:
         mask_mode='bubble': Borra todo el poligono del globo.
         mask_mode='text': Borra solo las cajas de palabras (word_boxes) dentro del globo.
         """
+        page = image_path if isinstance(image_path, PageContext) else PageContext(cv2.imread(image_path), path=image_path)
+        result_bgr = self.inpaint_image(page, bboxes, mask_mode=mask_mode, fast_mode=fast_mode)
+        if result_bgr is None:
+            return
+
+        cv2.imwrite(output_path, result_bgr)
+        return output_path
+
+    def inpaint_image(self, img_bgr, bboxes, mask_mode='bubble', fast_mode=False):
+        """
+        Version en memoria de remove_text: recibe un PageContext o un array BGR y devuelve un array BGR.
+        Devuelve None si el modelo no esta cargado o la inferencia falla.
+        """
         if self.model is None:
             print("Model not loaded, skipping inpainting.")
-            return
-            
-        # 1. Leer Imagen y crear Mascara
-        img = cv2.imread(image_path)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        h, w = img.shape[:2]
-        
-        mask = np.zeros((h, w), dtype=np.float32)
-        
-        for bubble in bboxes:
-            if mask_mode == 'text' and 'word_boxes' in bubble and bubble['word_boxes']:
-                # Modo Fino: Usar coordenadas de palabras
-                # OJO: Las word_boxes son relativas al crop (recorte) o absolutas?
-                # Revisar ocr.py. Vision devuelve absolutas si se le pasa la imagen entera,
-                # pero en main.py le pasamos el crop.
-                # IMPORTANTE: En main.py necesitamos ajustar coordenadas si son relativas al crop.
-                # ASUMIREMOS aqui que 'word_boxes' vienen ya en coordenadas de la imagen original.
-                for wb in bubble['word_boxes']:
-                    pts = np.array(wb, np.int32)
-                    cv2.fillPoly(mask, [pts], 1.0)
-            else:
-                # --- ESTRATEGIA: SOLO TEXTO (Adaptive) ---
-                # Objetivo: Crear mascara SOLO de las letras.
-                # 1. Analizar si el globo es claro (letras negras) u oscuro (letras blancas).
-                x1, y1, x2, y2 = map(int, bubble['bbox'])
-                    
-                # Clamp
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(w, x2), min(h, y2)
-                
-                if x2 > x1 and y2 > y1:
-                    roi = img[y1:y2, x1:x2]
-                    gray_roi = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
-                    
-                    # Determinar brillo medio
-                    mean_brightness = np.mean(gray_roi)
-                    
-                    text_mask_roi = None
-                    
-                    if mean_brightness > 100:
-                        # TIPO 1: Globo Claro (Fondo Blanco/Gris, Texto Oscuro)
-                        # Buscamos pixeles oscuros (< umbral)
-                        # Adaptive Threshold es mejor para iluminacion variable
-                        text_mask_roi = cv2.adaptiveThreshold(
-                            gray_roi, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                            cv2.THRESH_BINARY_INV, 21, 10
-                        )
-                    else:
-                        # TIPO 2: Globo Oscuro (Fondo Negro, Texto Blanco)
-                        # Buscamos pixeles claros (> umbral)
-                        # Invertimos la imagen para que el texto blanco sea negro, luego threshold inv
-                        # O simplemente threshold normal: Texto blanco (255) -> Mascara (255)
-                        _, text_mask_roi = cv2.threshold(gray_roi, 150, 255, cv2.THRESH_BINARY)
-                        
-                    # Limpieza Morfologica:
-                    # 1. Eliminar ruido diminuto (puntos) con OPEN
-                    # 2. Conectar letras rotas con DILATE
-                    kernel_clean = cv2.getStructuringElement(cv2.MORPH_RECT, (2,2))
-                    # Eliminar ruido
-                    text_mask_roi = cv2.morphologyEx(text_mask_roi, cv2.MORPH_OPEN, kernel_clean)
-                    
-                    # Asignar al mask global
-                    mask[y1:y2, x1:x2] = text_mask_roi.astype(np.float32) / 255.0
-                    
-                    # IMPORTANTE: Si por alguna razon la mascara esta vacia (no detecto texto),
-                    # hacemos fallback a borrar un rectangulo pequeño en el centro? 
-                    # No, mejor no borrar nada que borrarlo todo.
-                    if np.sum(text_mask_roi) < 10:
-                            print(f"[INPAINT WARNING] No text detected in bubble {x1},{y1}. Skipping mask.")
-                
-        # Dilatar mascara
-        # Para texto fino, dilatar menos. Para globo entero, dilatar un poco mas.
-        if mask_mode == 'text' or True: # Force precision mode always as requested
-             MASK_PADDING = 3 
-             iter_dil = 2 # Un poco mas para asegurar que cubre bordes de compresion JPG
-        else:
-             MASK_PADDING = 5
-             iter_dil = 1
-             
-        kernel = np.ones((MASK_PADDING, MASK_PADDING), np.uint8) 
-        mask = cv2.dilate(mask, kernel, iterations=iter_dil)
-        
+            return None
+
+        # 1. Preparar Imagen y crear Mascara (vista RGB cacheada si viene de un PageContext)
+        img = img_bgr.rgb if isinstance(img_bgr, PageContext) else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+        mask = self._build_mask(img, bboxes, mask_mode)
+
         # --- OPTIMIZATION 3: FAST MODE (OpenCV Telea) ---
         if fast_mode:
             print("[INPAINTING] Fast Mode enabled (OpenCV Telea)")
             try:
-                # cv2.inpaint requires uint8 mask
-                mask_8u = (mask * 255).astype(np.uint8)
                 # Radius 3 is a good balance
-                inpainted = cv2.inpaint(img, mask_8u, 3, cv2.INPAINT_TELEA)
-                
-                result_bgr = cv2.cvtColor(inpainted, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(output_path, result_bgr)
-                return output_path
+                inpainted = inpaint_telea(img, mask, TELEA_RADIUS)
+                return cv2.cvtColor(inpainted, cv2.COLOR_RGB2BGR)
             except Exception as e:
                 print(f"[INPAINTING] Fast mode failed: {e}. Falling back to LaMa.")
         # ------------------------------------------------
         
-        # 2. Preprocesar para LaMa
-        # Resize a multiplo de 8 
-        # (LaMa lo necesita para bajar/subir de resolucion en la red)
-        def pad_to_divisible(arr, divisor=8):
-            h, w = arr.shape[:2]
-            h_pad = (divisor - h % divisor) % divisor
-            w_pad = (divisor - w % divisor) % divisor
-            return np.pad(arr, ((0, h_pad), (0, w_pad), (0, 0)), mode='reflect') if arr.ndim == 3 else np.pad(arr, ((0, h_pad), (0, w_pad)), mode='reflect')
-
-        img_padded = pad_to_divisible(img)
-        mask_padded = pad_to_divisible(mask, 8)
-        
-        # Normalize 0-1 and Tensor conversion
-        img_tensor = torch.from_numpy(img_padded).permute(2, 0, 1).float().div(255.0).to(self.device)
-        mask_tensor = torch.from_numpy(mask_padded).unsqueeze(0).float().to(self.device)
-        
-        # Agregar batch dimension
-        img_tensor = img_tensor.unsqueeze(0)
-        mask_tensor = mask_tensor.unsqueeze(0)
-        
-        # 3. Inferencia
-        with torch.no_grad():
-            # La entrada de big-lama.pt suele ser (image, mask) o solo image concatenada
-            # Dependiendo de como se exporto. 
-            # El modelo estandar de LaMa espera img y mask por separado o concatenados.
-            # Probemos la firma comun: model(img, mask)
+        # 2. LaMa solo sobre los tiles con mascara (coste proporcional al area de texto)
+        return self._inpaint_masked([(img, mask)])[0]
+
+    def inpaint_pages(self, items, mask_mode='bubble'):
+        """
+        LaMa para varias paginas a la vez: [(PageContext o BGR, bubbles)] -> [BGR o None].
+        Los tiles de todas las paginas van juntos a inpaint_tiles (batches mas llenos).
+        """
+        if self.model is None:
+            print("Model not loaded, skipping inpainting.")
+            return [None] * len(items)
+        pages = []
+        for img_bgr, bboxes in items:
+            img = img_bgr.rgb if isinstance(img_bgr, PageContext) else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+            pages.append((img, self._build_mask(img, bboxes, mask_mode)))
+        return self._inpaint_masked(pages)
+
+    def _build_mask(self, img, bboxes, mask_mode):
+        """
+        SparseMask (ROIs uint8) del texto a borrar, ya dilatada. Ver services/text_mask.py.
+        """
+        return build_text_mask(img, bboxes, mask_mode)
+
+    def _inpaint_masked(self, pages):
+        """
+        [(img RGB, mask)] -> [BGR o None]. Recorta tiles con contexto alrededor de cada
+        region de mascara, los pasa por LaMa y los pega de vuelta solo donde hay mascara.
+        """
+        tiles = [tiles_from_rects(mask.rects, img.shape[1], img.shape[0]) for img, mask in pages]
+        pairs = [(img[y1:y2, x1:x2], mask.crop((x1, y1, x2, y2)))
+                 for (img, mask), page_tiles in zip(pages, tiles) for x1, y1, x2, y2 in page_tiles]
+        if pairs:
+            area = sum(m.size for _, m in pairs)
+            print(f"[INPAINTING] LaMa on {len(pairs)} tiles from {len(pages)} pages "
+                  f"({100.0 * area / sum(img.shape[0] * img.shape[1] for img, _ in pages):.1f}% of the pixels)")
+        results = self.inpaint_tiles(pairs) if pairs else []
+        if results is None:
+            return [None] * len(pages)
+
+        outputs, k = [], 0
+        for (img, _), page_tiles in zip(pages, tiles):
+            output = img.copy()
+            for rect in page_tiles:
+                blend_tile(output, results[k], pairs[k][1], rect)
+                k += 1
+            outputs.append(cv2.cvtColor(output, cv2.COLOR_RGB2BGR))
+        return outputs
+
+    def inpaint_tiles(self, pairs, batch_size=LAMA_BATCH_SIZE):
+        """
+        [(img_tile RGB uint8, mask_tile)] de cualquier numero de paginas -> [RGB uint8 del tamaño
+        de cada tile], en el mismo orden. Los tiles se agrupan por tamaño rellenado (multiplo de
+        LAMA_BUCKET) y cada grupo va en batches de batch_size. None si la inferencia falla.
+        """
+        buckets = {}
+        for index, (_, mask) in enumerate(pairs):
+            key = (_round_up(mask.shape[0], LAMA_BUCKET), _round_up(mask.shape[1], LAMA_BUCKET))
+            buckets.setdefault(key, []).append(index)
+
+        results = [None] * len(pairs)
+        for (bh, bw), indices in buckets.items():
+            for start in range(0, len(indices), batch_size):
+                batch = indices[start:start + batch_size]
+                imgs = np.stack([self._pad_to(pairs[i][0], bh, bw) for i in batch])
+                masks = np.stack([self._pad_to(pairs[i][1], bh, bw) for i in batch])
+                out = self._forward(imgs, masks)
+                if out is None:
+                    return None
+                # Scatter: crop back to each tile's size
+                for k, i in enumerate(batch):
+                    h, w = pairs[i][1].shape[:2]
+                    results[i] = out[k, :h, :w]
+        return results
+
+    def _forward(self, imgs, masks):
+        """
+        Un batch (N, H, W, 3) uint8 + (N, H, W) -> (N, H, W, 3) uint8.
+        """
+        # Normalize 0-1 and Tensor conversion (N, C, H, W)
+        img_tensor = torch.from_numpy(imgs).permute(0, 3, 1, 2).float().div(255.0).to(self.device)
+        mask_tensor = torch.from_numpy((masks > 0).astype(np.float32)).unsqueeze(1).to(self.device)
+
+        # 3. Inferencia (inference_mode: sin autograd ni version counters)
+        with torch.inference_mode():
             try:
-                # Inpaint
                 inpainted = self.model(img_tensor, mask_tensor)
-                
                 # A veces devuelve una lista o tupla
                 if isinstance(inpainted, (list, tuple)):
                     inpainted = inpainted[0]
-                    
             except Exception as e:
                 print(f"Inference error: {e}")
-                return
+                return None
 
         # 4. Postprocesar
-        result_tensor = inpainted[0].permute(1, 2, 0).cpu().numpy()
-        result_tensor = np.clip(result_tensor * 255, 0, 255).astype(np.uint8)
-        
-        # Crop back to original size
-        result_img = result_tensor[:h, :w]
-        
-        # Guardar
-        result_bgr = cv2.cvtColor(result_img, cv2.COLOR_RGB2BGR)
-        cv2.imwrite(output_path, result_bgr)
-        return output_path
+        return np.clip(inpainted.permute(0, 2, 3, 1).cpu().numpy() * 255, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def _pad_to(arr, h, w):
+        arr = pad_to_multiple(arr)
+        if arr.shape[0] == h and arr.shape[1] == w:
+            return arr
+        pad = ((0, h - arr.shape[0]), (0, w - arr.shape[1])) + ((0, 0),) * (arr.ndim - 2)
+        return np.pad(arr, pad, mode='reflect')
+
+
+def _round_up(value, multiple):
+    return -(-value // multiple) * multiple
+
+
+def inpaint_telea(img, mask, radius=TELEA_RADIUS, pad=TELEA_PAD, threads=TELEA_THREADS):
+    """
+    cv2 Telea limitado a regiones: cada region de la SparseMask crece `pad` px
+    (>= radius, asi Telea ve los mismos vecinos que en pagina completa), las que se
+    solapan se fusionan, y solo los pixeles con mascara se pegan de vuelta.
+    Coste proporcional al area de texto, no al tamaño de la pagina. img RGB/BGR uint8.
+    """
+    output = img.copy()
+    if not mask:
+        return output
+    h, w = img.shape[:2]
+    regions = tiles_from_rects(mask.rects, w, h, pad=max(pad, radius + 1), align=1)
+
+    def inpaint_region(rect):
+        x1, y1, x2, y2 = rect
+        region_mask = mask.crop(rect)
+        return rect, region_mask, cv2.inpaint(img[y1:y2, x1:x2], region_mask, radius, cv2.INPAINT_TELEA)
+
+    if threads > 1 and len(regions) > 1:
+        results = _get_telea_pool(threads).map(inpaint_region, regions)
+    else:
+        results = map(inpaint_region, regions)
+    for rect, region_mask, result in results:
+        blend_tile(output, result, region_mask, rect)
+    return output
+
+
+def _get_telea_pool(threads):
+    global _telea_pool
+    if _telea_pool is None:
+        _telea_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="telea")
+    return _telea_pool
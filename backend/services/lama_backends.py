@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import torch
+
+# LaMa runtime:
+#   'torchscript'     big-lama.pt as is (float32)
+#   'torchscript-opt' frozen + torch.jit.optimize_for_inference (conv/bn folding, oneDNN on CPU)
+#   'onnx'            big-lama.onnx on ONNX Runtime with full graph optimizations
+#   'onnx-int8'       big-lama.int8.onnx (dynamic int8 quantization of the ONNX export)
+# ONNX files come from export_lama_onnx.py; onnxruntime is an optional dependency.
+LAMA_BACKEND = os.getenv("LAMA_BACKEND", "torchscript")
+LAMA_THREADS = int(os.getenv("LAMA_THREADS", "0"))
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+BACKEND_FILES = {
+    "torchscript": "big-lama.pt",
+    "torchscript-opt": "big-lama.pt",
+    "onnx": "big-lama.onnx",
+    "onnx-int8": "big-lama.int8.onnx",
+}
+
+
+def load_torchscript(path: str, device, optimize: bool = False):
+    model = torch.jit.load(path, map_location=device)
+    model.eval()
+    if optimize:
+        # Freezing inlines weights as constants so conv+bn folding and oneDNN layouts apply
+        model = torch.jit.optimize_for_inference(torch.jit.freeze(model))
+    return model
+
+
+class OnnxLama:
+    """
+    ONNX Runtime session behind the same call signature as the TorchScript model:
+    model(img (N,3,H,W) float 0-1, mask (N,1,H,W)) -> torch tensor (N,3,H,W).
+    Input/output names are read from the session (exports name them differently).
+    """
+    def __init__(self, path: str, threads: int = LAMA_THREADS):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.output_name = self.session.get_outputs()[0].name
+
+    def __call__(self, img_tensor, mask_tensor):
+        feeds = dict(zip(self.input_names, (img_tensor.cpu().numpy(), mask_tensor.cpu().numpy().astype(np.float32))))
+        return torch.from_numpy(self.session.run([self.output_name], feeds)[0])
+
+
+def load_lama(backend: str = LAMA_BACKEND, device=None, models_dir: str = MODELS_DIR):
+    """
+    Returns (model, backend actually loaded). An optimized backend that can't load
+    (missing export, no onnxruntime) falls back to plain TorchScript.
+    """
+    device = device or torch.device('cpu')
+    if backend not in BACKEND_FILES:
+        print(f"[LAMA] Unknown LAMA_BACKEND '{backend}', using torchscript")
+        backend = "torchscript"
+
+    path = os.path.join(models_dir, BACKEND_FILES[backend])
+    if backend != "torchscript":
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} not found")
+            if backend.startswith("onnx"):
+                return OnnxLama(path), backend
+            return load_torchscript(path, device, optimize=True), backend
+        except Exception as e:
+            print(f"[LAMA] Backend '{backend}' unavailable ({e}), using torchscript")
+            path = os.path.join(models_dir, BACKEND_FILES["torchscript"])
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"LaMa model not found at {path}")
+    return load_torchscript(path, device), "torchscript"
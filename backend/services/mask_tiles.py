@@ -0,0 +1,102 @@
+import os
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+# Context kept around each masked region so LaMa sees enough of the surrounding art
+LAMA_TILE_PAD = int(os.getenv("LAMA_TILE_PAD", "64"))
+# LaMa downsamples 3 times: tile sides must be multiples of 8
+LAMA_ALIGN = 8
+
+Rect = Tuple[int, int, int, int] # x1, y1, x2, y2 (exclusive)
+
+
+def find_tiles(mask: np.ndarray, pad: int = LAMA_TILE_PAD, align: int = LAMA_ALIGN) -> List[Rect]:
+    """
+    Padded rectangles covering every masked pixel, with overlapping tiles merged.
+    Dilating the mask by `pad` first joins the letters of a bubble (and bubbles
+    closer than 2*pad) into one connected component, so components are already tiles.
+    """
+    h, w = mask.shape[:2]
+    binary = (mask > 0).astype(np.uint8)
+    if not binary.any():
+        return []
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * pad + 1, 2 * pad + 1))
+    grown = cv2.dilate(binary, kernel) if pad > 0 else binary
+    count, _, stats, _ = cv2.connectedComponentsWithStats(grown, connectivity=8)
+
+    tiles = []
+    for label in range(1, count):
+        x, y, tw, th = (int(v) for v in stats[label, :4])
+        tiles.append(_align((x, y, x + tw, y + th), w, h, align))
+    return _merge(tiles, w, h, align)
+
+
+def tiles_from_rects(rects: List[Rect], w: int, h: int, pad: int = LAMA_TILE_PAD, align: int = LAMA_ALIGN) -> List[Rect]:
+    """
+    Same tiles as find_tiles, from the tight rects of a SparseMask (no full-page pass).
+    """
+    tiles = [_align((max(0, x1 - pad), max(0, y1 - pad), min(w, x2 + pad), min(h, y2 + pad)), w, h, align)
+             for x1, y1, x2, y2 in rects]
+    return _merge(tiles, w, h, align)
+
+
+def _align(rect: Rect, w: int, h: int, align: int) -> Rect:
+    """
+    Grows a rect to multiples of `align` while it fits in the image (borders get padded later).
+    """
+    x1, y1, x2, y2 = rect
+    x1, x2 = _grow(x1, x2, w, align)
+    y1, y2 = _grow(y1, y2, h, align)
+    return x1, y1, x2, y2
+
+
+def _grow(a: int, b: int, limit: int, align: int) -> Tuple[int, int]:
+    extra = (align - (b - a) % align) % align
+    b_new = min(limit, b + extra)
+    a_new = max(0, a - (extra - (b_new - b)))
+    return a_new, b_new
+
+
+def _merge(tiles: List[Rect], w: int, h: int, align: int) -> List[Rect]:
+    # Component bounding boxes can still overlap (L-shaped text runs): union until stable
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for tile in tiles:
+            for i, other in enumerate(result):
+                if tile[0] < other[2] and other[0] < tile[2] and tile[1] < other[3] and other[1] < tile[3]:
+                    union = (min(tile[0], other[0]), min(tile[1], other[1]), max(tile[2], other[2]), max(tile[3], other[3]))
+                    result[i] = _align(union, w, h, align)
+                    merged = True
+                    break
+            else:
+                result.append(tile)
+        tiles = result
+    return tiles
+
+
+def pad_to_multiple(arr: np.ndarray, divisor: int = LAMA_ALIGN) -> np.ndarray:
+    """
+    Reflect-pads bottom/right so both sides are multiples of `divisor`.
+    """
+    h, w = arr.shape[:2]
+    h_pad = (divisor - h % divisor) % divisor
+    w_pad = (divisor - w % divisor) % divisor
+    if not h_pad and not w_pad:
+        return arr
+    pad = ((0, h_pad), (0, w_pad)) + ((0, 0),) * (arr.ndim - 2)
+    return np.pad(arr, pad, mode='reflect' if min(h, w) > 1 else 'edge')
+
+
+def blend_tile(target: np.ndarray, result: np.ndarray, mask_tile: np.ndarray, rect: Rect):
+    """
+    Writes the inpainted tile back, only where the tile's mask is set (untouched
+    pixels stay bit-exact, so tile borders never show seams).
+    """
+    x1, y1, x2, y2 = rect
+    region = target[y1:y2, x1:x2]
+    keep = mask_tile > 0
+    region[keep] = result[:y2 - y1, :x2 - x1][keep]
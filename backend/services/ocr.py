@@ -1,16 +1,53 @@
 from google.cloud import vision
+from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+from google.auth.credentials import AnonymousCredentials
 import os
 import io
+from typing import List, Dict, Any
+
+from services.ocr_cache import OCRCache
+from services import registry
+
+# images:annotate accepts at most 16 images per request
+VISION_BATCH_SIZE = min(16, int(os.getenv("VISION_BATCH_SIZE", "16")))
+# Request payload limit is ~10MB after base64 (+33%): keep raw image bytes per request under this
+VISION_BATCH_MAX_BYTES = int(float(os.getenv("VISION_BATCH_MAX_MB", "7")) * 1024 * 1024)
+# Optional REST endpoint override, e.g. http://127.0.0.1:8090 for a local fake Vision server (no auth)
+VISION_API_ENDPOINT = os.getenv("VISION_API_ENDPOINT", "")
+
+_DEFAULT_CACHE = object()
+
+_BreakType = vision.TextAnnotation.DetectedBreak.BreakType
+_BREAKS = {
+    _BreakType.SPACE: " ",
+    _BreakType.SURE_SPACE: " ",
+    _BreakType.EOL_SURE_SPACE: "\n",
+    _BreakType.LINE_BREAK: "\n",
+    _BreakType.HYPHEN: "-\n",
+}
+
+def _keepalive_channel(host, options=(), **kwargs):
+    return ImageAnnotatorGrpcTransport.create_channel(host, options=list(options) + registry.grpc_keepalive_options(), **kwargs)
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, cache=_DEFAULT_CACHE, endpoint: str = VISION_API_ENDPOINT):
         # Asegurarse de que la variable de entorno apunte al JSON
         # (Idealmente, esto ya deberia estar en .env o setado, pero lo forzamos por si acaso)
         cred_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "google_credentials.json")
         if os.path.exists(cred_path):
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred_path
         
-        self.client = vision.ImageAnnotatorClient()
+        if endpoint:
+            # REST transport so plain http:// test servers work
+            credentials = AnonymousCredentials() if endpoint.startswith("http://") else None
+            self.client = vision.ImageAnnotatorClient(
+                transport="rest", credentials=credentials, client_options={"api_endpoint": endpoint}
+            )
+        else:
+            # Default gRPC transport plus keepalive pings: the one channel stays open between pages
+            self.client = vision.ImageAnnotatorClient(transport=ImageAnnotatorGrpcTransport(channel=_keepalive_channel))
+        # Pluggable: any object with get_many()/set_many(); None disables caching
+        self.cache = OCRCache() if cache is _DEFAULT_CACHE else cache
 
     def detect_text(self, image_content):
         """
@@ -25,11 +62,51 @@ class OCRService:
         if response.error.message:
             raise Exception(f'{response.error.message}')
 
+        return self._parse_response(response)
+
+    def detect_text_batch(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        OCR for many encoded images with batch_annotate_images (chunks of at most
+        VISION_BATCH_SIZE images / VISION_BATCH_MAX_BYTES). Results come back in
+        input order. An image that fails on its own gets an empty result with
+        'error' set instead of failing the whole batch.
+        """
+        results = []
+        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+        for chunk in self._chunks(contents):
+            requests = [vision.AnnotateImageRequest(image=vision.Image(content=c), features=[feature]) for c in chunk]
+            batch = self.client.batch_annotate_images(requests=requests)
+            if len(batch.responses) != len(chunk):
+                raise Exception(f"Vision returned {len(batch.responses)} responses for {len(chunk)} images")
+
+            for response in batch.responses:
+                if response.error.message:
+                    print(f"[OCR WARNING] Image failed in batch: {response.error.message}")
+                    results.append({"text": "", "word_boxes": [], "error": response.error.message})
+                else:
+                    results.append(self._parse_response(response))
+        return results
+
+    @staticmethod
+    def _chunks(contents: List[bytes]):
+        chunk, size = [], 0
+        for content in contents:
+            if chunk and (len(chunk) == VISION_BATCH_SIZE or size + len(content) > VISION_BATCH_MAX_BYTES):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(content)
+            size += len(content)
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _parse_response(response) -> Dict[str, Any]:
         # El primer elemento de text_annotations es todo el texto
         full_text = response.full_text_annotation.text if response.full_text_annotation else ""
         
         # Extraer bloques de palabras para la mascara fina (Method B)
         blocks = []
+        words = []
         for page in response.full_text_annotation.pages:
             for block in page.blocks:
                 for paragraph in block.paragraphs:
@@ -37,12 +114,41 @@ class OCRService:
                         # Obtener vertices de la palabra
                         verts = [(v.x, v.y) for v in word.bounding_box.vertices]
                         blocks.append(verts)
+                        # Texto + separador detectado (para reasignar palabras a globos en modo pagina)
+                        text = "".join(symbol.text for symbol in word.symbols)
+                        last_break = word.symbols[-1].property.detected_break.type_ if word.symbols else 0
+                        words.append({"text": text, "break": _BREAKS.get(last_break, ""), "box": verts})
 
         return {
             "text": full_text,
-            "word_boxes": blocks # Lista de listas de tuplas [(x,y),...]
+            "word_boxes": blocks, # Lista de listas de tuplas [(x,y),...]
+            "words": words
         }
 
+    def detect_text_bulk(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        OCR for a list of encoded crops (one page or several), in order.
+        All crops are looked up in the cache first; only the misses go to the
+        network, in batched annotate requests. Identical crops are sent once.
+        """
+        if self.cache is None:
+            return self.detect_text_batch(contents)
+
+        keys = [OCRCache.make_key(content) for content in contents]
+        found = self.cache.get_many(keys)
+        pending = {}
+        for key, content in zip(keys, contents):
+            if key not in found and key not in pending:
+                pending[key] = content
+        print(f"[OCR] {len(contents) - len(pending)}/{len(contents)} crops from cache, {len(pending)} to Vision API")
+
+        fresh = dict(zip(pending.keys(), self.detect_text_batch(list(pending.values()))))
+        cacheable = {key: res for key, res in fresh.items() if "error" not in res}
+        if cacheable:
+            self.cache.set_many(cacheable)
+        found.update(fresh)
+        return [found[key] for key in keys]
+
     def detect_text_from_path(self, image_path: str) -> str:
         """
         Helper para leer desde archivo.
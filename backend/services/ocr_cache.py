@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "ocr"))
+OCR_CACHE_MEMORY_ITEMS = int(os.getenv("OCR_CACHE_MEMORY_ITEMS", "2000"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "256"))
+OCR_CACHE_TTL_HOURS = float(os.getenv("OCR_CACHE_TTL_HOURS", "720"))
+
+class OCRCache:
+    """
+    Two-tier cache of OCR results keyed on the sha256 of the encoded crop bytes.
+    - Memory tier: LRU of the most recent results.
+    - Disk tier: one JSON file per key, expired after a TTL (file mtime) and
+      evicted oldest-first once the directory exceeds its size budget.
+    Any object with get_many()/set_many() can be plugged into OCRService instead.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, cache_dir: str = OCR_CACHE_DIR, memory_items: int = OCR_CACHE_MEMORY_ITEMS,
+                max_bytes: int = OCR_CACHE_MAX_MB * 1024 * 1024, ttl_seconds: float = OCR_CACHE_TTL_HOURS * 3600):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(OCRCache, cls).__new__(cls)
+                cls._instance._initialize(cache_dir, memory_items, max_bytes, ttl_seconds)
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        Next OCRCache() starts over with its own arguments (tests).
+        """
+        with cls._lock:
+            cls._instance = None
+
+    def _initialize(self, cache_dir, memory_items, max_bytes, ttl_seconds):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # key -> (stored_at, result)
+        self._disk = OrderedDict() # key -> size (oldest first)
+        self._disk_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for fname in files:
+                path = os.path.join(root, fname)
+                st = os.stat(path)
+                if not fname.endswith(".json") or now - st.st_mtime > self.ttl_seconds:
+                    # Expired entry or half-written tmp file
+                    os.remove(path)
+                    continue
+                entries.append((st.st_mtime, fname[:-len(".json")], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        print(f"[OCR CACHE] {len(self._disk)} entries on disk, {self._disk_bytes / 1e6:.1f} MB")
+
+    @staticmethod
+    def make_key(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        now = time.time()
+        for key in keys:
+            if key in found:
+                continue
+            result = self._get_memory(key, now)
+            if result is None:
+                result = self._get_disk(key, now)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[key] = result
+        return found
+
+    def set_many(self, results: Dict[str, Dict[str, Any]]):
+        now = time.time()
+        for key, result in results.items():
+            with self._lock:
+                self._remember(key, now, result)
+            self._put_disk(key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+    # --- Memory tier ---
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            stored_at, result = item
+            if now - stored_at > self.ttl_seconds:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return result
+
+    def _remember(self, key: str, stored_at: float, result: Dict[str, Any]):
+        # Caller holds the lock
+        self._memory[key] = (stored_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # --- Disk tier ---
+
+    def _get_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key not in self._disk:
+                return None
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at > self.ttl_seconds:
+                with self._lock:
+                    self._drop_disk(key)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop_disk(key)
+            return None
+
+        with self._lock:
+            self._disk.move_to_end(key)
+            self._remember(key, stored_at, result) # Promote to memory
+        return result
+
+    def _put_disk(self, key: str, result: Dict[str, Any]):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[OCR CACHE ERROR] Could not write {key[:12]}: {e}")
+            return
+
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._disk_bytes += size
+            while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+                self._drop_disk(next(iter(self._disk)))
+
+    def _drop_disk(self, key: str):
+        # Caller holds the lock
+        self._disk_bytes -= self._disk.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
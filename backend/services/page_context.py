@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+from functools import cached_property
+from typing import Optional
+
+class PageContext:
+    """
+    A decoded comic page shared by every pipeline stage.
+    Holds the BGR ndarray (OpenCV convention) and derives grayscale/RGB views
+    lazily, so each page is decoded once and converted at most once per view.
+    Stages must treat `image` as read-only (copy before drawing on it).
+    """
+    def __init__(self, image: np.ndarray, path: Optional[str] = None):
+        self.image = image
+        self.path = path
+        self.resized = False
+
+    @classmethod
+    def from_file(cls, path: str, max_dim: Optional[int] = None) -> "PageContext":
+        """
+        Ingest: decodes the file once and applies smart downscaling.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        return cls.from_bytes(data, path=path, max_dim=max_dim)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, path: Optional[str] = None, max_dim: Optional[int] = None) -> "PageContext":
+        """
+        Same as from_file for bytes already in memory (e.g. read once for hashing).
+        """
+        if not data:
+            raise Exception("File is empty (0 bytes)")
+
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise Exception("Cv2 failed to read image. Corrupt or unsupported format.")
+
+        page = cls(image, path=path)
+        if max_dim:
+            page._downscale(max_dim)
+        return page
+
+    def _downscale(self, max_dim: int):
+        h, w = self.image.shape[:2]
+        if max(h, w) <= max_dim:
+            return
+        scale = max_dim / max(h, w)
+        new_w = int(w * scale)
+        new_h = int(h * scale)
+        print(f"[PAGE] Resizing image from {w}x{h} to {new_w}x{new_h}")
+        self.image = cv2.resize(self.image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        self.resized = True
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def blurred_gray(self) -> np.ndarray:
+        # Shared by the contour engine (5x5 Gaussian, same as the per-bubble path)
+        return cv2.GaussianBlur(self.gray, (5, 5), 0)
+
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
+
+    def clamp_bbox(self, bbox) -> tuple:
+        x1, y1, x2, y2 = map(int, bbox)
+        return max(0, x1), max(0, y1), min(self.width, x2), min(self.height, y2)
+
+    def crop(self, bbox) -> np.ndarray:
+        """
+        BGR view (no copy) of a bbox clamped to the page.
+        """
+        x1, y1, x2, y2 = self.clamp_bbox(bbox)
+        return self.image[y1:y2, x1:x2]
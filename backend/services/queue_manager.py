@@ -1,10 +1,30 @@
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
+from collections import deque
+from concurrent.futures import Future
+import os
+import threading
+import time
 import uuid
 
+# Pipeline executor config (env overridable)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "20"))
+
+# Detection micro-batching: up to N pages or T milliseconds per YOLO forward pass.
+# At most PIPELINE_WORKERS pages are in flight, so a larger N only ever flushes on the timeout
+DETECT_BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", str(PIPELINE_WORKERS)))
+DETECT_BATCH_WAIT_MS = int(os.getenv("DETECT_BATCH_WAIT_MS", "50"))
+# OCR: crops of up to N concurrent pages go out in the same batched annotate requests
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", str(PIPELINE_WORKERS)))
+OCR_BATCH_WAIT_MS = int(os.getenv("OCR_BATCH_WAIT_MS", "50"))
+# LaMa (non-fast inpainting): tiles of up to N concurrent pages share bucketed forward passes
+INPAINT_BATCH_PAGES = int(os.getenv("INPAINT_BATCH_PAGES", str(PIPELINE_WORKERS)))
+INPAINT_BATCH_WAIT_MS = int(os.getenv("INPAINT_BATCH_WAIT_MS", "50"))
+
 class JobManager:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(JobManager, cls).__new__(cls)
@@ -19,13 +39,44 @@ class JobManager:
             "progress": 0,
             "step": "Initializing",
             "created_at": datetime.now(),
+            "queued_at": None,
+            "started_at": None,
+            "queue_position": None,
+            "wait_time": None,
             "result": None,
             "error": None
         }
         return job_id
 
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        return self.jobs.get(job_id)
+        job = self.jobs.get(job_id)
+        if job and job["status"] == "queued" and job["queued_at"]:
+            # Live wait time while the job is still in the queue
+            job["wait_time"] = round((datetime.now() - job["queued_at"]).total_seconds(), 2)
+        return job
+
+    def delete_job(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def mark_queued(self, job_id: str, position: int):
+        if job_id in self.jobs:
+            self.jobs[job_id]["status"] = "queued"
+            self.jobs[job_id]["step"] = f"Queued (position {position})"
+            self.jobs[job_id]["queued_at"] = datetime.now()
+            self.jobs[job_id]["queue_position"] = position
+
+    def set_queue_position(self, job_id: str, position: int):
+        if job_id in self.jobs:
+            self.jobs[job_id]["queue_position"] = position
+            self.jobs[job_id]["step"] = f"Queued (position {position})"
+
+    def mark_started(self, job_id: str):
+        if job_id in self.jobs:
+            job = self.jobs[job_id]
+            job["started_at"] = datetime.now()
+            job["queue_position"] = 0
+            if job["queued_at"]:
+                job["wait_time"] = round((job["started_at"] - job["queued_at"]).total_seconds(), 2)
 
     def update_job(self, job_id: str, status: str = None, progress: int = None, step: str = None, result: any = None, error: str = None):
         if job_id in self.jobs:
@@ -40,3 +91,174 @@ class JobManager:
             if error:
                 self.jobs[job_id]["error"] = error
                 self.jobs[job_id]["status"] = "failed"
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the pipeline queue is at capacity (backpressure).
+    """
+    def __init__(self, max_size: int):
+        super().__init__(f"Pipeline queue is full ({max_size} jobs waiting)")
+        self.max_size = max_size
+
+
+class PipelineExecutor:
+    """
+    Bounded FIFO executor for pipeline jobs.
+    A fixed number of worker threads pull jobs in submission order, so heavy
+    stages (YOLO, inpainting, rendering) never run more than `workers` at a time
+    and never compete with the API thread pool.
+    """
+    def __init__(self, job_manager: JobManager, workers: int = PIPELINE_WORKERS, max_queue: int = PIPELINE_QUEUE_SIZE):
+        self.job_manager = job_manager
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._pending = deque() # (job_id, fn, args, kwargs)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopped = False
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker_loop, name=f"pipeline-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        print(f"[QUEUE] Pipeline executor started ({self.workers} workers, queue size {self.max_queue})")
+
+    def submit(self, job_id: str, fn: Callable, *args, **kwargs) -> int:
+        """
+        Enqueues a job. Returns its 1-based queue position.
+        Raises QueueFullError if the queue is at capacity.
+        """
+        if not self._threads:
+            self.start()
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(self.max_queue)
+            self._pending.append((job_id, fn, args, kwargs))
+            position = len(self._pending)
+            self.job_manager.mark_queued(job_id, position)
+            self._cond.notify()
+        return position
+
+    def queue_length(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def shutdown(self, wait: bool = True):
+        """
+        wait=True: workers finish every queued job, then exit (joined here).
+        wait=False: queued jobs are dropped and marked failed; running ones finish on their own.
+        """
+        with self._cond:
+            self._stopped = True
+            dropped = [] if wait else [job_id for job_id, _, _, _ in self._pending]
+            if not wait:
+                self._pending.clear()
+            self._cond.notify_all()
+            threads = list(self._threads)
+            self._threads = []
+        for job_id in dropped:
+            self.job_manager.update_job(job_id, status="failed", step="Cancelled", error="Server shutting down")
+        if dropped:
+            print(f"[QUEUE] Shutdown: {len(dropped)} queued jobs marked failed")
+        if wait:
+            for t in threads:
+                t.join()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if not self._pending:
+                    # Stopped and drained
+                    return
+                job_id, fn, args, kwargs = self._pending.popleft()
+                self.job_manager.mark_started(job_id)
+                # Everyone behind this job moves up one slot
+                for i, (pending_id, _, _, _) in enumerate(self._pending):
+                    self.job_manager.set_queue_position(pending_id, i + 1)
+
+            try:
+                fn(job_id, *args, **kwargs)
+            except Exception as e:
+                # Tasks report their own errors; this is a last-resort guard
+                print(f"[QUEUE ERROR] Job {job_id} crashed: {e}")
+                self.job_manager.update_job(job_id, status="failed", error=str(e))
+
+
+class MicroBatcher:
+    """
+    Pipeline stage that groups items submitted by many workers into batches.
+    A batch is flushed when it reaches `max_batch` items or when the oldest item
+    has waited `max_wait_ms`. `batch_fn(items) -> results` runs on a single
+    dedicated thread, so the wrapped model is never called concurrently.
+    """
+    def __init__(self, batch_fn: Callable, max_batch: int, max_wait_ms: int, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.name = name
+        self._pending = deque() # (item, future)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, item) -> Future:
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+            self._pending.append((item, future))
+            self._cond.notify()
+        return future
+
+    def __call__(self, item):
+        """
+        Blocking helper: submit and wait for this item's result.
+        """
+        return self.submit(item).result()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give other workers up to max_wait to join this batch
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+
+            items = [item for item, _ in batch]
+            try:
+                results = self._run(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # One bad item (e.g. a corrupt page) must not fail the whole batch
+                print(f"[{self.name.upper()} ERROR] Batch of {len(items)} failed: {e}. Retrying items one by one")
+                for item, future in batch:
+                    try:
+                        future.set_result(self._run([item])[0])
+                    except Exception as item_error:
+                        future.set_exception(item_error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run(self, items: list) -> list:
+        results = list(self.batch_fn(items))
+        # zip() would leave the extra futures unresolved and their workers waiting forever
+        if len(results) != len(items):
+            raise ValueError(f"{self.name} returned {len(results)} results for {len(items)} items")
+        return results
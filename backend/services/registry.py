@@ -0,0 +1,119 @@
+import os
+import threading
+
+# Outbound HTTP pools (httpx LLM backends, requests fallback translator): keep connections warm between pages
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+# Vision gRPC channel: keepalive pings so the idle connection survives between pages
+# (Google front ends reject pings more often than every 5 minutes)
+VISION_KEEPALIVE_SECONDS = max(300, int(os.getenv("VISION_KEEPALIVE_SECONDS", "300")))
+
+_services = {}
+_lock = threading.RLock() # Re-entrant: factories may pull other services
+_local = threading.local()
+
+
+def _get(key, factory):
+    """
+    Builds the service on first use (once per process) and returns the shared instance.
+    """
+    service = _services.get(key)
+    if service is None:
+        with _lock:
+            service = _services.get(key)
+            if service is None:
+                service = factory()
+                _services[key] = service
+    return service
+
+
+def reset():
+    """
+    Drops every cached client (tests, or after changing env config).
+    """
+    with _lock:
+        _services.clear()
+    _local.__dict__.clear()
+
+
+def gemini_model(model_name: str):
+    """
+    Shared GenerativeModel. genai.configure runs once per process, not per page:
+    it rebuilds the underlying gRPC clients every time it is called.
+    Returns None without GEMINI_API_KEY.
+    """
+    def build():
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+        import google.generativeai as genai
+        _get("genai_configured", lambda: genai.configure(api_key=api_key) or True)
+        return genai.GenerativeModel(model_name)
+    return _get(("gemini", model_name), build)
+
+
+def translator(target_lang: str = 'es'):
+    from services.translator import TranslatorService
+    return _get(("translator", target_lang), lambda: TranslatorService(target_lang=target_lang))
+
+
+def fallback_translator(target_lang: str = 'es'):
+    """
+    deep_translator GoogleTranslator, one per thread: translate() mutates the
+    instance's query params, so it can't be shared across workers.
+    All of them share the pooled http_session().
+    """
+    cache = _local.__dict__.setdefault("fallback", {})
+    if target_lang not in cache:
+        from services.fallback_translator import PooledGoogleTranslator
+        cache[target_lang] = PooledGoogleTranslator(http_session(), source='auto', target=target_lang)
+    return cache[target_lang]
+
+
+def http_session():
+    """
+    Shared requests.Session: one keep-alive pool of up to HTTP_MAX_CONNECTIONS
+    connections per host, instead of a new TCP/TLS handshake per call.
+    """
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_MAX_CONNECTIONS, pool_maxsize=HTTP_MAX_CONNECTIONS)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    return _get("http_session", build)
+
+
+def ocr():
+    from services.ocr import OCRService
+    return _get("ocr", OCRService)
+
+
+def renderer():
+    from services.renderer import TextRenderer
+    return _get("renderer", TextRenderer)
+
+
+def font_matcher():
+    from services.font_matcher import FontMatcher
+    return _get("font_matcher", FontMatcher)
+
+
+def http_limits():
+    import httpx
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_SECONDS)
+
+
+def grpc_keepalive_options() -> list:
+    """
+    Channel options for long-lived gRPC clients (Vision).
+    """
+    return [
+        ("grpc.keepalive_time_ms", VISION_KEEPALIVE_SECONDS * 1000),
+        ("grpc.keepalive_timeout_ms", 20000),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
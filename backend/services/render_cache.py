@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from PIL import Image, ImageDraw
+import numpy as np
+from services.image_io import read_image
+
+# Composited pages kept in memory for the editor (update-bubble)
+RENDER_CACHE_PAGES = int(os.getenv("RENDER_CACHE_PAGES", "8"))
+
+Rect = Tuple[int, int, int, int]
+
+
+class _RenderedPage:
+    def __init__(self, clean: Image.Image, bubbles: list, image: Image.Image, layouts: list, clean_mtime: float):
+        self.clean = clean # RGBA, without text
+        self.bubbles = bubbles
+        self.image = image # RGBA, composited
+        self.layouts = layouts # one per bubble (None = not drawn)
+        self.clean_mtime = clean_mtime
+
+
+class RenderedPageCache:
+    """
+    LRU of composited pages for the editor. The first edit of a page renders it
+    fully; after that, editing a bubble re-lays out only that bubble and redraws
+    only the region its old and new text cover (plus any neighbour overlapping it),
+    from the clean image, in the original drawing order.
+    Edits of one page are serialized by that page's lock; the cache-wide lock
+    only guards the LRU bookkeeping, so a cold page never blocks the others.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, max_pages: int = RENDER_CACHE_PAGES):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(RenderedPageCache, cls).__new__(cls)
+                cls._instance.max_pages = max(1, max_pages)
+                cls._instance._pages = OrderedDict()
+                cls._instance._page_locks = {} # key -> Lock
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        Drops the cached pages and their locks; the next call builds a new cache.
+        """
+        with cls._lock:
+            cls._instance = None
+
+    def edit_bubble(self, key: str, clean_path: str, load_bubbles: Callable[[], list], index: int,
+                    changes: dict, renderer,
+                    save: Optional[Callable[[Image.Image, list], None]] = None) -> Tuple[Image.Image, list, Optional[Rect]]:
+        """
+        Applies `changes` to bubble `index` and re-renders its region.
+        Returns (page RGB, copy of the bubbles, redrawn region or None).
+        `save(page RGB, bubbles)` runs under the page lock, so concurrent edits
+        persist their metadata and image in the same order they were applied.
+        Raises IndexError for a bubble the page doesn't have; nothing is changed
+        if the new layout fails.
+        """
+        with self._page_lock(key):
+            page = self._get_page(key, clean_path, load_bubbles, renderer)
+            if not 0 <= index < len(page.bubbles):
+                raise IndexError(f"Bubble {index} not found ({len(page.bubbles)} bubbles)")
+            layout = renderer.layout_bubble({**page.bubbles[index], **changes})
+            page.bubbles[index].update(changes)
+            old, page.layouts[index] = page.layouts[index], layout
+
+            region = _union([l['rect'] for l in (old, layout) if l], page.image.size)
+            if region:
+                patch = page.clean.crop(region)
+                draw = ImageDraw.Draw(patch)
+                for other in page.layouts:
+                    if other and _intersects(other['rect'], region):
+                        renderer.draw_layout(draw, other, offset=region[:2])
+                page.image.paste(patch, region[:2])
+            image, bubbles = page.image.convert("RGB"), [dict(b) for b in page.bubbles]
+            if save is not None:
+                save(image, bubbles)
+            return image, bubbles, region
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._pages.pop(key, None)
+
+    def _page_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._page_locks.setdefault(key, threading.Lock())
+
+    def _get_page(self, key, clean_path, load_bubbles, renderer) -> _RenderedPage:
+        # Caller holds the page lock
+        mtime = os.path.getmtime(clean_path)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and page.clean_mtime == mtime:
+                self._pages.move_to_end(key)
+                return page
+
+        print(f"[RENDER CACHE] Full render of {key}")
+        # Intermediate (.npy / PNG) or delivered image, BGR
+        clean = Image.fromarray(np.ascontiguousarray(read_image(clean_path)[:, :, ::-1])).convert("RGBA")
+        bubbles = load_bubbles()
+        image, layouts = renderer.render_bubbles(clean.copy(), bubbles)
+        page = _RenderedPage(clean, bubbles, image, layouts, mtime)
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                evicted, _ = self._pages.popitem(last=False)
+                lock = self._page_locks.get(evicted)
+                if lock is not None and not lock.locked():
+                    del self._page_locks[evicted]
+        return page
+
+
+def _union(rects, size) -> Optional[Rect]:
+    if not rects:
+        return None
+    w, h = size
+    x1 = max(0, min(r[0] for r in rects))
+    y1 = max(0, min(r[1] for r in rects))
+    x2 = min(w, max(r[2] for r in rects))
+    y2 = min(h, max(r[3] for r in rects))
+    return (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
@@ -1,19 +1,59 @@
 import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import textwrap
 import numpy as np
 from contextlib import contextmanager
+from services.page_context import PageContext
+from services.font_cache import FontCache, ScaledMetrics
+from services.image_io import write_artifact
+
+# Layout de bocadillos: 'serial', 'thread' o 'process' (FreeType apenas suelta el GIL,
+# asi que con muchos bocadillos por pagina solo 'process' escala con los nucleos)
+RENDER_LAYOUT_EXECUTION = os.getenv("RENDER_LAYOUT_EXECUTION", "serial")
+RENDER_LAYOUT_WORKERS = int(os.getenv("RENDER_LAYOUT_WORKERS", str(os.cpu_count() or 1)))
+# Paginas con menos bocadillos se maquetan en serie (el pool no compensa)
+RENDER_LAYOUT_MIN_BUBBLES = int(os.getenv("RENDER_LAYOUT_MIN_BUBBLES", "16"))
+
+class LayoutResult:
+    """
+    Lineas de un ajuste, medidas una sola vez (anchos de palabra cacheados):
+    ancho y alto de tinta de cada linea y desplazamiento de la tinta respecto al
+    origen de dibujo (textbbox[:2]). Sirve para validar el ajuste, dimensionar el
+    parche y colocar cada linea sin volver a medir.
+    """
+    def __init__(self, lines, metrics):
+        self.lines = lines
+        self.widths = []
+        self.heights = []
+        self.offsets = []
+        for line in lines:
+            words = line.split()
+            self.widths.append(int(metrics.line_width(words)))
+            self.heights.append(int(metrics.line_height(words)))
+            ox, oy = metrics.ink_offset(words)
+            self.offsets.append((int(ox), int(oy)))
+
+    def total_height(self, leading):
+        return sum(self.heights) + (len(self.lines) - 1) * leading
+
 
 class TextRenderer:
     def __init__(self, font_path=None):
         # Por ahora usamos una fuente por defecto del sistema o una de Pillow si no hay una especifica
         self.font_path = font_path # "arial.ttf" por ejemplo si estuviera disponible
+        # Fuentes y anchos de palabra compartidos por todo el proceso
+        self.fonts = FontCache()
 
     @contextmanager
     def _get_image_context(self, image_source):
         if isinstance(image_source, str):
             with Image.open(image_source) as img:
                 yield img.convert("RGBA")
+        elif isinstance(image_source, PageContext):
+            yield Image.fromarray(image_source.rgb).convert("RGBA")
         else:
             yield image_source.convert("RGBA")
 
@@ -22,211 +62,9 @@ class TextRenderer:
         Dibuja el texto traducido sobre la imagen limpia.
         """
         try:
-            # Abrir imagen (Soporte para str path o objeto PIL Image)
-            with self._get_image_context(image_path) as img:
-                draw = ImageDraw.Draw(img)
-                
-                # Canvas para textos (para medir)
-                txt_layer = Image.new("RGBA", img.size, (255, 255, 255, 0))
-                draw_txt = ImageDraw.Draw(txt_layer)
-
-                for bubble in bubbles:
-                    # Obtenemos la traduccion pero limpiamos la etiqueta [SFX] si existe para que no salga en la imagen
-                    raw_trans = bubble.get('translation', '')
-                    text_content = raw_trans.replace('[SFX] ', '').replace('[SFX]', '') # Doble limpieza por si acaso
-                    
-                    if not text_content:
-                        continue
-                        
-                    # Coordenadas
-                    x1, y1, x2, y2 = bubble['bbox']
-                    w = x2 - x1
-                    h = y2 - y1
-                    
-                    # Ignorar cajas muy enanas (ruido)
-                    if w < 10 or h < 10:
-                        continue
-
-                    # --- ESTRATEGIA DE AJUSTE DE TEXTO (Pixel-Perfect) ---
-                    
-                    # 1. Detectar forma primero (para saber márgenes)
-                    polygon = bubble.get('polygon', [])
-                    is_rectangle = False
-                    if polygon and len(polygon) > 2:
-                        try:
-                            poly_points = [(p[0], p[1]) for p in polygon]
-                            
-                            # Shoelace formula simple
-                            x_coords = [p[0] for p in poly_points]
-                            y_coords = [p[1] for p in poly_points]
-                            area_poly = 0.5 * np.abs(np.dot(x_coords, np.roll(y_coords, 1)) - np.dot(y_coords, np.roll(x_coords, 1)))
-                            area_bbox = w * h
-                            
-                            if area_bbox > 0:
-                                ratio = area_poly / area_bbox
-                                if ratio > 0.80: 
-                                    is_rectangle = True
-                        except Exception as e:
-                            pass 
-
-                    # 2. Definir margenes según forma
-                    if is_rectangle:
-                        # Para cuadrados: MÁXIMO espacio posible.
-                        # Margen mínimo de 1-2px para no tocar el borde exacto
-                        # Y restamos el padding del parche que se suma luego (patch_padding=2)
-                        # Ancho Texto = Ancho Caja - (2 * patch_padding) - (2 * safety_margin)
-                        # Digamos safety=1px. Total resta = 4px + 2px = 6px
-                        max_w_px = w - 6 
-                        max_h_px = h - 6
-                    else:
-                    # Para óvalos: Margen del 10% para curvatura
-                        padding_ratio = 0.1 
-                        max_w_px = w * (1.0 - padding_ratio * 2) 
-                        max_h_px = h * (1.0 - padding_ratio * 2)
-                    
-                    # Obtener fuente deseada por el usuario (o Default)
-                    font_name = bubble.get('font', 'ComicNeue')
-
-                    # Size Strategy: Use estimated OR bounding box heuristic
-                    estimated_size = bubble.get('estimated_font_size')
-                    if estimated_size:
-                        # Start slightly smaller than estimated (to fit translation which might be longer)
-                        # Or start exact. Let's start exact.
-                        font_size = int(estimated_size * 0.9) 
-                    else:
-                        font_size = int(h / 3) # Empezar optimista
-                        
-                    min_font_size = 8
-                    
-                    final_wrapped_lines = []
-                    final_font = None
-                    final_line_heights = []
-                    
-                    # Bucle de reducción de fuente
-                    # Day 13 Refined: Shape-Aware Wrapping
-                    # Bucle de reducción de fuente
-                    # Day 13 Refined: Shape-Aware Wrapping
-                    while font_size >= min_font_size:
-                        font = self._load_font(font_size, font_name, bubble.get('font_path'))
-                        
-                        if is_rectangle:
-                             # Estrategia Rectangular
-                             wrapped_lines = self._wrap_text_pixels(text_content, font, max_w_px, draw_txt)
-                             
-                             # Validar altura
-                             line_heights = [draw_txt.textbbox((0, 0), line, font=font)[3] - draw_txt.textbbox((0, 0), line, font=font)[1] for line in wrapped_lines]
-                             leading = int(font_size * 0.2)
-                             total_text_height = sum(line_heights) + (len(wrapped_lines) - 1) * leading
-                             
-                             if total_text_height <= max_h_px:
-                                 # SI CABE
-                                 final_wrapped_lines = wrapped_lines
-                                 final_font = font
-                                 final_line_heights = line_heights
-                                 break
-                             else:
-                                 wrapped_lines = [] # Fallo
-                        else:
-                             # Estrategia Oval (Bocadillos de diálogo)
-                             wrapped_lines = self._wrap_text_oval(text_content, font, w, h, draw_txt)
-                        
-                        if wrapped_lines:
-                             # ÉXITO: El texto cabe en el óvalo con este tamaño de fuente
-                             final_wrapped_lines = wrapped_lines
-                             final_font = font
-                             # Calculamos alturas para el renderizado posterior
-                             final_line_heights = [draw_txt.textbbox((0, 0), line, font=font)[3] - draw_txt.textbbox((0, 0), line, font=font)[1] for line in wrapped_lines]
-                             break
-                        else:
-                             # No cabe, probamos fuente mas pequeña
-                             font_size -= 2 
-                    
-                    # Fallback si no cabe ni con min_size (usamos wrapping rectangular clásico a fuerza bruta)
-                    if not final_wrapped_lines:
-                        font_size = min_font_size
-                        final_font = self._load_font(font_size, font_name, bubble.get('font_path'))
-                        # Wrapping rectangular forzoso
-                        max_w_fallback = w * 0.8
-                        final_wrapped_lines = self._wrap_text_pixels(text_content, final_font, max_w_fallback, draw_txt)
-                        final_line_heights = [draw_txt.textbbox((0, 0), line, font=final_font)[3] - draw_txt.textbbox((0, 0), line, font=final_font)[1] for line in final_wrapped_lines]
-                        
-                        # Fix for logic below needing real_max_w to be initialized
-                        # Note: The original code logic proceeds to drawing. Need to ensure loops logic matches.
-
-                    # --- DIBUJAR ---
-                    leading = int(font_size * 0.2)
-                    total_h = sum(final_line_heights) + (len(final_wrapped_lines) - 1) * leading
-                    
-                    # Centro del rectangulo
-                    center_x = x1 + w // 2
-                    center_y = y1 + h // 2
-                    
-                    # Origen de dibujo (top-left del bloque de texto completo)
-                    text_start_y = center_y - total_h // 2
-                    
-                    # Calcular ancho máximo real del bloque (para el parche)
-                    real_max_w = 0
-                    for line in final_wrapped_lines:
-                        bbox = draw_txt.textbbox((0, 0), line, font=final_font)
-                        lw = bbox[2] - bbox[0]
-                        if lw > real_max_w: real_max_w = lw
-
-                    # PARCHE BLANCO (Fondo Adaptativo)
-                    # Origen de dibujo (top-left del bloque de texto completo)
-                    text_start_y = center_y - total_h // 2
-                    
-                    # Calcular ancho máximo real del bloque (para el parche)
-                    real_max_w = 0
-                    for line in final_wrapped_lines:
-                        bbox = draw_txt.textbbox((0, 0), line, font=final_font)
-                        lw = bbox[2] - bbox[0]
-                        if lw > real_max_w: real_max_w = lw
-
-                    # PARCHE BLANCO (Fondo Adaptativo con Feathering/Blur)
-                    bg_color_rgb = bubble.get('bg_color', (255, 255, 255))
-                    bg_color_rgba = (bg_color_rgb[0], bg_color_rgb[1], bg_color_rgb[2], 255) # Opacidad base alta para el blur
-                    
-                    # Aumentamos padding ligeramente
-                    patch_padding = 2
-                    bg_x1 = center_x - real_max_w // 2 - patch_padding
-                    bg_y1 = text_start_y - patch_padding
-                    bg_x2 = center_x + real_max_w // 2 + patch_padding
-                    bg_y2 = text_start_y + total_h + patch_padding
-                    
-                    # Dibujar parche (Rounded Rectangle Solido sin Blur)
-                    h_patch = bg_y2 - bg_y1
-                    if is_rectangle:
-                        # Para cajas cuadradas, radio pequeño
-                        radius = 5
-                    else:
-                        # Para ovalos, radio grande para simular redondez
-                        radius = int(min(10, h_patch * 0.3))
-                    
-                    draw.rounded_rectangle([bg_x1, bg_y1, bg_x2, bg_y2], radius=radius, fill=bg_color_rgba)
-
-                    # Dibujar Texto
-                    text_fill = bubble.get('text_color', (0, 0, 0))
-                    if len(text_fill) == 3:
-                        text_fill = (text_fill[0], text_fill[1], text_fill[2], 255)
-                    else:
-                        text_fill = (0, 0, 0, 255)
-
-                    current_y = text_start_y
-                    for i, line in enumerate(final_wrapped_lines):
-                        # Centrar horizontalmente cada linea
-                        bbox = draw_txt.textbbox((0, 0), line, font=final_font)
-                        lw = bbox[2] - bbox[0]
-                        line_x = center_x - lw // 2
-                        
-                        draw.text((line_x, current_y), line, font=final_font, fill=text_fill)
-                        
-                        current_y += final_line_heights[i] + leading
-
-                # Guardar resultado
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                img.save(output_path, quality=95)
-                return True
+            result = self.render_image(image_path, bubbles)
+            # Unica codificacion del resultado entregado (OUTPUT_QUALITY, codec segun extension)
+            return write_artifact(output_path, np.asarray(result)[:, :, ::-1])
 
         except Exception as e:
             import traceback
@@ -236,39 +74,305 @@ class TextRenderer:
                 f.write(error_msg)
             return False
 
-    def _wrap_text_pixels(self, text, font, max_width, draw_ctx):
+    def render_image(self, image_source, bubbles):
         """
-        Wraps text into lines ensuring no line exceeds max_width (in pixels).
+        Version en memoria de render_text (str path, PIL Image o PageContext).
+        Devuelve la imagen compuesta en RGB sin guardarla.
         """
-        words = text.split()
-        lines = []
-        current_line = []
+        # Abrir imagen (Soporte para str path o objeto PIL Image)
+        with self._get_image_context(image_source) as img:
+            img, _ = self.render_bubbles(img, bubbles)
+
+            # Resultado en RGB
+            if img.mode == 'RGBA':
+                img = img.convert('RGB')
+            return img
+
+    def render_bubbles(self, img, bubbles):
+        """
+        Dibuja los bocadillos sobre img (RGBA, in place).
+        Devuelve (img, layouts): un layout por bocadillo, None si no se dibuja.
+        """
+        # Fase 1: layout de todos los bocadillos (independientes entre si)
+        layouts = self.layout_bubbles(bubbles)
+        # Fase 2: composicion en una sola pasada, en el orden original
+        draw = ImageDraw.Draw(img)
+        for layout in layouts:
+            if layout:
+                self.draw_layout(draw, layout)
+        return img, layouts
+
+    def layout_bubbles(self, bubbles, execution=None):
+        """
+        layout_bubble de cada bocadillo, en serie o en un pool segun
+        RENDER_LAYOUT_EXECUTION (solo paginas con RENDER_LAYOUT_MIN_BUBBLES o mas).
+        """
+        execution = execution or RENDER_LAYOUT_EXECUTION
+        if multiprocessing.parent_process() is not None:
+            # Ya estamos en un worker del CpuStagePool: las paginas ya van en paralelo
+            execution = "serial"
+        if execution == "serial" or RENDER_LAYOUT_WORKERS < 2 or len(bubbles) < RENDER_LAYOUT_MIN_BUBBLES:
+            return [self.layout_bubble(bubble) for bubble in bubbles]
+
+        pool = _get_layout_pool(execution)
+        if execution == "thread":
+            return list(pool.map(self.layout_bubble, bubbles))
+        # Procesos: la fuente viaja como (ruta, tamaño) y se resuelve con la cache local
+        chunksize = max(1, len(bubbles) // (RENDER_LAYOUT_WORKERS * 4))
+        layouts = list(pool.map(_layout_in_worker, bubbles, chunksize=chunksize))
+        for layout in layouts:
+            if layout and isinstance(layout['font'], tuple):
+                layout['font'] = self.fonts.font(*layout['font'])
+        return layouts
+
+    def layout_bubble(self, bubble):
+        """
+        Ajuste de fuente y posiciones de un bocadillo, sin dibujar nada.
+        Devuelve un dict con lineas, fuente, posiciones, parche y 'rect' (region de la
+        pagina que ocupa el dibujo: parche + tinta), o None si no hay nada que dibujar.
+        """
+        # Obtenemos la traduccion pero limpiamos la etiqueta [SFX] si existe para que no salga en la imagen
+        raw_trans = bubble.get('translation', '')
+        text_content = raw_trans.replace('[SFX] ', '').replace('[SFX]', '') # Doble limpieza por si acaso
         
-        for word in words:
-            # Probar añadir palabra a linea actual
-            test_line = ' '.join(current_line + [word])
-            bbox = draw_ctx.textbbox((0, 0), test_line, font=font)
-            w = bbox[2] - bbox[0]
+        if not text_content:
+            return None
+            
+        # Coordenadas
+        x1, y1, x2, y2 = bubble['bbox']
+        w = x2 - x1
+        h = y2 - y1
+        
+        # Ignorar cajas muy enanas (ruido)
+        if w < 10 or h < 10:
+            return None
+
+        # --- ESTRATEGIA DE AJUSTE DE TEXTO (Pixel-Perfect) ---
+        
+        # 1. Detectar forma primero (para saber márgenes)
+        polygon = bubble.get('polygon', [])
+        is_rectangle = False
+        if polygon is not None and len(polygon) > 2:
+            try:
+                # Lista de listas (JSON) o array (N, 2) del ContourEngine
+                poly_points = np.asarray(polygon, dtype=np.float64)
+                
+                # Shoelace formula simple
+                x_coords = poly_points[:, 0]
+                y_coords = poly_points[:, 1]
+                area_poly = 0.5 * np.abs(np.dot(x_coords, np.roll(y_coords, 1)) - np.dot(y_coords, np.roll(x_coords, 1)))
+                area_bbox = w * h
+                
+                if area_bbox > 0:
+                    ratio = area_poly / area_bbox
+                    if ratio > 0.80: 
+                        is_rectangle = True
+            except Exception as e:
+                pass 
+
+        # 2. Definir margenes según forma
+        if is_rectangle:
+            # Para cuadrados: MÁXIMO espacio posible.
+            # Margen mínimo de 1-2px para no tocar el borde exacto
+            # Y restamos el padding del parche que se suma luego (patch_padding=2)
+            # Ancho Texto = Ancho Caja - (2 * patch_padding) - (2 * safety_margin)
+            # Digamos safety=1px. Total resta = 4px + 2px = 6px
+            max_w_px = w - 6 
+            max_h_px = h - 6
+        else:
+        # Para óvalos: Margen del 10% para curvatura
+            padding_ratio = 0.1 
+            max_w_px = w * (1.0 - padding_ratio * 2) 
+            max_h_px = h * (1.0 - padding_ratio * 2)
+        
+        # Obtener fuente deseada por el usuario (o Default)
+        font_name = bubble.get('font', 'ComicNeue')
+
+        # Size Strategy: Use estimated OR bounding box heuristic
+        estimated_size = bubble.get('estimated_font_size')
+        if estimated_size:
+            # Start slightly smaller than estimated (to fit translation which might be longer)
+            # Or start exact. Let's start exact.
+            font_size = int(estimated_size * 0.9) 
+        else:
+            font_size = int(h / 3) # Empezar optimista
             
-            if w <= max_width:
-                current_line.append(word)
+        min_font_size = 8
+        
+        font_path = bubble.get('font_path')
+
+        def fits(size, metrics):
+            """
+            LayoutResult si el texto cabe con estas metricas, si no None.
+            """
+            if is_rectangle:
+                # Estrategia Rectangular: validar altura
+                text = LayoutResult(self._wrap_text_pixels(text_content, metrics, max_w_px), metrics)
+                if text.total_height(int(size * 0.2)) > max_h_px:
+                    return None
             else:
-                # Si la palabra sola ya es mas larga que el ancho máx, la forzamos (o la partimos, pero complicamos)
-                # Aquí la forzamos a una linea nueva si current_line tiene algo
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    # Caso muy raro: palabra gigante. La metemos igual para no perder info.
-                    lines.append(word)
-                    current_line = []
+                # Estrategia Oval (Bocadillos de diálogo)
+                text = LayoutResult(self._wrap_text_oval(text_content, metrics, w, h), metrics)
+            return text if text.lines else None
+
+        # Day 13 Refined: Shape-Aware Wrapping
+        # Mismos tamaños que el antiguo bucle de reducción (de 2 en 2), con busqueda binaria
+        sizes = list(range(font_size, min_font_size - 1, -2))
+        fit = self._fit_font_size(sizes, fits, lambda size: self._load_font(size, font_name, font_path))
+
+        if fit:
+            font_size, final_font, text = fit
+        else:
+            # Fallback si no cabe ni con min_size (usamos wrapping rectangular clásico a fuerza bruta)
+            font_size = min_font_size
+            final_font = self._load_font(font_size, font_name, font_path)
+            metrics = self.fonts.metrics(final_font)
+            # Wrapping rectangular forzoso
+            max_w_fallback = w * 0.8
+            text = LayoutResult(self._wrap_text_pixels(text_content, metrics, max_w_fallback), metrics)
+
+        # --- GEOMETRIA FINAL (se reutiliza al dibujar) ---
+        leading = int(font_size * 0.2)
+        total_h = text.total_height(leading)
+        
+        # Centro del rectangulo
+        center_x = x1 + w // 2
+        center_y = y1 + h // 2
+        
+        # Origen de dibujo (top-left del bloque de texto completo)
+        text_start_y = center_y - total_h // 2
+        
+        # Ancho máximo real del bloque (para el parche)
+        real_max_w = max(text.widths, default=0)
+
+        # PARCHE BLANCO (Fondo Adaptativo con Feathering/Blur)
+        bg_color_rgb = bubble.get('bg_color', (255, 255, 255))
+        bg_color_rgba = (bg_color_rgb[0], bg_color_rgb[1], bg_color_rgb[2], 255) # Opacidad base alta para el blur
+        
+        # Aumentamos padding ligeramente
+        patch_padding = 2
+        bg_x1 = center_x - real_max_w // 2 - patch_padding
+        bg_y1 = text_start_y - patch_padding
+        bg_x2 = center_x + real_max_w // 2 + patch_padding
+        bg_y2 = text_start_y + total_h + patch_padding
+        
+        # Parche (Rounded Rectangle Solido sin Blur)
+        h_patch = bg_y2 - bg_y1
+        if is_rectangle:
+            # Para cajas cuadradas, radio pequeño
+            radius = 5
+        else:
+            # Para ovalos, radio grande para simular redondez
+            radius = int(min(10, h_patch * 0.3))
+
+        # Color del texto
+        text_fill = bubble.get('text_color', (0, 0, 0))
+        if len(text_fill) == 3:
+            text_fill = (text_fill[0], text_fill[1], text_fill[2], 255)
+        else:
+            text_fill = (0, 0, 0, 255)
+
+        # Posicion de cada linea (centrada) y caja de tinta
+        positions = []
+        ink = [bg_x1, bg_y1, bg_x2 + 1, bg_y2 + 1]
+        current_y = text_start_y
+        for lw, lh, (ox, oy) in zip(text.widths, text.heights, text.offsets):
+            line_x = center_x - lw // 2
+            positions.append((line_x, current_y))
+            ink = [min(ink[0], line_x + ox), min(ink[1], current_y + oy),
+                   max(ink[2], line_x + ox + lw), max(ink[3], current_y + oy + lh)]
+            current_y += lh + leading
+
+        return {
+            'lines': text.lines,
+            'font': final_font,
+            'positions': positions,
+            'patch': (bg_x1, bg_y1, bg_x2, bg_y2),
+            'radius': radius,
+            'bg_fill': bg_color_rgba,
+            'text_fill': text_fill,
+            # 1px de margen por el antialiasing
+            'rect': (int(np.floor(ink[0])) - 1, int(np.floor(ink[1])) - 1, int(np.ceil(ink[2])) + 1, int(np.ceil(ink[3])) + 1),
+        }
+
+    def draw_layout(self, draw, layout, offset=(0, 0)):
+        """
+        Pinta un layout ya calculado. offset: origen de la imagen destino en coordenadas
+        de pagina (para dibujar sobre un recorte).
+        """
+        ox, oy = offset
+        x1, y1, x2, y2 = layout['patch']
+        draw.rounded_rectangle([x1 - ox, y1 - oy, x2 - ox, y2 - oy], radius=layout['radius'], fill=layout['bg_fill'])
+        for line, (line_x, line_y) in zip(layout['lines'], layout['positions']):
+            draw.text((line_x - ox, line_y - oy), line, font=layout['font'], fill=layout['text_fill'])
+
+    def _fit_font_size(self, sizes, fits, load_font):
+        """
+        Mayor tamaño de `sizes` (descendente) con el que fits(size, metrics) devuelve
+        algo, por busqueda binaria (si un tamaño cabe, los menores tambien).
+        Primero se busca con las metricas del mayor tamaño escaladas (sin medir nada
+        mas); la frontera estimada y su vecino son las primeras medidas reales, asi
+        que normalmente bastan 2-3 tamaños medidos en vez de uno por cada paso.
+        Devuelve (size, font, resultado) o None si no cabe ni el menor.
+        """
+        if not sizes:
+            return None
+        base = self.fonts.metrics(load_font(sizes[0]))
+        guess = self._search_sizes(sizes, lambda size: fits(size, ScaledMetrics(base, size)))
+
+        def measured(size):
+            font = load_font(size)
+            result = fits(size, self.fonts.metrics(font))
+            return (font, result) if result else None
+
+        found = self._search_sizes(sizes, measured, first=guess[0] if guess else len(sizes) - 1)
+        if not found:
+            return None
+        index, (font, result) = found
+        return sizes[index], font, result
+
+    @staticmethod
+    def _search_sizes(sizes, check, first=None):
+        """
+        Busqueda binaria del primer indice de `sizes` donde check(size) es verdadero.
+        first: indice a probar primero (prediccion); despues se prueba su vecino.
+        Devuelve (indice, check(size)) o None.
+        """
+        lo, hi = 0, len(sizes) - 1
+        best = None
+        probe = first
+        while lo <= hi:
+            mid = probe if probe is not None and lo <= probe <= hi else (lo + hi) // 2
+            result = check(sizes[mid])
+            if result:
+                best, hi = (mid, result), mid - 1
+            else:
+                lo = mid + 1
+            # Tras la prediccion, confirmar la frontera con el vecino
+            probe = (hi if result else lo) if mid == first else None
+        return best
+
+    def _wrap_text_pixels(self, text, metrics, max_width):
+        """
+        Wraps text into lines ensuring no line exceeds max_width (in pixels).
+        metrics: FontMetrics de la fuente (anchos de palabra cacheados).
+        """
+        words = text.split()
+        lines = []
+        start = 0
         
-        if current_line:
-            lines.append(' '.join(current_line))
+        while start < len(words):
+            # Palabras que caben en esta linea (una sola pasada, sin re-medir la linea)
+            end = metrics.fit_words(words, start, max_width)
+            if end == start:
+                # Caso muy raro: palabra gigante. La metemos igual para no perder info.
+                end = start + 1
+            lines.append(' '.join(words[start:end]))
+            start = end
             
         return lines
 
-    def _wrap_text_oval(self, text, font, bubble_w, bubble_h, draw_ctx):
+    def _wrap_text_oval(self, text, metrics, bubble_w, bubble_h):
         """
         Wraps text into lines trying to fit into an oval shape defined by bubble_w and bubble_h.
         Iteratively tries increasing number of lines to fit the text.
@@ -279,8 +383,7 @@ class TextRenderer:
             return []
             
         # Parametros de fuente
-        bbox = draw_ctx.textbbox((0, 0), "Aj", font=font) # Altura de referencia
-        line_height_raw = bbox[3] - bbox[1]
+        line_height_raw = metrics.line_height(["Aj"]) # Altura de referencia
         leading = int(line_height_raw * 0.2)
         total_line_height = line_height_raw + leading
         
@@ -340,22 +443,10 @@ class TextRenderer:
                     break # Ya metimos todas
                     
                 max_w_this_line = allowed_widths[line_idx]
-                current_line_words = []
-                
-                while word_idx < len(words):
-                    next_word = words[word_idx]
-                    # Probar añadir
-                    test_str = ' '.join(current_line_words + [next_word])
-                    w_text = draw_ctx.textbbox((0, 0), test_str, font=font)[2] - draw_ctx.textbbox((0, 0), test_str, font=font)[0]
-                    
-                    if w_text <= max_w_this_line:
-                        current_line_words.append(next_word)
-                        word_idx += 1
-                    else:
-                        # No cabe, pasamos a siguiente linea
-                        break
-                        
-                current_lines.append(' '.join(current_line_words))
+                # Palabras que caben en esta linea; si no cabe ninguna, la linea queda vacia
+                end = metrics.fit_words(words, word_idx, max_w_this_line)
+                current_lines.append(' '.join(words[word_idx:end]))
+                word_idx = end
             
             # Al terminar las lineas, ¿quedan palabras hueérfanas?
             if word_idx < len(words):
@@ -370,7 +461,7 @@ class TextRenderer:
 
     def _load_font(self, size, font_name="ComicNeue", explicit_path=None):
         """
-        Carga una fuente.
+        Carga una fuente (cacheada por (ruta, tamaño) en FontCache).
         Prioridad:
         1. explicit_path (ruta absoluta .ttf)
         2. font_name mapping en backend/fonts
@@ -380,7 +471,7 @@ class TextRenderer:
         # 1. Ruta explicita del FontMatcher
         if explicit_path and os.path.exists(explicit_path):
             try:
-                return ImageFont.truetype(explicit_path, size)
+                return self.fonts.font(explicit_path, size)
             except:
                 pass # Fallback
 
@@ -400,15 +491,46 @@ class TextRenderer:
 
         # Prioridad 2: Fuente solicitada por nombre
         try:
-            return ImageFont.truetype(full_path, size)
+            return self.fonts.font(full_path, size)
         except:
             # Fallback 1: Intentar ComicNeue si falló la otra
             try:
                 fallback_path = os.path.join(fonts_dir, "dialogue/ComicNeue-Bold.ttf")
-                return ImageFont.truetype(fallback_path, size)
+                return self.fonts.font(fallback_path, size)
             except:
                 # Fallback final a Arial o Default
                 try:
-                    return ImageFont.truetype("arial.ttf", size)
+                    return self.fonts.font("arial.ttf", size)
                 except:
                     return ImageFont.load_default()
+
+
+_layout_pools = {}
+_layout_pools_lock = threading.Lock()
+_worker_renderer = None
+
+
+def _get_layout_pool(execution):
+    with _layout_pools_lock:
+        pool = _layout_pools.get(execution)
+        if pool is None:
+            if execution == "process":
+                # spawn: forking a process that already runs threads can deadlock the children
+                pool = ProcessPoolExecutor(max_workers=RENDER_LAYOUT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                pool = ThreadPoolExecutor(max_workers=RENDER_LAYOUT_WORKERS, thread_name_prefix="layout")
+            _layout_pools[execution] = pool
+        return pool
+
+
+def _layout_in_worker(bubble):
+    """
+    layout_bubble en un proceso del pool (el renderer y su FontCache viven por worker).
+    """
+    global _worker_renderer
+    if _worker_renderer is None:
+        _worker_renderer = TextRenderer()
+    layout = _worker_renderer.layout_bubble(bubble)
+    if layout and isinstance(getattr(layout['font'], 'path', None), str):
+        layout['font'] = (layout['font'].path, layout['font'].size)
+    return layout
@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "pages"))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "2048"))
+TMP_SUFFIX = ".tmp" # put() writes here, then renames into place
+
+class PageResultCache:
+    """
+    Content-addressed cache of whole-page pipeline results.
+    Key = sha256(image bytes + mode + target language). Each entry is a
+    directory holding entry.json (bubbles with detection, OCR and translations)
+    plus the produced artifacts (debug/clean/final images).
+    Size-bounded on disk with LRU eviction (access order tracked in memory,
+    rebuilt from mtimes at startup).
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, cache_dir: str = PAGE_CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_MB * 1024 * 1024):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(PageResultCache, cls).__new__(cls)
+                cls._instance._initialize(cache_dir, max_bytes)
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        New instance on next use, re-reading the index (e.g. another cache_dir in tests).
+        """
+        with cls._lock:
+            cls._instance = None
+
+    def _initialize(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> size in bytes (oldest first)
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            entry_json = os.path.join(entry_dir, "entry.json")
+            if key.endswith(TMP_SUFFIX) or not os.path.isfile(entry_json):
+                # Half-written entry (crash during put, possibly after entry.json)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            entries.append((os.path.getmtime(entry_json), key, self._dir_size(entry_dir)))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        print(f"[PAGE CACHE] {len(self._entries)} entries, {self._total_bytes / 1e6:.1f} MB")
+
+    @staticmethod
+    def make_key(image_bytes: bytes, mode: str, target_lang: str) -> str:
+        h = hashlib.sha256(image_bytes)
+        h.update(f"|{mode}|{target_lang}".encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"bubbles": [...], "artifacts": {name: path}} or None on miss.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry_dir, "entry.json"), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(os.path.join(entry_dir, "entry.json")) # LRU order survives restarts
+        except OSError:
+            # Evicted/removed underneath us
+            with self._lock:
+                self._forget(key)
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+        entry["artifacts"] = {name: os.path.join(entry_dir, fname) for name, fname in entry["artifacts"].items()}
+        return entry
+
+    def put(self, key: str, bubbles: list, artifacts: Dict[str, str]):
+        """
+        Stores bubbles + copies of the artifact files ({name: source path}).
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = entry_dir + TMP_SUFFIX
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            stored = {}
+            for name, src in artifacts.items():
+                if src and os.path.exists(src):
+                    fname = f"{name}{os.path.splitext(src)[1]}"
+                    shutil.copyfile(src, os.path.join(tmp_dir, fname))
+                    stored[name] = fname
+            with open(os.path.join(tmp_dir, "entry.json"), "w", encoding="utf-8") as f:
+                json.dump({"bubbles": bubbles, "artifacts": stored}, f, default=str)
+
+            with self._lock:
+                if key in self._entries:
+                    self._forget(key)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                size = self._dir_size(entry_dir)
+                self._entries[key] = size
+                self._total_bytes += size
+                self._evict()
+        except Exception as e:
+            print(f"[PAGE CACHE ERROR] Could not store {key[:12]}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _evict(self):
+        # Caller holds the lock. Never evict the entry just written.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            print(f"[PAGE CACHE] Evicted {oldest[:12]}")
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, 0)
+        self._total_bytes -= size
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 from sklearn.cluster import KMeans
+from services.page_context import PageContext
 
 class StyleAnalyzer:
     _instance = None
@@ -11,11 +12,17 @@ class StyleAnalyzer:
             cls._instance = super(StyleAnalyzer, cls).__new__(cls)
         return cls._instance
 
-    def analyze_roi(self, image: np.ndarray, bbox: list) -> Dict[str, Any]:
+    def analyze_roi(self, image, bbox: list) -> Dict[str, Any]:
         """
         Main entry point. Analyzes a Region of Interest (ROI) defined by bbox
         and returns a dictionary of style attributes.
+        Accepts a BGR ndarray or a PageContext (reuses its cached grayscale view).
         """
+        page_gray = None
+        if isinstance(image, PageContext):
+            page_gray = image.gray
+            image = image.image
+
         x1, y1, x2, y2 = map(int, bbox)
         h, w = image.shape[:2]
         
@@ -27,9 +34,10 @@ class StyleAnalyzer:
             return self._get_default_style()
 
         roi = image[y1:y2, x1:x2]
+        gray_roi = page_gray[y1:y2, x1:x2] if page_gray is not None else None
         
         # 1. Binarization (Isolate Text)
-        mask, is_dark_bg = self._binarize_text(roi)
+        mask, is_dark_bg = self._binarize_text(roi, gray_roi)
         
         # 2. Pixel Density (Bold Detection)
         density_data = self._analyze_density(mask)
@@ -48,14 +56,15 @@ class StyleAnalyzer:
             **geo_data
         }
 
-    def _binarize_text(self, roi: np.ndarray) -> Tuple[np.ndarray, bool]:
+    def _binarize_text(self, roi: np.ndarray, gray: Optional[np.ndarray] = None) -> Tuple[np.ndarray, bool]:
         """
         Returns binary mask (255=text, 0=bg) and boolean (True if inverted/dark bg).
         Uses Otsu's thresholding with Automatic Background Detection.
         """
         if roi.size == 0: return np.zeros((1,1), np.uint8), False
         
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
         
         # Otsu's thresholding
         thresh_val, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+Rect = Tuple[int, int, int, int] # x1, y1, x2, y2 (exclusive)
+
+# Dilation applied to every text mask (covers JPG compression halos around letters)
+MASK_KERNEL = np.ones((3, 3), np.uint8)
+MASK_DILATE_ITERATIONS = 2
+# How far the dilation can spread outside the thresholded pixels
+MASK_MARGIN = (MASK_KERNEL.shape[0] // 2) * MASK_DILATE_ITERATIONS
+_CLEAN_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+
+
+class SparseMask:
+    """
+    Page mask kept as ROIs: [(rect, uint8 0/255 mask of the rect)], each rect tight
+    around its masked pixels. Overlapping regions combine as a union.
+    """
+    def __init__(self, shape: Tuple[int, int]):
+        self.shape = shape[:2]
+        self.regions = [] # [(rect, roi_mask)]
+
+    def __bool__(self):
+        return bool(self.regions)
+
+    def add(self, rect: Rect, roi: np.ndarray):
+        """
+        Adds a ROI mask at `rect`, trimmed to its masked pixels (empty ROIs are dropped).
+        """
+        x, y, w, h = cv2.boundingRect(roi)
+        if w == 0 or h == 0:
+            return
+        x1, y1 = rect[0] + x, rect[1] + y
+        self.regions.append(((x1, y1, x1 + w, y1 + h), roi[y:y + h, x:x + w]))
+
+    @property
+    def rects(self) -> List[Rect]:
+        return [rect for rect, _ in self.regions]
+
+    def area(self) -> int:
+        return sum(cv2.countNonZero(roi) for _, roi in self.regions)
+
+    def crop(self, rect: Rect) -> np.ndarray:
+        """
+        uint8 mask (0/255) of any page rect, composed from the regions that touch it.
+        """
+        x1, y1, x2, y2 = rect
+        out = np.zeros((y2 - y1, x2 - x1), np.uint8)
+        for (rx1, ry1, rx2, ry2), roi in self.regions:
+            ix1, iy1, ix2, iy2 = max(x1, rx1), max(y1, ry1), min(x2, rx2), min(y2, ry2)
+            if ix1 >= ix2 or iy1 >= iy2:
+                continue
+            target = out[iy1 - y1:iy2 - y1, ix1 - x1:ix2 - x1]
+            np.maximum(target, roi[iy1 - ry1:iy2 - ry1, ix1 - rx1:ix2 - rx1], out=target)
+        return out
+
+    def to_dense(self) -> np.ndarray:
+        h, w = self.shape
+        return self.crop((0, 0, w, h))
+
+
+def build_text_mask(img: np.ndarray, bubbles: list, mask_mode: str = 'bubble') -> SparseMask:
+    """
+    Text pixels to erase, per bubble, as a SparseMask (uint8 end to end).
+    mask_mode='text' uses the OCR word boxes when the bubble has them; otherwise the
+    bubble ROI is thresholded adaptively (dark text on light bubbles, light text on
+    dark ones). Grey conversion runs once per page and dilation only on each ROI.
+    """
+    h, w = img.shape[:2]
+    mask = SparseMask((h, w))
+    gray = None
+
+    for bubble in bubbles:
+        if mask_mode == 'text' and bubble.get('word_boxes'):
+            # Modo Fino: word_boxes en coordenadas de pagina
+            polys = [np.array(wb, np.int32) for wb in bubble['word_boxes']]
+            points = np.concatenate(polys)
+            x1, y1 = max(0, int(points[:, 0].min())), max(0, int(points[:, 1].min()))
+            x2, y2 = min(w, int(points[:, 0].max()) + 1), min(h, int(points[:, 1].max()) + 1)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            roi = np.zeros((y2 - y1, x2 - x1), np.uint8)
+            cv2.fillPoly(roi, [p - (x1, y1) for p in polys], 255)
+        else:
+            x1, y1, x2, y2 = map(int, bubble['bbox'])
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            if gray is None:
+                gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+            gray_roi = gray[y1:y2, x1:x2]
+
+            if cv2.mean(gray_roi)[0] > 100:
+                # Globo claro, texto oscuro
+                roi = cv2.adaptiveThreshold(gray_roi, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 21, 10)
+            else:
+                # Globo oscuro, texto claro
+                _, roi = cv2.threshold(gray_roi, 150, 255, cv2.THRESH_BINARY)
+            # Eliminar ruido diminuto (puntos)
+            roi = cv2.morphologyEx(roi, cv2.MORPH_OPEN, _CLEAN_KERNEL)
+            if not cv2.countNonZero(roi):
+                # Mejor no borrar nada que borrarlo todo
+                print(f"[INPAINT WARNING] No text detected in bubble {x1},{y1}. Skipping mask.")
+                continue
+
+        mask.add(*_dilate_roi(roi, (x1, y1, x2, y2), w, h))
+    return mask
+
+
+def _dilate_roi(roi: np.ndarray, rect: Rect, w: int, h: int):
+    """
+    Dilates a ROI mask inside a rect grown by MASK_MARGIN (clamped to the page), so
+    the result matches dilating the full page.
+    """
+    x1, y1, x2, y2 = rect
+    gx1, gy1 = max(0, x1 - MASK_MARGIN), max(0, y1 - MASK_MARGIN)
+    gx2, gy2 = min(w, x2 + MASK_MARGIN), min(h, y2 + MASK_MARGIN)
+    grown = np.zeros((gy2 - gy1, gx2 - gx1), np.uint8)
+    grown[y1 - gy1:y2 - gy1, x1 - gx1:x2 - gx1] = roi
+    return (gx1, gy1, gx2, gy2), cv2.dilate(grown, MASK_KERNEL, iterations=MASK_DILATE_ITERATIONS)
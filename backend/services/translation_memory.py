@@ -0,0 +1,186 @@
+import os
+import re
+import uuid
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import SessionLocal
+from models import TranslationMemory as TranslationMemoryEntry
+
+TRANSLATION_MEMORY_LRU = int(os.getenv("TRANSLATION_MEMORY_LRU", "5000"))
+_HIT_FLUSH_KEYS = 256 # Hit counters are written once this many entries have pending hits (or with the next store)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_source(text: str) -> str:
+    """
+    Canonical form of a source line: NFKC + collapsed whitespace.
+    Case is kept on purpose ("WHAT?!" is a shout, "What?!" is not).
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+class TranslationMemory:
+    """
+    Persistent translation memory keyed on (normalized source, target language, provider).
+    Backed by the `translation_memory` table (database.py engine) with an
+    in-process LRU in front. If the table is missing (migration not applied)
+    it degrades to the LRU only.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls, lru_size: int = TRANSLATION_MEMORY_LRU):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(TranslationMemory, cls).__new__(cls)
+                cls._instance.lru_size = lru_size
+                cls._instance._lru = OrderedDict() # key -> translation
+                cls._instance._pending_hits = {} # key -> DB hits not written yet
+                cls._instance._db_enabled = True
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """
+        Empties the LRU; the next instance talks to the current SessionLocal.
+        """
+        with cls._lock:
+            cls._instance = None
+
+    @staticmethod
+    def make_key(source: str, target_lang: str, provider: str) -> str:
+        return hashlib.sha256(f"{normalize_source(source)}|{target_lang}|{provider}".encode("utf-8")).hexdigest()
+
+    def lookup_many(self, texts: List[str], target_lang: str, provider: str) -> Dict[int, str]:
+        """
+        Returns {index: translation} for every text found in memory.
+        One LRU pass, then a single DB query for the remaining keys.
+        """
+        keys = {i: self.make_key(t, target_lang, provider) for i, t in enumerate(texts) if normalize_source(t)}
+        found = {}
+        with self._lock:
+            for i, key in keys.items():
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[i] = self._lru[key]
+
+        missing = {key for i, key in keys.items() if i not in found}
+        if missing and self._db_enabled:
+            from_db = self._db_lookup(missing)
+            if from_db:
+                with self._lock:
+                    for key, translation in from_db.items():
+                        self._remember(key, translation)
+                for i, key in keys.items():
+                    if i not in found and key in from_db:
+                        found[i] = from_db[key]
+        return found
+
+    def store_many(self, pairs: List[Tuple[str, str]], target_lang: str, provider: str):
+        """
+        Saves (source, translation) pairs. Empty translations are ignored.
+        """
+        rows = {}
+        for source, translation in pairs:
+            norm = normalize_source(source)
+            if norm and translation and translation.strip():
+                rows[self.make_key(source, target_lang, provider)] = (norm, translation)
+        if not rows:
+            return
+
+        with self._lock:
+            for key, (_, translation) in rows.items():
+                self._remember(key, translation)
+
+        if self._db_enabled:
+            self._db_store(rows, target_lang, provider)
+
+    def _remember(self, key: str, translation: str):
+        # Caller holds the lock
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _db_lookup(self, keys: set) -> Dict[str, str]:
+        # Read-only: hit counters are batched (_count_hits) instead of a write per lookup
+        db = SessionLocal()
+        try:
+            rows = db.query(TranslationMemoryEntry.key, TranslationMemoryEntry.translation).filter(
+                TranslationMemoryEntry.key.in_(keys)).all()
+        except SQLAlchemyError as e:
+            self._disable_db(e)
+            return {}
+        finally:
+            db.close()
+        found = {key: translation for key, translation in rows}
+        self._count_hits(found)
+        return found
+
+    def _count_hits(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+            if len(self._pending_hits) < _HIT_FLUSH_KEYS:
+                return
+            hits, self._pending_hits = self._pending_hits, {}
+        db = SessionLocal()
+        try:
+            self._write_hits(db, hits)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            self._disable_db(e)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write_hits(db, hits: Dict[str, int]):
+        # One UPDATE per distinct increment
+        now = datetime.utcnow()
+        by_count = {}
+        for key, count in hits.items():
+            by_count.setdefault(count, []).append(key)
+        for count, keys in by_count.items():
+            db.execute(update(TranslationMemoryEntry).where(TranslationMemoryEntry.key.in_(keys)).values(
+                hits=TranslationMemoryEntry.hits + count, last_used_at=now))
+
+    def _db_store(self, rows: Dict[str, Tuple[str, str]], target_lang: str, provider: str):
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, {}
+        db = SessionLocal()
+        try:
+            # Upsert: a line another worker inserted meanwhile is updated, the rest of the batch still lands
+            dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+            now = datetime.utcnow()
+            stmt = dialect.insert(TranslationMemoryEntry).values([
+                dict(id=str(uuid.uuid4()), key=key, source_text=source, target_lang=target_lang, provider=provider,
+                     translation=translation, hits=0, created_at=now, last_used_at=now)
+                for key, (source, translation) in rows.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(index_elements=["key"],
+                                                  set_={"translation": stmt.excluded.translation}))
+            if hits:
+                self._write_hits(db, hits)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            self._disable_db(e)
+        finally:
+            db.close()
+
+    def _disable_db(self, error: Exception):
+        message = str(error)
+        if "no such table" in message or "does not exist" in message:
+            print("[TM WARNING] translation_memory table missing (run 'alembic upgrade head'). Using in-memory LRU only.")
+            self._db_enabled = False
+        else:
+            print(f"[TM ERROR] {message.splitlines()[0]}")
@@ -0,0 +1,90 @@
+import os
+import re
+import json
+from typing import List, Tuple, Dict, Any, Callable, Awaitable
+
+# How many times a batch may be re-asked (missing ids) or halved (unparsable reply) before the leftovers fall back to single calls
+TRANSLATE_MAX_RETRY_DEPTH = int(os.getenv("TRANSLATE_MAX_RETRY_DEPTH", "4"))
+
+# Marker shared by the page and chapter prompts: the dialogues JSON follows it
+ITEMS_HEADER = "DIALOGUES (JSON):"
+RESPONSE_FORMAT = '{"translations": {"<id>": "<translation>"}}'
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+Item = Tuple[str, str] # (id, source text)
+
+
+def format_items(items: List[Item]) -> str:
+    """
+    Dialogues block for a prompt: the header plus [{"id", "text"}, ...] in reading order.
+    """
+    payload = json.dumps([{"id": i, "text": t} for i, t in items], ensure_ascii=False, indent=0)
+    return f"{ITEMS_HEADER}\n{payload}"
+
+
+def parse_response(response_text: str) -> Dict[str, Any]:
+    """
+    First JSON object in an LLM reply (tolerates markdown fences and chatter around it).
+    """
+    match = _JSON_OBJECT.search(response_text.replace("```json", "").replace("```", ""))
+    if not match:
+        raise ValueError("No JSON object in response")
+    return json.loads(match.group(0))
+
+
+def extract_translations(data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    {"translations": {id: text}} or {"translations": [{"id", "translation"|"text"}]} -> {id: text}.
+    """
+    translations = data.get("translations") or {}
+    if isinstance(translations, list):
+        translations = {
+            entry.get("id"): entry.get("translation", entry.get("text"))
+            for entry in translations if isinstance(entry, dict)
+        }
+    if not isinstance(translations, dict):
+        raise ValueError(f"Unexpected translations: {type(translations).__name__}")
+    return {str(k): str(v).strip() for k, v in translations.items() if k is not None and v is not None}
+
+
+async def request_by_id(items: List[Item], send: Callable[[List[Item]], Awaitable[Dict[str, str]]],
+                        max_depth: int = TRANSLATE_MAX_RETRY_DEPTH) -> Dict[str, str]:
+    """
+    Translates items through `send(items) -> {id: translation}`.
+    - Ids missing (or empty) in an answer are re-sent on their own; answered ids are kept.
+    - A batch whose reply can't be parsed (ValueError) is split in halves.
+    - Any other error (auth, quota, network) stops right away: splitting would only repeat it.
+    Returns every id it could get; the caller decides what to do with leftovers.
+    """
+    found = {}
+    try:
+        await _request(items, send, found, max_depth, 0)
+    except Exception as e:
+        print(f"[TRANSLATE] Request failed, {len(items) - len(found)}/{len(items)} ids left to the fallback: {e}")
+    return found
+
+
+async def _request(items: List[Item], send, found: Dict[str, str], max_depth: int, depth: int):
+    try:
+        answer = await send(items)
+    except ValueError as e:
+        print(f"[TRANSLATE] Unparsable reply for a batch of {len(items)}: {e}")
+        answer = {}
+
+    wanted = {item_id for item_id, _ in items}
+    answered = {item_id: text for item_id, text in answer.items() if item_id in wanted and text}
+    found.update(answered)
+    missing = [item for item in items if item[0] not in answered]
+    if not missing or depth >= max_depth:
+        return
+
+    if answered:
+        # Partial answer: only the missing ids go again
+        print(f"[TRANSLATE] {len(missing)}/{len(items)} ids missing, re-sending only those")
+        await _request(missing, send, found, max_depth, depth + 1)
+    elif len(items) > 1:
+        mid = len(items) // 2
+        print(f"[TRANSLATE] Splitting batch of {len(items)} in halves")
+        await _request(items[:mid], send, found, max_depth, depth + 1)
+        await _request(items[mid:], send, found, max_depth, depth + 1)
@@ -1,10 +1,26 @@
 import os
-import google.generativeai as genai
+import asyncio
+from concurrent.futures import Future
 from dotenv import load_dotenv
+from services.translation_memory import TranslationMemory
+from services.async_translator import AsyncTranslatorClient
+from services import registry
+from services.translation_protocol import format_items, parse_response, extract_translations, request_by_id, RESPONSE_FORMAT
 
 # Load env vars from backend/.env
 load_dotenv()
 
+GEMINI_MODEL = 'gemini-flash-latest'
+
+# Reglas comunes a los prompts de batch (pagina) y capitulo
+PROMPT_RULES = """IMPORTANT RULES:
+- Maintain CONSISTENT TONE between related dialogues (formal/informal)
+- Preserve slang, sarcasm, and humor
+- Keep character voice consistency
+- For sound effects (SFX/onomatopoeia like BOOM, SPLASH), prepend '[SFX]'
+- Be concise to fit speech bubbles
+- Translate naturally, not literally"""
+
 class TranslatorService:
     def __init__(self, target_lang='es'):
         self.target_lang = target_lang
@@ -15,10 +31,10 @@ class TranslatorService:
             self.model = None
         else:
             try:
-                genai.configure(api_key=self.api_key)
                 # Available models: gemini-flash-latest (Usually 1.5 Flash)
                 # Usamos el alias latest para asegurar compatibilidad free tier
-                self.model = genai.GenerativeModel('gemini-flash-latest')
+                # Modelo compartido por proceso (genai.configure solo una vez)
+                self.model = registry.gemini_model(GEMINI_MODEL)
                 print("Gemini Translator initialized successfully (Model: gemini-flash-latest).")
             except Exception as e:
                 print(f"Error initializing Gemini: {e}")
@@ -36,9 +52,7 @@ class TranslatorService:
             print("Gemini model not initialized.")
             # Fallback direct
             try:
-                from deep_translator import GoogleTranslator
-                fallback = GoogleTranslator(source='auto', target='es')
-                return fallback.translate(text), "Google Translate (Basic)"
+                return registry.fallback_translator('es').translate(text), "Google Translate (Basic)"
             except:
                 # If everything fails, return mock translation to prove pipeline works
                 return f"[ES] {text}", "Mock Translator"
@@ -71,9 +85,7 @@ class TranslatorService:
                 print("Falling back to Google Translate (deep-translator)...")
                 
                 # Fallback
-                from deep_translator import GoogleTranslator
-                fallback = GoogleTranslator(source='auto', target='es')
-                return fallback.translate(text), "Google Translate (Fallback)"
+                return registry.fallback_translator('es').translate(text), "Google Translate (Fallback)"
                 
         except Exception as e:
             print(f"Global Translation error: {e}")
@@ -87,74 +99,123 @@ class TranslatorService:
         Output: ["¡Hola!", "¿Qué tal?", "¡Bien, gracias!"]
         
         Día 24: Traducción con contexto de página completa.
+        Las lineas ya traducidas (translation memory) no se envian al LLM;
+        solo los fallos van en el batch y se reinsertan en su orden.
         """
         if not texts_list or not any(t.strip() for t in texts_list):
             return [""] * len(texts_list), "None"
-        
+
+        results, pending = self.memory_lookup(texts_list, GEMINI_MODEL)
+        if not pending:
+            return results, "Translation Memory"
+
+        pending_texts = [texts_list[i] for i in pending]
+        translations, provider, learned = self._translate_batch_llm(pending_texts)
+        return self.memory_merge(results, pending, pending_texts, translations, provider, learned, GEMINI_MODEL)
+
+    def translate_batch_async(self, texts_list) -> Future:
+        """
+        Version no bloqueante de translate_batch_with_context.
+        La llamada al LLM va por el AsyncTranslatorClient compartido (concurrencia
+        acotada + rate limit), asi el worker puede seguir con el inpainting.
+        Devuelve un Future con (translations, provider).
+        """
+        return AsyncTranslatorClient().run(self._translate_batch_with_context_async(texts_list))
+
+    async def _translate_batch_with_context_async(self, texts_list):
+        if not texts_list or not any(t.strip() for t in texts_list):
+            return [""] * len(texts_list), "None"
+
+        # La memoria va por modelo: lo que responda otro backend no se sirve como Gemini
+        client = AsyncTranslatorClient()
+        model_id = client.model_id if client.available else GEMINI_MODEL
+        results, pending = await asyncio.to_thread(self.memory_lookup, texts_list, model_id)
+        if not pending:
+            return results, "Translation Memory"
+
+        pending_texts = [texts_list[i] for i in pending]
+        if not client.available:
+            translations, provider, learned = await asyncio.to_thread(self._translate_batch_llm, pending_texts)
+        else:
+            async def send(items):
+                return extract_translations(parse_response(await client.complete(self._batch_prompt(items))))
+            translations, provider, learned = await self._translate_items(pending_texts, send, client.provider)
+        return await asyncio.to_thread(self.memory_merge, results, pending, pending_texts, translations, provider, learned, model_id)
+
+    def memory_lookup(self, texts_list, model_id):
+        """
+        Consulta la translation memory del modelo `model_id`. Devuelve (results con huecos, indices pendientes).
+        """
+        remembered = TranslationMemory().lookup_many(texts_list, self.target_lang, model_id)
+        results = [remembered.get(i, "") for i in range(len(texts_list))]
+        pending = [i for i, text in enumerate(texts_list) if text.strip() and i not in remembered]
+        if remembered:
+            print(f"[TM] {len(remembered)}/{len(texts_list)} lines served from translation memory")
+        return results, pending
+
+    def memory_merge(self, results, pending, pending_texts, translations, provider, learned, model_id):
+        """
+        Reinserta las traducciones nuevas en su orden y memoriza bajo `model_id` las que devolvio
+        el LLM (`learned`: posiciones en pending_texts), aunque el resto del batch fuera por fallback.
+        """
+        for i, translation in zip(pending, translations):
+            results[i] = translation
+
+        # Solo memorizamos traducciones reales del LLM (no fallbacks ni mocks)
+        pairs = [(pending_texts[k], translations[k]) for k in sorted(learned)]
+        if pairs:
+            TranslationMemory().store_many(pairs, self.target_lang, model_id)
+        return results, provider
+
+    def _translate_batch_llm(self, texts_list):
+        """
+        Llamada contextual al LLM para una lista de textos (sin translation memory).
+        Devuelve (translations, provider, posiciones traducidas por el LLM).
+        """
         if not self.model:
             # Fallback a traducción individual si no hay modelo
             print("Gemini not available, falling back to individual translation...")
             results = [self.translate(text)[0] for text in texts_list]
-            return results, "Google Translate (Batch Fallback)"
-        
-        try:
-            # Formatear textos con números
-            texts_formatted = "\n".join([f"{i+1}. {text}" for i, text in enumerate(texts_list) if text.strip()])
-            
-            # Prompt contextual mejorado
-            prompt = f"""Act as a professional comic book translator specialized in manga/comics.
+            return results, "Google Translate (Batch Fallback)", set()
 
-Translate the following dialogues from English (or source language) to Spanish (Spain).
+        async def send(items):
+            response = await asyncio.to_thread(self.model.generate_content, self._batch_prompt(items))
+            return extract_translations(parse_response(response.text))
+        # Llamado desde workers/hilos sin event loop propio
+        return asyncio.run(self._translate_items(texts_list, send, "Gemini Flash (Contextual)"))
 
-IMPORTANT RULES:
-- Maintain CONSISTENT TONE between related dialogues (formal/informal)
-- Preserve slang, sarcasm, and humor
-- Keep character voice consistency
-- For sound effects (SFX/onomatopoeia like BOOM, SPLASH), prepend '[SFX]'
-- Be concise to fit speech bubbles
-- Translate naturally, not literally
+    async def _translate_items(self, texts_list, send, provider):
+        """
+        Protocolo JSON por id (b0, b1, ...): solo se reenvian los ids que faltan y los
+        batches con respuesta ilegible se parten en mitades. Lo que siga faltando se traduce individualmente.
+        Devuelve (translations, provider, posiciones que respondio el LLM).
+        """
+        items = [(f"b{i}", text) for i, text in enumerate(texts_list)]
+        found = await request_by_id(items, send)
+        translations = [found.get(item_id, "") for item_id, _ in items]
+        missing = [i for i, (item_id, _) in enumerate(items) if item_id not in found]
+        if missing:
+            print(f"[TRANSLATE] {len(missing)}/{len(items)} lines falling back to individual translation")
+            fallback = await asyncio.to_thread(lambda: [self.translate(texts_list[i])[0] for i in missing])
+            for i, translation in zip(missing, fallback):
+                translations[i] = translation
+            provider = "Gemini Flash (Individual Fallback)" if len(missing) == len(items) else "Gemini Flash (Partial Fallback)"
+        learned = {i for i, (item_id, _) in enumerate(items) if item_id in found}
+        return translations, provider, learned
 
-Dialogues to translate:
-{texts_formatted}
+    @staticmethod
+    def _batch_prompt(items):
+        # Prompt contextual mejorado: cada dialogo va con su id y la respuesta es JSON por id
+        return f"""Act as a professional comic book translator specialized in manga/comics.
 
-Respond ONLY with the translations, one per line, in the SAME ORDER.
-Do NOT include line numbers, explanations, or extra text.
-Just the pure translations."""
+Translate the following dialogues from English (or source language) to Spanish (Spain).
 
-            response = self.model.generate_content(prompt)
-            translations_text = response.text.strip()
-            
-            # Parsear respuesta (limpiar números si los añadió)
-            lines = translations_text.split('\n')
-            translations = []
-            
-            for line in lines:
-                # Limpiar números al inicio (ej: "1. Hola" -> "Hola")
-                cleaned = line.strip()
-                if cleaned and cleaned[0].isdigit():
-                    # Quitar "1. " o "1) " o "1 - "
-                    parts = cleaned.split('. ', 1)
-                    if len(parts) > 1:
-                        cleaned = parts[1]
-                    else:
-                        parts = cleaned.split(') ', 1)
-                        if len(parts) > 1:
-                            cleaned = parts[1]
-                
-                translations.append(cleaned)
-            
-            # Asegurarse de que tenemos el mismo número de traducciones
-            while len(translations) < len(texts_list):
-                translations.append("")
-            
-            return translations[:len(texts_list)], "Gemini Flash (Contextual)"
-            
-        except Exception as e:
-            print(f"Batch translation error: {e}")
-            print("Falling back to individual translation...")
-            # Fallback a traducción individual
-            results = [self.translate(text)[0] for text in texts_list]
-            return results, "Gemini Flash (Individual Fallback)"
+{PROMPT_RULES}
+
+{format_items(items)}
+
+Respond ONLY with a JSON object, no markdown: {RESPONSE_FORMAT}
+Every id must appear exactly once. Never merge or split dialogues."""
 
     def classify_bubbles_batch(self, texts_list):
         """
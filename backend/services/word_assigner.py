@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+from collections import defaultdict
+from typing import List, Dict, Any
+
+class WordAssigner:
+    """
+    Assigns page-absolute OCR words to detected bubbles.
+    Bubble bboxes go into a uniform grid (cell ~ median bubble size), so each
+    word only tests the few bubbles whose cells contain its center:
+    O(words * bubbles per cell) instead of O(words * bubbles).
+    A word belongs to the smallest bubble whose polygon (or bbox, if there is
+    no polygon) contains its center; nested bubbles win over their parents.
+    """
+    def __init__(self, bubbles: List[Dict[str, Any]], cell_size: int = None):
+        self.bubbles = bubbles
+        self.boxes = [tuple(map(int, b['bbox'])) for b in bubbles]
+        if cell_size is None:
+            sides = [max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in self.boxes]
+            cell_size = int(np.median(sides)) if sides else 128
+        self.cell_size = max(16, cell_size)
+
+        self.polygons = []
+        for bubble in bubbles:
+            polygon = bubble.get('polygon')
+            if polygon is not None and len(polygon) > 2:
+                self.polygons.append(np.asarray(polygon, dtype=np.int32).reshape(-1, 1, 2))
+            else:
+                self.polygons.append(None)
+
+        self.grid = defaultdict(list) # (cx, cy) -> bubble indices
+        for idx, (x1, y1, x2, y2) in enumerate(self.boxes):
+            for cx in range(x1 // self.cell_size, x2 // self.cell_size + 1):
+                for cy in range(y1 // self.cell_size, y2 // self.cell_size + 1):
+                    self.grid[(cx, cy)].append(idx)
+
+    def find_bubble(self, x: float, y: float) -> int:
+        """
+        Index of the bubble containing the point, or -1.
+        """
+        best, best_area = -1, None
+        for idx in self.grid.get((int(x) // self.cell_size, int(y) // self.cell_size), ()):
+            x1, y1, x2, y2 = self.boxes[idx]
+            if not (x1 <= x <= x2 and y1 <= y <= y2):
+                continue
+            polygon = self.polygons[idx]
+            if polygon is not None and cv2.pointPolygonTest(polygon, (float(x), float(y)), False) < 0:
+                continue
+            area = (x2 - x1) * (y2 - y1)
+            if best_area is None or area < best_area:
+                best, best_area = idx, area
+        return best
+
+    def assign(self, words: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        words: [{"text", "break", "box": [(x,y) x4]}] in Vision reading order.
+        Returns one word list per bubble (reading order kept). Words outside every bubble are dropped.
+        """
+        per_bubble = [[] for _ in self.bubbles]
+        for word in words:
+            box = np.asarray(word['box'], dtype=np.float32)
+            if box.size == 0:
+                continue
+            cx, cy = box.mean(axis=0)
+            idx = self.find_bubble(cx, cy)
+            if idx >= 0:
+                per_bubble[idx].append(word)
+        return per_bubble
+
+    @staticmethod
+    def join_words(words: List[Dict[str, Any]]) -> str:
+        """
+        Rebuilds the bubble text with Vision's detected breaks (spaces / line breaks).
+        """
+        return "".join(w['text'] + w.get('break', ' ') for w in words).strip()
@@ -0,0 +1,52 @@
+import time
+from fixtures import StubLLMServer, use_memory_db
+from services.async_translator import AsyncTranslatorClient, HttpLLMBackend, TokenBucket
+from services.translation_memory import TranslationMemory
+from services.translator import TranslatorService, GEMINI_MODEL
+
+def test_async_translator():
+    print("\n--- Testing Async Translator (stub LLM server) ---")
+    with use_memory_db():
+        # Quota of 2 req/s on the server, Retry-After 0.2s on 429
+        stub = StubLLMServer(latency=0.05, rps=2, retry_after=0.2).start()
+        AsyncTranslatorClient.reset()
+        client = AsyncTranslatorClient(backend=HttpLLMBackend(stub.url), concurrency=8, rpm=1e9, burst=8, max_retries=10, backoff_base=0.05)
+        try:
+            translator = TranslatorService(target_lang='es')
+            pages = [[f"Page {p}!", f"Line {p}?"] for p in range(6)]
+            futures = [translator.translate_batch_async(texts) for texts in pages]
+            results = [f.result(timeout=30) for f in futures]
+            print(f"Results: {results[:2]}... 429s: {stub.rejected}")
+            for p, (translations, provider) in enumerate(results):
+                assert translations == [f"ES:Page {p}!", f"ES:Line {p}?"]
+                assert provider == "LLM Stub (Contextual)"
+            # Unthrottled client overshoots the quota; every 429 was retried
+            assert stub.rejected > 0 and client.rate_limited == stub.rejected
+
+            # Memorized under the stub's model id, never served as Gemini output
+            assert TranslationMemory().lookup_many(["Page 0!"], 'es', client.model_id) == {0: "ES:Page 0!"}
+            assert TranslationMemory().lookup_many(["Page 0!"], 'es', GEMINI_MODEL) == {}
+
+            # Empty page never reaches the server
+            requests = stub.requests
+            assert translator.translate_batch_async(["", " "]).result() == (["", ""], "None")
+            assert stub.requests == requests
+        finally:
+            client.shutdown()
+            stub.stop()
+
+        # Token bucket paces requests to the quota: burst 1 at 10/s -> 5 tokens take ~0.4s
+        bucket_client = AsyncTranslatorClient(backend=HttpLLMBackend("http://unused"))
+        bucket = TokenBucket(rate=10, capacity=1)
+        async def take(n):
+            for _ in range(n):
+                await bucket.acquire()
+        start = time.perf_counter()
+        bucket_client.run(take(5)).result()
+        elapsed = time.perf_counter() - start
+        bucket_client.shutdown()
+        assert 0.35 < elapsed < 1.0, elapsed
+    print("✅ Async translator passed")
+
+if __name__ == "__main__":
+    test_async_translator()
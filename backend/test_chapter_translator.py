@@ -0,0 +1,122 @@
+import json
+import time
+import threading
+from fixtures import use_memory_db
+from services.async_translator import AsyncTranslatorClient
+from services.chapter_translator import ChapterTranslator
+from services.translation_memory import TranslationMemory
+from services.translator import TranslatorService, GEMINI_MODEL
+from services.translation_protocol import ITEMS_HEADER
+
+class FakeChapterLLM:
+    """
+    Async backend: answers the chapter JSON protocol with 'ES:<text>', a summary
+    naming the pages seen and a glossary entry. Drops id p5.b1 once.
+    """
+    provider = "Fake Chapter LLM"
+    model_id = "fake-chapter-llm"
+
+    def __init__(self):
+        self.prompts = []
+        self.dropped = False
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        dialogues = json.loads(prompt.split(ITEMS_HEADER + "\n", 1)[1].split("\n\nRespond", 1)[0])
+        translations = {d["id"]: f"ES:{d['text']}" for d in dialogues}
+        if "p5.b1" in translations and not self.dropped:
+            self.dropped = True
+            del translations["p5.b1"]
+        pages = sorted({d["id"].split(".")[0] for d in dialogues})
+        return "```json\n" + json.dumps({
+            "translations": translations,
+            "summary": f"Seen {','.join(pages)}",
+            "glossary": {"Straw Hat": "Sombrero de Paja"}
+        }) + "\n```"
+
+def stub_translator():
+    # Own instance (not the registry singleton): no Gemini model, so only the chapter backend answers
+    translator = TranslatorService(target_lang='es')
+    translator.model = None
+    return translator
+
+def test_chapter_translator():
+    print("\n--- Testing Chapter Translation (token budget + rolling context) ---")
+    with use_memory_db():
+        backend = FakeChapterLLM()
+        AsyncTranslatorClient.reset()
+        client = AsyncTranslatorClient(backend=backend, rpm=1e9, burst=10)
+        try:
+            # 8 pages x 2 non-empty bubbles (~11 tokens each) -> budget 50 packs 2 pages per request
+            pages = [[f"Page {p} says hi", f"Straw Hat {p}!", ""] for p in range(8)]
+            chapter = ChapterTranslator(total_pages=9, token_budget=50, max_wait_ms=2000, translator=stub_translator())
+
+            # Workers deliver pages out of order; page 8 fails before translation
+            futures = {}
+            def worker(p):
+                futures[p] = chapter.submit_page(p, pages[p])
+            threads = [threading.Thread(target=worker, args=(p,)) for p in (1, 0, 3, 2, 5, 4, 7, 6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            chapter.skip(8)
+
+            for p in range(8):
+                translations, provider = futures[p].result(timeout=10)
+                assert translations == [f"ES:Page {p} says hi", f"ES:Straw Hat {p}!", ""], translations
+
+            # 4 packed requests + 1 re-sending only the dropped id
+            print(f"Requests: {len(backend.prompts)} for 8 pages")
+            assert len(backend.prompts) == 5
+            assert '"p5.b1"' in backend.prompts[3] and '"p5.b0"' not in backend.prompts[3]
+            # Strict page order and rolling context: each request sees the previous summary + glossary
+            assert '"p0.b0"' in backend.prompts[0] and "(start of the chapter)" in backend.prompts[0]
+            assert "Seen p0,p1" in backend.prompts[1] and "Straw Hat -> Sombrero de Paja" in backend.prompts[1]
+            assert "Seen p5" in backend.prompts[4]
+            # Empty lines never reach the model
+            assert all('"p0.b2"' not in prompt for prompt in backend.prompts)
+            # Memorized under the backend that answered, not as Gemini output
+            assert TranslationMemory().lookup_many(["Straw Hat 3!"], 'es', backend.model_id) == {0: "ES:Straw Hat 3!"}
+            assert TranslationMemory().lookup_many(["Straw Hat 3!"], 'es', GEMINI_MODEL) == {}
+        finally:
+            client.shutdown()
+    print("✅ Chapter translation passed")
+
+def test_chapter_no_stall():
+    print("\n--- Testing Chapter Translation flush when every worker is blocked ---")
+    with use_memory_db():
+        backend = FakeChapterLLM()
+        AsyncTranslatorClient.reset()
+        client = AsyncTranslatorClient(backend=backend, rpm=1e9, burst=10)
+        try:
+            # 2 workers hold pages 0 and 1 and wait on them: page 2 cannot arrive before they are answered
+            chapter = ChapterTranslator(total_pages=4, token_budget=1000, max_wait_ms=5000, max_in_flight=2,
+                                        translator=stub_translator())
+            start = time.monotonic()
+            first = [chapter.submit_page(p, [f"Page {p}"]) for p in (0, 1)]
+            assert [f.result(timeout=10)[0] for f in first] == [["ES:Page 0"], ["ES:Page 1"]]
+            elapsed = time.monotonic() - start
+            print(f"Pages 0-1 answered in {elapsed:.2f}s (max wait 5s)")
+            assert elapsed < 2
+            rest = [chapter.submit_page(p, [f"Page {p}"]) for p in (2, 3)]
+            assert [f.result(timeout=10)[0] for f in rest] == [["ES:Page 2"], ["ES:Page 3"]]
+            assert len(backend.prompts) == 2
+        finally:
+            client.shutdown()
+    print("✅ Chapter flush passed")
+
+def test_chapter_malformed_context():
+    print("\n--- Testing Chapter Translation with a malformed summary/glossary ---")
+    chapter = ChapterTranslator(total_pages=1, translator=stub_translator())
+    chapter._update_context({"summary": ["not", "text"], "glossary": ["Straw Hat", "Sombrero de Paja"]})
+    chapter._update_context({"summary": "Luffy sets sail", "glossary": "Straw Hat -> Sombrero de Paja"})
+    chapter._update_context({"glossary": {"Straw Hat": "Sombrero de Paja", "Zoro": None}})
+    assert chapter.summary == "Luffy sets sail"
+    assert dict(chapter.glossary) == {"Straw Hat": "Sombrero de Paja"}
+    print("✅ Chapter malformed context passed")
+
+if __name__ == "__main__":
+    test_chapter_translator()
+    test_chapter_no_stall()
+    test_chapter_malformed_context()
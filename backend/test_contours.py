@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+from services.contours import ContourEngine
+from services.detector import BubbleDetector
+from services.page_context import PageContext
+
+def test_contour_engine():
+    print("\n--- Testing Page-Level Contour Engine ---")
+    # Dark page with a white oval bubble, plus a black bubble on a white panel
+    img = np.zeros((400, 800, 3), dtype=np.uint8)
+    cv2.ellipse(img, (200, 200), (150, 100), 0, 0, 360, (255, 255, 255), -1)
+    cv2.putText(img, "HEY!", (150, 210), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    img[:, 400:] = 255
+    cv2.ellipse(img, (600, 200), (150, 100), 0, 0, 360, (30, 30, 30), -1)
+
+    bboxes = [[40, 90, 360, 310], [440, 90, 760, 310], [-20, -20, 0, 0]]
+    polygons = ContourEngine().extract(PageContext(img), bboxes)
+
+    assert len(polygons) == 3
+    for poly in polygons:
+        assert isinstance(poly, np.ndarray) and poly.dtype == np.int32 and poly.shape[1] == 2
+    assert len(polygons[2]) == 0 # Degenerate bbox
+    # Empty results are not one shared array
+    empty_a, empty_b = ContourEngine().extract(img, [[0, 0, 0, 0], [5, 5, 5, 5]])
+    assert empty_a is not empty_b and empty_a is not polygons[2]
+
+    # Polygons are page-absolute and hug the ellipses
+    for poly, (cx, cy) in zip(polygons[:2], [(200, 200), (600, 200)]):
+        x, y, w, h = cv2.boundingRect(poly)
+        print(f"Bubble at ({cx},{cy}) -> polygon bbox {x},{y},{w}x{h} ({len(poly)} pts)")
+        assert abs((x + w / 2) - cx) < 5 and abs((y + h / 2) - cy) < 5
+        assert 280 < w < 320 and 180 < h < 220
+
+    # Same shape as the legacy per-bubble path
+    legacy = BubbleDetector._get_bubble_contour(img, bboxes[0])
+    assert abs(cv2.contourArea(np.array(legacy)) - cv2.contourArea(polygons[0])) < 0.02 * cv2.contourArea(polygons[0])
+    print("✅ Contour engine passed")
+
+if __name__ == "__main__":
+    test_contour_engine()
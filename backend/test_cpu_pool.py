@@ -0,0 +1,83 @@
+import os
+import cv2
+import numpy as np
+from PIL import Image
+from services.cpu_pool import SharedPage, CpuStagePool
+from services.detector import BubbleDetector
+from services.inpainting import TextRemover
+from services import registry
+
+def make_page():
+    img = np.full((500, 700, 3), 40, np.uint8)
+    cv2.ellipse(img, (180, 160), (140, 90), 0, 0, 360, (255, 255, 255), -1)
+    cv2.putText(img, "HEY!", (130, 170), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    cv2.ellipse(img, (500, 350), (150, 100), 0, 0, 360, (250, 250, 250), -1)
+    bubbles = [{"bbox": [40, 70, 320, 250], "translation": "¡Hola!"},
+               {"bbox": [350, 250, 650, 450], "translation": "¿Qué pasa aquí?"}]
+    return img, bubbles
+
+def shm_segments():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+def test_shared_page():
+    print("\n--- Testing SharedPage (shared memory segments) ---")
+    img, _ = make_page()
+    before = shm_segments()
+    owner = SharedPage.from_array(img)
+    view = SharedPage.attach(owner.ref)
+    assert (view.array == img).all()
+    view.array[0, 0] = (1, 2, 3) # Same buffer
+    assert tuple(owner.array[0, 0]) == (1, 2, 3)
+    view.close()
+    # A worker closing its view does not unlink the segment
+    again = SharedPage.attach(owner.ref)
+    assert again.array.shape == img.shape
+    again.close()
+    name = owner.ref[0]
+    owner.close()
+    try:
+        SharedPage.attach((name, img.shape, img.dtype.str))
+        assert False, "segment should be unlinked by its owner"
+    except FileNotFoundError:
+        pass
+    assert shm_segments() == before
+    print("✅ SharedPage OK")
+
+def test_cpu_pool_process_mode():
+    print("\n--- Testing CpuStagePool (process mode) against the in-process stages ---")
+    img, bubbles = make_page()
+    before = shm_segments()
+    pool = CpuStagePool(workers=1)
+    try:
+        # Contours
+        expected = BubbleDetector.extract_contours(img, [b['bbox'] for b in bubbles])
+        got = pool.extract_contours(img, [b['bbox'] for b in bubbles])
+        assert len(got) == len(expected)
+        for a, b in zip(got, expected):
+            assert np.array_equal(a, b)
+        print(f"Contours: {[len(p) for p in got]} points, same as in-process")
+
+        # Render (pool buffers are BGR)
+        rendered = registry.renderer().render_image(Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)), bubbles)
+        expected = cv2.cvtColor(np.asarray(rendered), cv2.COLOR_RGB2BGR)
+        assert (pool.render(img, bubbles) == expected).all()
+        print("Render: same pixels as in-process")
+
+        # Inpaint (fast mode); needs the LaMa weights in both paths
+        try:
+            expected = TextRemover().inpaint_image(img, bubbles, fast_mode=True)
+        except FileNotFoundError as e:
+            print(f"Inpaint: skipped ({e})")
+        else:
+            got = pool.inpaint(img, bubbles)
+            assert (got is None and expected is None) or (got == expected).all()
+            print("Inpaint: same pixels as in-process")
+    finally:
+        pool.shutdown()
+    # Every page/output segment was unlinked
+    assert shm_segments() == before
+    print("✅ CPU pool OK")
+
+if __name__ == "__main__":
+    test_shared_page()
+    test_cpu_pool_process_mode()
@@ -0,0 +1,72 @@
+import time
+import random
+from unittest import mock
+from PIL import Image, ImageDraw, ImageFont
+from services.font_cache import FontCache, FontMetrics
+from services.renderer import TextRenderer
+from fixtures import make_page
+
+WORDS = "¡Hola! ¿Dónde está el barco? No lo veo por ninguna parte, capitán. AVATAR Wolf TYPE ... Sí.".split()
+
+def test_font_cache():
+    print("\n--- Testing font cache + word metrics ---")
+    renderer = TextRenderer()
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+    # Line width from cached word widths == textbbox of the whole line
+    rng = random.Random(0)
+    for name in ["ComicNeue", "Bangers"]:
+        for size in (9, 17, 32, 55):
+            font = renderer._load_font(size, name)
+            metrics = renderer.fonts.metrics(font)
+            for _ in range(50):
+                words = rng.sample(WORDS, rng.randint(1, 5))
+                bbox = draw.textbbox((0, 0), ' '.join(words), font=font)
+                assert abs(metrics.line_width(words) - (bbox[2] - bbox[0])) < 1e-6, words
+
+    # Each (path, size) is read from disk once per process
+    FontCache.reset()
+    renderer = TextRenderer()
+    img, bubbles = make_page(n=20)
+    real_truetype = ImageFont.truetype
+    with mock.patch("services.font_cache.ImageFont.truetype", side_effect=real_truetype) as truetype:
+        start = time.perf_counter()
+        renderer.render_image(img, bubbles)
+        first = time.perf_counter() - start
+        loads = truetype.call_count
+        start = time.perf_counter()
+        renderer.render_image(img, bubbles)
+        second = time.perf_counter() - start
+        assert truetype.call_count == loads
+        keys = [(c.args[0], c.args[1]) for c in truetype.call_args_list]
+        assert len(keys) == len(set(keys))
+    print(f"Fonts loaded: {loads} (cache hits {renderer.fonts.hits}); page render {first * 1000:.0f} ms cold, {second * 1000:.0f} ms warm")
+
+    # Missing files raise like truetype and are remembered
+    for _ in range(2):
+        try:
+            renderer.fonts.font("/nonexistent/font.ttf", 12)
+            assert False, "expected OSError"
+        except OSError:
+            pass
+    assert renderer._load_font(12, "AnimeAce") is renderer._load_font(12, "AnimeAce")
+
+    # LRU bound
+    FontCache.reset()
+    cache = FontCache(max_fonts=3)
+    path = renderer._load_font(10).path
+    for size in range(10, 16):
+        cache.font(path, size)
+    assert len(cache._fonts) == 3
+    assert isinstance(cache.metrics(cache.font(path, 15)), FontMetrics)
+
+    # Word metrics: a full cache drops the least recently used words, not everything
+    metrics = FontMetrics(cache.font(path, 15), max_words=3)
+    for word in ["uno", "dos", "tres", "uno", "cuatro"]:
+        metrics.word(word)
+    assert list(metrics._words) == ["tres", "uno", "cuatro"]
+    FontCache.reset()
+    print("✅ Font cache OK")
+
+if __name__ == "__main__":
+    test_font_cache()
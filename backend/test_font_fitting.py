@@ -0,0 +1,52 @@
+from fixtures import random_bubbles
+from services.renderer import TextRenderer
+
+def test_search_sizes():
+    print("\n--- Testing binary search over font sizes ---")
+    sizes = list(range(60, 7, -2))
+    for boundary in range(len(sizes) + 1):
+        fits = lambda size: size <= sizes[boundary] if boundary < len(sizes) else False
+        for first in [None, 0, boundary, boundary - 1, boundary + 1, len(sizes) - 1]:
+            found = TextRenderer._search_sizes(sizes, fits, first=first)
+            assert (found[0] if found else len(sizes)) == boundary, (boundary, first)
+    print("✅ Size search OK")
+
+def test_font_fitting():
+    print("\n--- Testing font fitting (binary search vs 2px shrink loop) ---")
+    bubbles = random_bubbles()
+
+    # Layouts measured with real fonts (the scaled estimates cost no FreeType calls)
+    renderer = TextRenderer()
+    measured = 0
+    def counting_fit(sizes, fits, load_font):
+        def counted(size, metrics):
+            nonlocal measured
+            measured += not hasattr(metrics, "base")
+            return fits(size, metrics)
+        return TextRenderer._fit_font_size(renderer, sizes, counted, load_font)
+    renderer._fit_font_size = counting_fit
+    for bubble in bubbles:
+        renderer.layout_bubble(bubble)
+
+    # Same size as the old loop: largest size, top down, that fits
+    renderer = TextRenderer()
+    linear = 0
+    def checked_search(sizes, check, first=None):
+        nonlocal linear
+        found = TextRenderer._search_sizes(sizes, check, first)
+        if first is not None:
+            expected = next((k for k, size in enumerate(sizes) if check(size)), None)
+            linear += expected + 1 if expected is not None else len(sizes)
+            assert (found[0] if found else None) == expected
+        return found
+    renderer._search_sizes = checked_search
+    for bubble in bubbles:
+        renderer.layout_bubble(bubble)
+
+    print(f"Measured layouts per bubble: {measured / len(bubbles):.1f} (2px shrink loop: {linear / len(bubbles):.1f})")
+    assert measured * 2 < linear
+    print("✅ Font fitting OK")
+
+if __name__ == "__main__":
+    test_search_sizes()
+    test_font_fitting()
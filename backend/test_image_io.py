@@ -0,0 +1,88 @@
+import os
+import time
+import tempfile
+import cv2
+import numpy as np
+from PIL import Image
+from services import image_io
+from services.image_io import artifact_name, write_artifact, write_intermediate, find_intermediate, read_image
+from services.renderer import TextRenderer
+from services.render_cache import RenderedPageCache
+from fixtures import make_page
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+def test_image_io():
+    print("\n--- Testing lossless intermediates + single final encode ---")
+    assert artifact_name("final_", "abc.jpeg") == "final_abc" + image_io.OUTPUT_EXTENSIONS[image_io.OUTPUT_FORMAT]
+    assert artifact_name("clean_text_", "abc.png", ".webp") == "clean_text_abc.webp"
+
+    noise, bubbles = make_page(n=20)
+    # Smooth "artwork" (blurred noise + ink strokes) so codec errors look like real pages
+    clean = cv2.GaussianBlur(np.asarray(noise)[:, :, ::-1], (0, 0), 4) # BGR, as the pipeline holds it
+    rng = np.random.default_rng(0)
+    for _ in range(150):
+        p1, p2 = rng.integers(0, 1400, 2), rng.integers(0, 1400, 2)
+        cv2.line(clean, (int(p1[0]), int(p1[1]) + 300), (int(p2[0]), int(p2[1]) + 300), (20, 20, 20), 3)
+    img = Image.fromarray(clean[:, :, ::-1])
+    saved_dir, saved_budget = image_io.INTERMEDIATE_DIR, image_io.INTERMEDIATE_MAX_BYTES
+    with tempfile.TemporaryDirectory() as tmp:
+        image_io.INTERMEDIATE_DIR = os.path.join(tmp, "intermediate")
+        try:
+            # Intermediates are lossless in both formats; the newest format wins
+            for fmt in ["png", "npy"]:
+                image_io.INTERMEDIATE_FORMAT = fmt
+                path = write_intermediate("clean_page.jpg", clean)
+                assert find_intermediate("clean_page.jpg") == path and path.endswith(fmt)
+                assert (np.asarray(read_image(path)) == clean).all()
+            assert len(os.listdir(image_io.INTERMEDIATE_DIR)) == 1
+
+            # Delivered codecs
+            for ext in [".jpg", ".webp", ".png"]:
+                path = os.path.join(tmp, f"final_page{ext}")
+                assert write_artifact(path, clean)
+                decoded = cv2.imread(path)
+                assert decoded.shape == clean.shape
+                print(f"{ext:5} {os.path.getsize(path) / 1e3:8.0f} KB, PSNR {psnr(decoded, clean):.1f} dB")
+
+            # Editor: before, the final was re-rendered from the clean JPEG and encoded again
+            renderer = TextRenderer()
+            ideal = np.asarray(renderer.render_image(img, bubbles))[:, :, ::-1]
+            clean_jpg = os.path.join(tmp, "clean_text_page.jpg")
+            write_artifact(clean_jpg, clean)
+            RenderedPageCache.reset()
+            results = {}
+            for name, clean_path in [("lossy clean", clean_jpg), ("intermediate", find_intermediate("clean_page.jpg"))]:
+                page, _, _ = RenderedPageCache().edit_bubble(name, clean_path, lambda: [dict(b) for b in bubbles],
+                                                             0, {}, renderer)
+                final_path = os.path.join(tmp, "final_page.jpg")
+                write_artifact(final_path, np.asarray(page)[:, :, ::-1])
+                results[name] = psnr(cv2.imread(final_path), ideal)
+            RenderedPageCache.reset()
+            print(f"Edited final vs ideal: {results['lossy clean']:.2f} dB from the delivered JPEG, "
+                  f"{results['intermediate']:.2f} dB from the lossless intermediate")
+            assert results["intermediate"] > results["lossy clean"]
+
+            # Size budget: the oldest intermediates go first, never the one just written
+            size = os.path.getsize(find_intermediate("clean_page.jpg"))
+            image_io.INTERMEDIATE_MAX_BYTES = int(size * 2.5)
+            now = time.time()
+            os.utime(find_intermediate("clean_page.jpg"), (now - 60, now - 60))
+            for i in range(3):
+                path = write_intermediate(f"clean_{i}.jpg", clean)
+                os.utime(path, (now - 30 + i * 10, now - 30 + i * 10))
+            assert find_intermediate("clean_page.jpg") is None and find_intermediate("clean_0.jpg") is None
+            assert find_intermediate("clean_1.jpg") and find_intermediate("clean_2.jpg")
+            image_io.INTERMEDIATE_MAX_BYTES = 1 # Even over budget, the newest is kept
+            assert os.path.exists(write_intermediate("clean_3.jpg", clean))
+            assert os.listdir(image_io.INTERMEDIATE_DIR) == [os.path.basename(find_intermediate("clean_3.jpg"))]
+        finally:
+            image_io.INTERMEDIATE_MAX_BYTES = saved_budget
+            image_io.INTERMEDIATE_DIR = saved_dir
+            image_io.INTERMEDIATE_FORMAT = os.getenv("INTERMEDIATE_FORMAT", "png").lower()
+    print("✅ Image IO OK")
+
+if __name__ == "__main__":
+    test_image_io()
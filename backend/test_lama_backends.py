@@ -0,0 +1,46 @@
+import os
+import tempfile
+import torch
+from services.lama_backends import load_lama
+
+class TinyLama(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(4, 3, 3, padding=1)
+        self.bn = torch.nn.BatchNorm2d(3)
+
+    def forward(self, img, mask):
+        out = torch.sigmoid(self.bn(self.conv(torch.cat([img * (1 - mask), mask], dim=1))))
+        return img * (1 - mask) + out * mask
+
+def test_lama_backends():
+    print("\n--- Testing LaMa backend selection ---")
+    with tempfile.TemporaryDirectory() as models_dir:
+        try:
+            load_lama("torchscript", models_dir=models_dir)
+            assert False, "Missing big-lama.pt must raise"
+        except FileNotFoundError:
+            pass
+
+        torch.jit.save(torch.jit.script(TinyLama().eval()), os.path.join(models_dir, "big-lama.pt"))
+        img = torch.rand(2, 3, 64, 64)
+        mask = (torch.rand(2, 1, 64, 64) > 0.8).float()
+
+        plain, backend = load_lama("torchscript", models_dir=models_dir)
+        assert backend == "torchscript"
+        optimized, backend = load_lama("torchscript-opt", models_dir=models_dir)
+        assert backend == "torchscript-opt"
+        with torch.inference_mode():
+            diff = (plain(img, mask) - optimized(img, mask)).abs().max().item()
+        print(f"torchscript-opt max abs diff: {diff:.2e}")
+        assert diff < 1e-4
+
+        # No ONNX export in the models dir (or no onnxruntime): falls back, never fails the worker
+        for requested in ("onnx", "onnx-int8", "nonsense"):
+            _, backend = load_lama(requested, models_dir=models_dir)
+            print(f"{requested} -> {backend}")
+            assert backend == "torchscript"
+    print("✅ LaMa backends OK")
+
+if __name__ == "__main__":
+    test_lama_backends()
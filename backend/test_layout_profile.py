@@ -0,0 +1,61 @@
+from collections import Counter
+from unittest import mock
+from PIL import ImageDraw, ImageFont
+from services.font_cache import FontCache
+from services.renderer import TextRenderer
+from fixtures import random_bubbles
+
+MEASURE_CALLS = [(ImageDraw.ImageDraw, "textbbox"), (ImageFont.FreeTypeFont, "getbbox"),
+                 (ImageFont.FreeTypeFont, "getlength")]
+
+def count_measurements(renderer, bubbles):
+    """
+    Measurement calls (textbbox / FreeType getbbox, getlength) made by layout_bubble, per bubble.
+    """
+    counts = Counter()
+    patches = []
+    for cls, name in MEASURE_CALLS:
+        original = getattr(cls, name)
+        def counted(*args, _original=original, _name=name, **kwargs):
+            counts[_name] += 1
+            return _original(*args, **kwargs)
+        patches.append(mock.patch.object(cls, name, counted))
+    per_bubble = []
+    for patch in patches:
+        patch.start()
+    try:
+        for bubble in bubbles:
+            before = sum(counts.values())
+            renderer.layout_bubble(bubble)
+            per_bubble.append(sum(counts.values()) - before)
+    finally:
+        for patch in patches:
+            patch.stop()
+    return counts, per_bubble
+
+def test_layout_profile():
+    print("\n--- Profiling measurement calls per bubble layout ---")
+    FontCache.reset()
+    renderer = TextRenderer()
+    bubbles = random_bubbles(n=200, seed=7)
+
+    counts, per_bubble = count_measurements(renderer, bubbles)
+    fonts = renderer.fonts.misses
+    words = sum(len(set(b["translation"].split())) for b in bubbles)
+    print(f"Cold: {sum(per_bubble) / len(bubbles):.1f} calls/bubble (max {max(per_bubble)}), "
+          f"{dict(counts)}, {fonts} fonts loaded, {words / len(bubbles):.1f} distinct words/bubble")
+    # Whole lines are never measured: only each word once per font size
+    assert counts["textbbox"] == 0
+    entries = [e for e in renderer.fonts._fonts.values() if e is not FontCache._MISSING]
+    assert counts["getbbox"] == sum(len(e._words) for e in entries)
+    assert counts["getlength"] == counts["getbbox"] + len(entries) # + the space advance of each font
+
+    # Same bubbles again: everything comes from the font cache
+    counts, per_bubble = count_measurements(renderer, bubbles)
+    print(f"Warm: {sum(per_bubble) / len(bubbles):.1f} calls/bubble")
+    assert sum(per_bubble) == 0
+    FontCache.reset()
+    print("✅ Layout profile OK")
+
+if __name__ == "__main__":
+    test_layout_profile()
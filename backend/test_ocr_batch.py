@@ -0,0 +1,67 @@
+import json
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.ocr import OCRService, VISION_BATCH_SIZE
+
+class FakeVisionHandler(BaseHTTPRequestHandler):
+    """
+    Minimal images:annotate endpoint. Each "image" is plain text: the fake OCR
+    upper-cases it. b"broken" returns a per-image error.
+    """
+    batch_sizes = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeVisionHandler.batch_sizes.append(len(body["requests"]))
+        responses = []
+        for req in body["requests"]:
+            text = base64.b64decode(req["image"]["content"]).decode("utf-8")
+            if text == "broken":
+                responses.append({"error": {"code": 3, "message": "Bad image data."}})
+                continue
+            vertices = [{"x": 1, "y": 2}, {"x": 11, "y": 2}, {"x": 11, "y": 9}, {"x": 1, "y": 9}]
+            symbols = [{"text": ch} for ch in text.upper()[:-1]]
+            symbols.append({"text": text.upper()[-1], "property": {"detectedBreak": {"type": "LINE_BREAK"}}})
+            word = {"boundingBox": {"vertices": vertices}, "symbols": symbols}
+            responses.append({"fullTextAnnotation": {
+                "text": text.upper(),
+                "pages": [{"blocks": [{"paragraphs": [{"words": [word]}]}]}]
+            }})
+        payload = json.dumps({"responses": responses}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def test_ocr_batch():
+    print("\n--- Testing Vision batch_annotate_images (fake server) ---")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeVisionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        ocr = OCRService(cache=None, endpoint=f"http://127.0.0.1:{server.server_port}")
+
+        # 40 crops -> 16 + 16 + 8, results reassembled in order
+        crops = [f"bubble {i}".encode("utf-8") for i in range(40)]
+        results = ocr.detect_text_batch(crops)
+        print(f"Requests: {FakeVisionHandler.batch_sizes}")
+        assert FakeVisionHandler.batch_sizes == [VISION_BATCH_SIZE, VISION_BATCH_SIZE, 40 - 2 * VISION_BATCH_SIZE]
+        assert [r["text"] for r in results] == [f"BUBBLE {i}" for i in range(40)]
+        assert results[0]["word_boxes"] == [[(1, 2), (11, 2), (11, 9), (1, 9)]]
+        assert results[0]["words"][0]["text"] == "BUBBLE 0" and results[0]["words"][0]["break"] == "\n"
+
+        # One bad image does not sink the rest of its batch
+        results = ocr.detect_text_batch([b"hey", b"broken", b"zoro"])
+        assert [r["text"] for r in results] == ["HEY", "", "ZORO"]
+        assert "error" in results[1] and "error" not in results[0]
+    finally:
+        server.shutdown()
+    print("✅ Vision batch OCR passed")
+
+if __name__ == "__main__":
+    test_ocr_batch()
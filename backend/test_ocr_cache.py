@@ -0,0 +1,65 @@
+import os
+import time
+import tempfile
+from services.ocr_cache import OCRCache
+from services.ocr import OCRService
+
+class FakeOCR(OCRService):
+    """
+    OCRService without the Vision client: counts network calls.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    def detect_text(self, image_content):
+        self.calls += 1
+        return {"text": image_content.decode("utf-8").upper(), "word_boxes": [[(0, 0), (5, 0), (5, 5), (0, 5)]]}
+
+    def detect_text_batch(self, contents):
+        return [self.detect_text(content) for content in contents]
+
+def fresh_cache(cache_dir, **kwargs):
+    OCRCache.reset()
+    return OCRCache(cache_dir=cache_dir, **kwargs)
+
+def test_ocr_cache():
+    print("\n--- Testing OCR Cache (memory + disk tiers) ---")
+    cache_dir = os.path.join(tempfile.mkdtemp(), "ocr")
+    ocr = FakeOCR(fresh_cache(cache_dir))
+
+    # Duplicated crops on one page are sent once
+    results = ocr.detect_text_bulk([b"hey", b"luffy", b"hey"])
+    assert [r["text"] for r in results] == ["HEY", "LUFFY", "HEY"]
+    assert ocr.calls == 2
+
+    # Second page: only the new crop goes to the network
+    results = ocr.detect_text_bulk([b"luffy", b"zoro"])
+    assert [r["text"] for r in results] == ["LUFFY", "ZORO"] and ocr.calls == 3
+
+    # Disk tier survives a restart (memory tier empty)
+    ocr.cache = fresh_cache(cache_dir)
+    results = ocr.detect_text_bulk([b"hey", b"zoro"])
+    assert [r["text"] for r in results] == ["HEY", "ZORO"] and ocr.calls == 3
+    assert results[0]["word_boxes"][0][2] == [5, 5]
+    print(f"Stats: {ocr.cache.stats()}")
+
+    # TTL: expired entries are misses on both tiers
+    ocr.cache = fresh_cache(cache_dir, ttl_seconds=0.05)
+    time.sleep(0.1)
+    ocr.detect_text_bulk([b"hey"])
+    assert ocr.calls == 4
+
+    # Size budget: oldest disk entries are evicted first
+    small = fresh_cache(os.path.join(tempfile.mkdtemp(), "ocr"), memory_items=1, max_bytes=250)
+    for i in range(5):
+        small.set_many({OCRCache.make_key(bytes([i])): {"text": "x" * 50, "word_boxes": []}})
+    assert small.stats()["disk_bytes"] <= 250 and small.stats()["memory_entries"] == 1
+    assert small.get_many([OCRCache.make_key(bytes([0]))]) == {}
+    assert small.get_many([OCRCache.make_key(bytes([4]))])
+
+    OCRCache.reset()
+    print("✅ OCR cache passed")
+
+if __name__ == "__main__":
+    test_ocr_cache()
@@ -0,0 +1,37 @@
+import numpy as np
+from services import renderer as renderer_module
+from services.renderer import TextRenderer
+from fixtures import make_dense_page
+
+def test_parallel_layout():
+    print("\n--- Testing parallel bubble layout (thread / process pools) ---")
+    renderer = TextRenderer()
+    img, bubbles = make_dense_page(24, seed=2)
+    bubbles.append({"bbox": [0, 0, 5, 5], "translation": "Ruido"}) # Not drawn: layout None
+
+    serial = renderer.layout_bubbles(bubbles, execution="serial")
+    expected = np.asarray(renderer.render_image(img, bubbles))
+    assert serial[-1] is None
+
+    saved = (renderer_module.RENDER_LAYOUT_EXECUTION, renderer_module.RENDER_LAYOUT_MIN_BUBBLES,
+             renderer_module.RENDER_LAYOUT_WORKERS)
+    renderer_module.RENDER_LAYOUT_MIN_BUBBLES, renderer_module.RENDER_LAYOUT_WORKERS = 1, 2
+    try:
+        for execution in ["thread", "process"]:
+            layouts = renderer.layout_bubbles(bubbles, execution=execution)
+            assert len(layouts) == len(bubbles) and layouts[-1] is None
+            for got, ref in zip(layouts, serial):
+                if ref:
+                    # Fonts come back as the parent's cached objects
+                    assert got['font'] is ref['font']
+                    assert {k: v for k, v in got.items() if k != 'font'} == {k: v for k, v in ref.items() if k != 'font'}
+            renderer_module.RENDER_LAYOUT_EXECUTION = execution
+            assert (np.asarray(renderer.render_image(img, bubbles)) == expected).all()
+            print(f"{execution}: same layouts and pixels as serial")
+    finally:
+        (renderer_module.RENDER_LAYOUT_EXECUTION, renderer_module.RENDER_LAYOUT_MIN_BUBBLES,
+         renderer_module.RENDER_LAYOUT_WORKERS) = saved
+    print("✅ Parallel layout OK")
+
+if __name__ == "__main__":
+    test_parallel_layout()
@@ -0,0 +1,143 @@
+import threading
+import time
+from services.queue_manager import JobManager, PipelineExecutor, QueueFullError, MicroBatcher
+
+def test_pipeline_executor():
+    print("\n--- Testing Pipeline Executor (FIFO + Backpressure) ---")
+    job_manager = JobManager()
+    executor = PipelineExecutor(job_manager, workers=1, max_queue=2)
+
+    release = threading.Event()
+    order = []
+
+    def fake_task(job_id, label):
+        release.wait(timeout=5)
+        order.append(label)
+        job_manager.update_job(job_id, status="completed", progress=100)
+
+    # 1 running + 2 queued fills the executor
+    first = job_manager.create_job()
+    executor.submit(first, fake_task, "A")
+    time.sleep(0.1) # Let the worker pick up the first job
+
+    second = job_manager.create_job()
+    third = job_manager.create_job()
+    assert executor.submit(second, fake_task, "B") == 1
+    assert executor.submit(third, fake_task, "C") == 2
+    print(f"Queued: B at {job_manager.get_job(second)['queue_position']}, C at {job_manager.get_job(third)['queue_position']}")
+
+    rejected = job_manager.create_job()
+    try:
+        executor.submit(rejected, fake_task, "D")
+        assert False, "Expected QueueFullError"
+    except QueueFullError as e:
+        print(f"[OK] Backpressure: {e}")
+
+    assert job_manager.get_job(third)["wait_time"] is not None
+
+    release.set()
+    deadline = time.time() + 5
+    while len(order) < 3 and time.time() < deadline:
+        time.sleep(0.05)
+    executor.shutdown()
+
+    print(f"Execution order: {order}")
+    assert order == ["A", "B", "C"]
+    assert job_manager.get_job(third)["status"] == "completed"
+    assert job_manager.get_job(third)["queue_position"] == 0
+    print("✅ FIFO order and queue positions passed")
+
+def test_pipeline_executor_shutdown():
+    print("\n--- Testing Pipeline Executor shutdown (queued jobs) ---")
+    job_manager = JobManager()
+    release = threading.Event()
+
+    def fake_task(job_id):
+        release.wait(timeout=5)
+        job_manager.update_job(job_id, status="completed", progress=100)
+
+    def start_three():
+        executor = PipelineExecutor(job_manager, workers=1, max_queue=4)
+        jobs = [job_manager.create_job() for _ in range(3)]
+        for job_id in jobs:
+            executor.submit(job_id, fake_task)
+        time.sleep(0.1) # First job running, two queued
+        return executor, jobs
+
+    # wait=True: the workers finish the queue before exiting
+    executor, jobs = start_three()
+    release.set()
+    executor.shutdown(wait=True)
+    assert [job_manager.get_job(j)["status"] for j in jobs] == ["completed"] * 3
+
+    # wait=False: queued jobs are failed right away, the running one still completes
+    release.clear()
+    executor, jobs = start_three()
+    executor.shutdown(wait=False)
+    assert [job_manager.get_job(j)["status"] for j in jobs[1:]] == ["failed", "failed"]
+    assert job_manager.get_job(jobs[1])["error"] == "Server shutting down"
+    release.set()
+    deadline = time.time() + 5
+    while job_manager.get_job(jobs[0])["status"] != "completed" and time.time() < deadline:
+        time.sleep(0.05)
+    assert job_manager.get_job(jobs[0])["status"] == "completed"
+    print("✅ Shutdown drains or fails queued jobs")
+
+def test_micro_batcher():
+    print("\n--- Testing Micro Batcher (N items or T ms) ---")
+    batch_sizes = []
+
+    def double_all(items):
+        batch_sizes.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(double_all, max_batch=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(6)]
+    results = [f.result(timeout=5) for f in futures]
+
+    print(f"Results: {results} | Batch sizes: {batch_sizes}")
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert batch_sizes[0] == 4 and sum(batch_sizes) == 6
+
+    # A lone item is flushed after max_wait instead of waiting for a full batch
+    start = time.time()
+    assert batcher(21) == 42
+    assert time.time() - start < 2
+    print("✅ Micro batching passed")
+
+def test_micro_batcher_failures():
+    print("\n--- Testing Micro Batcher failures (bad item, short results) ---")
+    calls = []
+
+    def invert(items):
+        calls.append(len(items))
+        return [1 / x for x in items] # x == 0 plays the corrupt page
+
+    batcher = MicroBatcher(invert, max_batch=3, max_wait_ms=200)
+    futures = [batcher.submit(x) for x in [1, 0, 4]]
+    assert futures[0].result(timeout=5) == 1 and futures[2].result(timeout=5) == 0.25
+    try:
+        futures[1].result(timeout=5)
+        assert False, "the bad item should fail"
+    except ZeroDivisionError:
+        pass
+    print(f"Calls: {calls}")
+    assert calls == [3, 1, 1, 1]
+
+    # A batch_fn that drops results fails those futures instead of hanging them
+    batcher = MicroBatcher(lambda items: items[:1], max_batch=2, max_wait_ms=200)
+    futures = [batcher.submit(x) for x in ["a", "b"]]
+    assert futures[0].result(timeout=5) == "a" and futures[1].result(timeout=5) == "b" # Retried one by one
+    batcher = MicroBatcher(lambda items: [], max_batch=2, max_wait_ms=200)
+    try:
+        batcher("a")
+        assert False, "missing result should fail"
+    except ValueError:
+        pass
+    print("✅ Micro batching failures passed")
+
+if __name__ == "__main__":
+    test_pipeline_executor()
+    test_pipeline_executor_shutdown()
+    test_micro_batcher()
+    test_micro_batcher_failures()
@@ -0,0 +1,84 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from deep_translator.exceptions import TooManyRequests
+from services import registry
+
+def test_registry():
+    print("\n--- Testing service registry (long-lived clients) ---")
+    registry.reset()
+    factories = {
+        "translator": lambda: registry.translator('es'),
+        "renderer": registry.renderer,
+        "fonts": registry.font_matcher,
+        "fallback": lambda: registry.fallback_translator('es'),
+    }
+    # id -> object (keeping the object alive so ids can't be recycled between threads)
+    seen = {name: {} for name in factories}
+
+    def worker():
+        for _ in range(20):
+            for name, factory in factories.items():
+                service = factory()
+                seen[name][id(service)] = service
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"Instances: { {k: len(v) for k, v in seen.items()} }")
+    # One per process, whatever the number of workers/pages
+    assert len(seen["translator"]) == len(seen["renderer"]) == len(seen["fonts"]) == 1
+    # deep_translator instances are not thread-safe: one per worker thread, reused
+    assert len(seen["fallback"]) == 4
+    assert registry.translator('es') is registry.translator('es')
+    assert registry.translator('fr') is not registry.translator('es')
+    # ...over one shared keep-alive pool
+    assert len({id(t.session) for t in seen["fallback"].values()}) == 1
+    registry.reset()
+    print("✅ Registry OK")
+
+def test_fallback_keepalive():
+    print("\n--- Testing pooled fallback translator (keep-alive) ---")
+    connections = set()
+
+    class FakeGoogle(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive
+        def do_GET(self):
+            connections.add(self.client_address)
+            quota = "quota" in self.path
+            body = ("Too Many Requests" if quota else '<div class="result-container">¡Hola!</div>').encode("utf-8")
+            self.send_response(429 if quota else 200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    registry.reset()
+    try:
+        translator = registry.fallback_translator('es')
+        translator._base_url = f"http://127.0.0.1:{server.server_port}/m"
+        results = [translator.translate(f"Hello {i}") for i in range(5)]
+        # An error response goes back to the pool too
+        try:
+            translator.translate("quota")
+            assert False, "429 should raise"
+        except TooManyRequests:
+            pass
+        results.append(translator.translate("Hello again"))
+        print(f"{len(results)} lines over {len(connections)} connection(s)")
+        assert results == ["¡Hola!"] * 6
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        registry.reset()
+    print("✅ Fallback keep-alive OK")
+
+if __name__ == "__main__":
+    test_registry()
+    test_fallback_keepalive()
@@ -0,0 +1,113 @@
+import os
+import time
+import tempfile
+import threading
+import numpy as np
+from PIL import Image
+from services.renderer import TextRenderer
+from services.render_cache import RenderedPageCache
+from fixtures import make_page
+
+def test_render_cache():
+    print("\n--- Testing incremental re-render (update-bubble) ---")
+    renderer = TextRenderer()
+    img, bubbles = make_page()
+
+    # Layout rect covers everything the bubble paints
+    for bubble in bubbles[:8]:
+        blank = Image.new("RGBA", img.size, (0, 0, 0, 0))
+        layout = renderer.layout_bubble(bubble)
+        _, _ = renderer.render_bubbles(blank, [bubble])
+        ys, xs = np.nonzero(np.asarray(blank)[:, :, 3])
+        x1, y1, x2, y2 = layout['rect']
+        assert xs.min() >= x1 and ys.min() >= y1 and xs.max() < x2 and ys.max() < y2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clean_path = os.path.join(tmp, "clean_text_page.png")
+        img.save(clean_path)
+        RenderedPageCache.reset()
+        cache = RenderedPageCache(max_pages=2)
+        expected = [dict(b) for b in bubbles]
+
+        edits = [(3, "Corto"), (3, "Un texto mucho más largo que el anterior para que cambie el tamaño del bloque"),
+                 (10, ""), (17, "¡BOOM!"), (0, "Otra vez")]
+        timings = []
+        for index, text in edits:
+            expected[index]["translation"] = text
+            start = time.perf_counter()
+            result, data, region = cache.edit_bubble("page", clean_path, lambda: [dict(b) for b in bubbles],
+                                                     index, {"translation": text}, renderer)
+            timings.append(time.perf_counter() - start)
+            assert data[index]["translation"] == text
+
+        start = time.perf_counter()
+        full = renderer.render_image(clean_path, expected)
+        full_time = time.perf_counter() - start
+        print(f"First edit (full render): {timings[0] * 1000:.0f} ms, next edits: "
+              f"{np.mean(timings[1:]) * 1000:.1f} ms avg, full re-render: {full_time * 1000:.0f} ms")
+        # Same pixels as re-rendering the whole page from scratch
+        assert (np.asarray(result) == np.asarray(full)).all()
+        assert max(timings[1:]) < full_time
+
+        # Clean image replaced (page re-processed): cache entry rebuilt
+        os.utime(clean_path, (time.time() + 10, time.time() + 10))
+        _, data, _ = cache.edit_bubble("page", clean_path, lambda: [dict(b) for b in bubbles], 1, {"translation": "X"}, renderer)
+        assert data[3]["translation"] == bubbles[3]["translation"]
+
+        # Bad index / failed layout: error, cached page untouched
+        for index in [len(bubbles), -1]:
+            try:
+                cache.edit_bubble("page", clean_path, None, index, {"translation": "?"}, renderer)
+                assert False, "bad index should raise"
+            except IndexError:
+                pass
+        broken = SlowRenderer(renderer, delay=0)
+        broken.layout_bubble = lambda bubble: 1 / 0
+        try:
+            cache.edit_bubble("page", clean_path, None, 2, {"translation": "Nunca"}, broken)
+            assert False, "layout error should propagate"
+        except ZeroDivisionError:
+            pass
+        _, data, region = cache.edit_bubble("page", clean_path, None, 2, {}, renderer)
+        assert data[2]["translation"] == bubbles[2]["translation"] and region # Old layout still in place
+
+        # save() persists the edit while the page lock is held
+        saved = []
+        def save(image, data):
+            saved.append((cache._page_lock("page").locked(), data[2]["translation"], image.size))
+        cache.edit_bubble("page", clean_path, None, 2, {"translation": "Guardado"}, renderer, save=save)
+        assert saved == [(True, "Guardado", img.size)]
+
+        # A cold page (full render) does not block edits of a cached one
+        slow_path = os.path.join(tmp, "clean_text_slow.png")
+        img.save(slow_path)
+        cold = threading.Thread(target=cache.edit_bubble, args=("slow", slow_path, lambda: [dict(b) for b in bubbles],
+                                                                 0, {}, SlowRenderer(renderer, delay=1.0)))
+        cold.start()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        cache.edit_bubble("page", clean_path, None, 4, {"translation": "Rápido"}, renderer)
+        warm_time = time.perf_counter() - start
+        cold.join()
+        print(f"Edit during another page's full render: {warm_time * 1000:.1f} ms")
+        assert warm_time < 0.5
+    RenderedPageCache.reset()
+    print("✅ Render cache OK")
+
+class SlowRenderer:
+    """
+    TextRenderer whose full page render takes `delay` seconds longer.
+    """
+    def __init__(self, renderer, delay):
+        self.renderer = renderer
+        self.delay = delay
+
+    def render_bubbles(self, image, bubbles):
+        time.sleep(self.delay)
+        return self.renderer.render_bubbles(image, bubbles)
+
+    def __getattr__(self, name):
+        return getattr(self.renderer, name)
+
+if __name__ == "__main__":
+    test_render_cache()
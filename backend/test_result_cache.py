@@ -0,0 +1,56 @@
+import os
+import tempfile
+from services.result_cache import PageResultCache
+
+def test_page_result_cache():
+    print("\n--- Testing Page Result Cache (content hash + LRU) ---")
+    workdir = tempfile.mkdtemp()
+    PageResultCache.reset() # Fresh cache on a temp dir
+    cache = PageResultCache(cache_dir=os.path.join(workdir, "cache"), max_bytes=2500)
+
+    # Fake artifacts (~1KB each)
+    def artifact(name):
+        path = os.path.join(workdir, name)
+        with open(path, "wb") as f:
+            f.write(os.urandom(1000))
+        return path
+
+    key_a = cache.make_key(b"page-a", "full", "es")
+    assert key_a != cache.make_key(b"page-a", "clean_only", "es")
+    assert key_a != cache.make_key(b"page-a", "full", "en")
+
+    assert cache.get(key_a) is None
+    cache.put(key_a, [{"bbox": [0, 0, 10, 10], "translation": "¡Hola!"}], {"final": artifact("final_a.jpg")})
+    hit = cache.get(key_a)
+    assert hit["bubbles"][0]["translation"] == "¡Hola!"
+    assert os.path.exists(hit["artifacts"]["final"])
+
+    # B then C: total exceeds 2500 bytes, least recently used (B) is evicted, A survives
+    key_b = cache.make_key(b"page-b", "full", "es")
+    key_c = cache.make_key(b"page-c", "full", "es")
+    cache.put(key_b, [], {"final": artifact("final_b.jpg")})
+    cache.get(key_a)
+    cache.put(key_c, [], {"final": artifact("final_c.jpg")})
+
+    assert cache.get(key_b) is None
+    assert cache.get(key_a) is not None and cache.get(key_c) is not None
+
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats["hits"] == 4 and stats["misses"] == 2
+    assert stats["size_bytes"] <= 2500
+
+    # Index is rebuilt from disk; a crash between entry.json and the rename leaves a .tmp dir behind
+    stale = os.path.join(workdir, "cache", key_b + ".tmp")
+    os.makedirs(stale)
+    with open(os.path.join(stale, "entry.json"), "w") as f:
+        f.write('{"bubbles": [], "artifacts": {}}')
+    PageResultCache.reset()
+    reloaded = PageResultCache(cache_dir=os.path.join(workdir, "cache"), max_bytes=2500)
+    assert reloaded.get(key_a) is not None
+    assert reloaded.stats()["entries"] == 2 and not os.path.exists(stale)
+    PageResultCache.reset()
+    print("✅ Page result cache passed")
+
+if __name__ == "__main__":
+    test_page_result_cache()
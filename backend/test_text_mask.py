@@ -0,0 +1,86 @@
+import time
+import cv2
+import numpy as np
+from services.text_mask import build_text_mask
+from services.inpainting import inpaint_telea
+
+def legacy_mask(img, bubbles, mask_mode):
+    """
+    Previous TextRemover mask: float32 full page, gray per ROI, full-page dilation.
+    """
+    h, w = img.shape[:2]
+    mask = np.zeros((h, w), dtype=np.float32)
+    for bubble in bubbles:
+        if mask_mode == 'text' and bubble.get('word_boxes'):
+            for wb in bubble['word_boxes']:
+                cv2.fillPoly(mask, [np.array(wb, np.int32)], 1.0)
+            continue
+        x1, y1, x2, y2 = map(int, bubble['bbox'])
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        gray_roi = cv2.cvtColor(img[y1:y2, x1:x2], cv2.COLOR_RGB2GRAY)
+        if np.mean(gray_roi) > 100:
+            roi = cv2.adaptiveThreshold(gray_roi, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 21, 10)
+        else:
+            _, roi = cv2.threshold(gray_roi, 150, 255, cv2.THRESH_BINARY)
+        roi = cv2.morphologyEx(roi, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2)))
+        mask[y1:y2, x1:x2] = roi.astype(np.float32) / 255.0
+    return cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=2)
+
+def make_page(h=2500, w=1700):
+    img = np.full((h, w, 3), 170, np.uint8)
+    bubbles = []
+    for i in range(24):
+        x, y = 40 + (i % 6) * 275, 60 + (i // 6) * 600
+        dark = i % 5 == 0
+        cv2.ellipse(img, (x + 110, y + 90), (105, 85), 0, 0, 360, (20, 20, 20) if dark else (255, 255, 255), -1)
+        cv2.putText(img, "HEY!", (x + 60, y + 100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (240, 240, 240) if dark else (0, 0, 0), 2)
+        bubble = {"bbox": [x, y, x + 220, y + 180]}
+        if i % 3 == 0:
+            bubble["word_boxes"] = [[(x + 60, y + 75), (x + 140, y + 75), (x + 140, y + 105), (x + 60, y + 105)]]
+        bubbles.append(bubble)
+    # Bubble touching the page border and an empty one
+    cv2.putText(img, "EDGE", (w - 90, h - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    bubbles.append({"bbox": [w - 100, h - 60, w + 20, h + 20]})
+    bubbles.append({"bbox": [10, h - 40, 30, h - 20]})
+    return img, bubbles
+
+def test_text_mask():
+    print("\n--- Testing sparse uint8 text mask engine ---")
+    img, bubbles = make_page()
+    for mode in ('bubble', 'text'):
+        start = time.perf_counter()
+        legacy = legacy_mask(img, bubbles, mode)
+        legacy_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        sparse = build_text_mask(img, bubbles, mode)
+        sparse_ms = (time.perf_counter() - start) * 1000
+
+        dense = sparse.to_dense()
+        roi_bytes = sum(roi.nbytes for _, roi in sparse.regions)
+        print(f"{mode}: legacy {legacy_ms:.1f} ms ({legacy.nbytes / 1e6:.1f} MB float32), "
+              f"sparse {sparse_ms:.1f} ms ({len(sparse.regions)} ROIs, {roi_bytes / 1e6:.2f} MB)")
+        assert dense.dtype == np.uint8
+        assert ((dense > 0) == (legacy > 0)).all()
+        assert sparse.area() == int((legacy > 0).sum())
+        assert roi_bytes < legacy.nbytes / 10
+
+    # crop() of any rect agrees with the dense mask
+    x1, y1, x2, y2 = 100, 500, 900, 1400
+    assert (sparse.crop((x1, y1, x2, y2)) == dense[y1:y2, x1:x2]).all()
+    assert not build_text_mask(img, [], 'bubble')
+    print("✅ Text mask OK")
+
+def test_region_telea():
+    print("\n--- Testing region-limited Telea ---")
+    img, bubbles = make_page()
+    mask = build_text_mask(img, bubbles, 'bubble')
+    full = cv2.inpaint(img, mask.to_dense(), 3, cv2.INPAINT_TELEA)
+    for threads in (1, 4):
+        # Regions grown past the Telea radius see the same neighbours: identical pixels
+        assert (inpaint_telea(img, mask, 3, threads=threads) == full).all()
+    assert (inpaint_telea(img, build_text_mask(img, [], 'bubble')) == img).all()
+    print("✅ Region Telea OK")
+
+if __name__ == "__main__":
+    test_text_mask()
+    test_region_telea()
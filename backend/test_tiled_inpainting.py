@@ -0,0 +1,107 @@
+import time
+import cv2
+import numpy as np
+import torch
+from services.inpainting import TextRemover
+from services.mask_tiles import find_tiles, tiles_from_rects
+
+class FakeLama(torch.nn.Module):
+    """
+    Stands in for big-lama.pt: paints the masked pixels mid-grey, records input shapes.
+    """
+    def __init__(self):
+        super().__init__()
+        self.shapes = []
+
+    def forward(self, img, mask):
+        self.shapes.append(tuple(img.shape))
+        return img * (1 - mask) + 0.5 * mask
+
+def make_remover():
+    remover = object.__new__(TextRemover) # Skip loading big-lama.pt
+    remover.device = torch.device('cpu')
+    remover.model = FakeLama()
+    return remover
+
+def make_page(h=2400, w=1600):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    bubbles = []
+    for i, (x, y) in enumerate([(100, 100), (140, 180), (900, 1200), (1400, 2200)]):
+        img[y:y + 120, x:x + 160] = 255
+        cv2.putText(img, f"HI {i}", (x + 10, y + 70), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+        bubbles.append({"bbox": [x, y, x + 160, y + 120]})
+    return img, bubbles
+
+def test_tiled_inpainting():
+    print("\n--- Testing tiled LaMa inpainting ---")
+    remover = make_remover()
+    img, bubbles = make_page()
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    sparse = remover._build_mask(rgb, bubbles, 'bubble')
+    mask = sparse.to_dense()
+
+    tiles = find_tiles(mask)
+    print(f"Tiles: {tiles}")
+    # Tiles straight from the sparse ROIs match the full-page component search
+    assert sorted(tiles_from_rects(sparse.rects, mask.shape[1], mask.shape[0])) == sorted(tiles)
+    # The two overlapping bubbles share one tile; every tile aligned to 8 and covering its mask
+    assert len(tiles) == 3
+    covered = np.zeros(mask.shape, bool)
+    for x1, y1, x2, y2 in tiles:
+        assert (x2 - x1) % 8 == 0 and (y2 - y1) % 8 == 0
+        covered[y1:y2, x1:x2] = True
+    assert covered[mask > 0].all()
+
+    start = time.perf_counter()
+    result = remover.inpaint_image(img, bubbles)
+    elapsed = time.perf_counter() - start
+    pixels = sum(s[0] * s[2] * s[3] for s in remover.model.shapes)
+    print(f"LaMa calls: {remover.model.shapes}, {pixels / (img.shape[0] * img.shape[1]):.1%} of the page pixels, {elapsed * 1000:.0f} ms")
+    assert pixels < 0.1 * img.shape[0] * img.shape[1]
+
+    # Same pixels as running the (local) model on the full page: masked -> grey, rest bit-exact
+    expected = img.copy()
+    expected[mask > 0] = 128
+    assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+    assert (result[mask == 0] == img[mask == 0]).all()
+
+    # Nothing to erase: no LaMa call
+    remover.model.shapes.clear()
+    blank = np.full((64, 64, 3), 255, np.uint8)
+    assert (remover.inpaint_image(blank, []) == blank).all() and not remover.model.shapes
+    print("✅ Tiled inpainting OK")
+
+def test_batched_tiles_across_pages():
+    print("\n--- Testing bucketed LaMa batches across pages ---")
+    remover = make_remover()
+    rng = np.random.default_rng(1)
+    sizes = [(100, 60), (120, 64), (200, 200), (64, 64), (110, 50), (250, 230)]
+    pairs = []
+    for h, w in sizes:
+        mask = np.zeros((h, w), np.float32)
+        mask[h // 4:h // 2, w // 4:w // 2] = 1
+        pairs.append((rng.integers(0, 255, (h, w, 3), dtype=np.uint8), mask))
+
+    results = remover.inpaint_tiles(pairs, batch_size=8)
+    print(f"Forward passes: {remover.model.shapes}")
+    # Buckets of 64 px: (128, 64) x3, (256, 256) x2, (64, 64) x1
+    assert sorted(remover.model.shapes) == [(1, 3, 64, 64), (2, 3, 256, 256), (3, 3, 128, 64)]
+    # Scattered back in input order, at each tile's own size
+    for (img, mask), result in zip(pairs, results):
+        assert result.shape == img.shape
+        diff = np.abs(result.astype(int) - np.where(mask[..., None] > 0, 127, img).astype(int))
+        assert diff.max() <= 1
+
+    # Two pages in one call share the forward passes
+    remover.model.shapes.clear()
+    page_a, bubbles_a = make_page(600, 400)
+    page_b, bubbles_b = make_page(600, 400)
+    out_a, out_b = remover.inpaint_pages([(page_a, bubbles_a[:1]), (page_b, bubbles_b[:1])])
+    assert len(remover.model.shapes) == 1 and remover.model.shapes[0][0] == 2, remover.model.shapes
+    assert (out_a == out_b).all()
+    print("✅ Batched tiles OK")
+
+if __name__ == "__main__":
+    test_tiled_inpainting()
+    test_batched_tiles_across_pages()
@@ -0,0 +1,110 @@
+import json
+from fixtures import use_memory_db
+import services.translation_memory as tm_module
+from models import TranslationMemory as TranslationMemoryEntry
+from services.translation_memory import TranslationMemory, normalize_source
+from services.translator import TranslatorService
+from services.translation_protocol import ITEMS_HEADER
+
+class FakeGemini:
+    """
+    Stands in for genai.GenerativeModel: answers every dialogue id with 'ES:<text>'.
+    """
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        translations = {item["id"]: f"ES:{item['text']}" for item in sent_items(prompt)}
+        return type("Response", (), {"text": json.dumps({"translations": translations})})()
+
+def sent_items(prompt):
+    return json.loads(prompt.split(ITEMS_HEADER + "\n", 1)[1].split("\n\nRespond", 1)[0])
+
+def test_translation_memory():
+    print("\n--- Testing Translation Memory ---")
+    with use_memory_db():
+        assert normalize_source("  What?!\n  ") == "What?!"
+
+        translator = TranslatorService(target_lang='es')
+        translator.model = FakeGemini()
+
+        page_1 = ["What?!", "Luffy!", "BOOM"]
+        results, provider = translator.translate_batch_with_context(page_1)
+        print(f"Page 1: {results} ({provider})")
+        assert results == ["ES:What?!", "ES:Luffy!", "ES:BOOM"]
+
+        # Only the new line goes to the LLM; recurring ones come back in order
+        page_2 = ["BOOM", "Where is the ship?", "What?! "]
+        results, provider = translator.translate_batch_with_context(page_2)
+        print(f"Page 2: {results} ({provider})")
+        assert results == ["ES:BOOM", "ES:Where is the ship?", "ES:What?!"]
+        assert sent_items(translator.model.prompts[-1]) == [{"id": "b0", "text": "Where is the ship?"}]
+
+        # Fully remembered page: no LLM call at all
+        calls = len(translator.model.prompts)
+        results, provider = translator.translate_batch_with_context(["Luffy!", "BOOM"])
+        assert provider == "Translation Memory" and len(translator.model.prompts) == calls
+
+        # Survives a process restart (LRU dropped, DB still has it)
+        TranslationMemory.reset()
+        assert TranslationMemory().lookup_many(["Luffy!"], "es", "gemini-flash-latest") == {0: "ES:Luffy!"}
+        assert TranslationMemory().lookup_many(["Luffy!"], "en", "gemini-flash-latest") == {}
+    print("✅ Translation memory passed")
+
+class DroppingGemini(FakeGemini):
+    """
+    Never returns the ids of `dropped` texts; single-line prompts get 'SOLO:<text>'.
+    """
+    def __init__(self, dropped):
+        super().__init__()
+        self.dropped = dropped
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        if ITEMS_HEADER not in prompt:
+            text = prompt.rsplit('Text: "', 1)[1][:-1]
+            return type("Response", (), {"text": f"SOLO:{text}"})()
+        translations = {item["id"]: f"ES:{item['text']}" for item in sent_items(prompt) if item["text"] not in self.dropped}
+        return type("Response", (), {"text": json.dumps({"translations": translations})})()
+
+def test_memory_partial_fallback():
+    print("\n--- Testing Translation Memory with a partial fallback ---")
+    with use_memory_db():
+        translator = TranslatorService(target_lang='es')
+        translator.model = DroppingGemini(dropped={"BOOM"})
+
+        results, provider = translator.translate_batch_with_context(["What?!", "BOOM", "Luffy!"])
+        print(f"Page: {results} ({provider})")
+        assert results == ["ES:What?!", "SOLO:BOOM", "ES:Luffy!"] and provider == "Gemini Flash (Partial Fallback)"
+        # Lines the LLM answered are remembered, the fallback line is not
+        remembered = TranslationMemory().lookup_many(["What?!", "BOOM", "Luffy!"], "es", "gemini-flash-latest")
+        assert remembered == {0: "ES:What?!", 2: "ES:Luffy!"}
+    print("✅ Translation memory partial fallback passed")
+
+def test_memory_db_writes():
+    print("\n--- Testing Translation Memory DB writes (upsert, batched hits) ---")
+    with use_memory_db():
+        memory = TranslationMemory()
+        memory.store_many([("Luffy!", "ES:Luffy!")], "es", "gemini-flash-latest")
+        # Another worker's copy of the same line lands first: the batch still stores the new one
+        TranslationMemory.reset()
+        TranslationMemory().store_many([("Luffy!", "¡Luffy!"), ("Zoro!", "¡Zoro!")], "es", "gemini-flash-latest")
+        TranslationMemory.reset()
+        found = TranslationMemory().lookup_many(["Luffy!", "Zoro!"], "es", "gemini-flash-latest")
+        assert found == {0: "¡Luffy!", 1: "¡Zoro!"}, found
+
+        # Lookups don't write; their hits go out with the next store
+        db = tm_module.SessionLocal()
+        hits = lambda: {e.source_text: e.hits for e in db.query(TranslationMemoryEntry).all()}
+        assert hits() == {"Luffy!": 0, "Zoro!": 0}
+        TranslationMemory().store_many([("Nami!", "¡Nami!")], "es", "gemini-flash-latest")
+        db.expire_all()
+        assert hits() == {"Luffy!": 1, "Zoro!": 1, "Nami!": 0}, hits()
+        db.close()
+    print("✅ Translation memory DB writes passed")
+
+if __name__ == "__main__":
+    test_translation_memory()
+    test_memory_partial_fallback()
+    test_memory_db_writes()
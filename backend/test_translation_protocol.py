@@ -0,0 +1,57 @@
+import json
+import asyncio
+from services.translation_protocol import format_items, parse_response, extract_translations, request_by_id, ITEMS_HEADER
+
+def test_translation_protocol():
+    print("\n--- Testing id-keyed batch translation protocol ---")
+    items = [(f"b{i}", f"Line {i}") for i in range(8)]
+
+    # Prompt block round-trips, reply parsing tolerates fences and the list form
+    block = format_items(items)
+    assert block.startswith(ITEMS_HEADER)
+    assert json.loads(block.split("\n", 1)[1])[3] == {"id": "b3", "text": "Line 3"}
+    reply = '```json\n{"translations": [{"id": "b0", "translation": " Hola "}]}\n```'
+    assert extract_translations(parse_response(reply)) == {"b0": "Hola"}
+
+    # Partial answer: b2 dropped once -> only b2 is re-sent
+    calls = []
+    async def dropping(batch):
+        calls.append([i for i, _ in batch])
+        return {i: f"ES:{t}" for i, t in batch if not (i == "b2" and len(calls) == 1)}
+    result = asyncio.run(request_by_id(items, dropping))
+    print(f"Partial: {calls}")
+    assert calls == [[i for i, _ in items], ["b2"]]
+    assert result == {i: f"ES:{t}" for i, t in items}
+
+    # Failed batch (too big for the "model") -> halves until they go through
+    calls = []
+    async def too_big(batch):
+        calls.append(len(batch))
+        if len(batch) > 2:
+            raise ValueError("No JSON object in response")
+        return {i: f"ES:{t}" for i, t in batch}
+    result = asyncio.run(request_by_id(items, too_big))
+    print(f"Halving: {calls}")
+    assert calls == [8, 4, 2, 2, 4, 2, 2]
+    assert len(result) == 8
+
+    # Depth limit: leftovers are returned missing, the caller falls back
+    async def never(batch):
+        return {}
+    assert asyncio.run(request_by_id(items, never, max_depth=1)) == {}
+
+    # Hard API error (auth/quota/network): no halving, answered ids are kept
+    calls = []
+    async def unauthorized(batch):
+        calls.append(len(batch))
+        if len(calls) > 1:
+            raise PermissionError("API key not valid")
+        return {i: f"ES:{t}" for i, t in batch[:3]}
+    result = asyncio.run(request_by_id(items, unauthorized))
+    print(f"Hard error: {calls}")
+    assert calls == [8, 5]
+    assert sorted(result) == ["b0", "b1", "b2"]
+    print("✅ Protocol OK")
+
+if __name__ == "__main__":
+    test_translation_protocol()
@@ -0,0 +1,58 @@
+import time
+import random
+import numpy as np
+from services.word_assigner import WordAssigner
+
+def word(text, x, y, w=20, h=10, brk=" "):
+    return {"text": text, "break": brk, "box": [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]}
+
+def test_word_assigner():
+    print("\n--- Testing Word -> Bubble Assignment (full-page OCR) ---")
+    bubbles = [
+        {"bbox": [0, 0, 200, 100]},
+        {"bbox": [300, 0, 500, 100]},
+        # Nested bubble inside the first one: smallest container wins
+        {"bbox": [120, 50, 190, 95]},
+        # Oval: corners of the bbox are outside the polygon
+        {"bbox": [0, 200, 200, 300], "polygon": np.array([[100, 200], [200, 250], [100, 300], [0, 250]], np.int32)},
+    ]
+    words = [
+        word("HELLO", 10, 10, brk="\n"), word("THERE", 10, 30, brk=""), word("!", 32, 30, w=5, brk="\n"),
+        word("ZORO", 320, 40, brk="\n"),
+        word("NESTED", 130, 60, w=30, brk="\n"),
+        word("INSIDE", 80, 245, brk="\n"),
+        word("CORNER", 2, 202, w=10, h=5, brk="\n"), # in bbox, outside oval
+        word("SFX", 250, 400) # outside every bubble
+    ]
+    per_bubble = WordAssigner(bubbles).assign(words)
+    texts = [WordAssigner.join_words(ws) for ws in per_bubble]
+    print(f"Texts: {texts}")
+    assert texts == ["HELLO\nTHERE!", "ZORO", "NESTED", "INSIDE"]
+    assert per_bubble[1][0]["box"][0] == (320, 40) # page-absolute boxes kept
+
+    # Scale: 60 bubbles, 1000 words
+    rng = random.Random(0)
+    many = [{"bbox": [x, y, x + 180, y + 120]} for x in range(0, 2000, 200) for y in range(0, 1800, 300)]
+    words = [word("w", rng.randint(0, 2000), rng.randint(0, 1900)) for _ in range(1000)]
+    start = time.perf_counter()
+    assigner = WordAssigner(many)
+    per_bubble = assigner.assign(words)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(words)} words x {len(many)} bubbles: {elapsed:.1f} ms")
+
+    # Same answer as brute force
+    for idx, ws in enumerate(per_bubble):
+        x1, y1, x2, y2 = many[idx]["bbox"]
+        for w in ws:
+            cx, cy = np.asarray(w["box"], np.float32).mean(axis=0)
+            assert x1 <= cx <= x2 and y1 <= cy <= y2
+    inside = sum(
+        1 for w in words
+        if any(b["bbox"][0] <= np.mean([p[0] for p in w["box"]]) <= b["bbox"][2] and
+               b["bbox"][1] <= np.mean([p[1] for p in w["box"]]) <= b["bbox"][3] for b in many)
+    )
+    assert sum(len(ws) for ws in per_bubble) == inside
+    print("✅ Word assignment passed")
+
+if __name__ == "__main__":
+    test_word_assigner()